@@ -1,21 +1,30 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import SQLModel
-from app.database import init_db, engine, is_sqlite, DB_PATH
+from app.database import init_db, engine, is_sqlite, DB_PATH, dispose_engines
 
 router = APIRouter()
 
+
+def _reset_database() -> None:
+    if is_sqlite:
+        # Remove the file (and its WAL sidecars) if it exists, then recreate an empty schema
+        for path in (DB_PATH, DB_PATH.with_name(DB_PATH.name + "-wal"), DB_PATH.with_name(DB_PATH.name + "-shm")):
+            if path.exists():
+                path.unlink()
+        init_db()
+    else:
+        # Drop and recreate tables for non-SQLite backends
+        SQLModel.metadata.drop_all(engine)
+        init_db()
+
+
 @router.post("/admin/clear-db")
-def clear_db():
+async def clear_db():
     try:
-        if is_sqlite:
-            # Remove the file if it exists, then recreate an empty schema
-            if DB_PATH.exists():
-                DB_PATH.unlink()
-            init_db()
-        else:
-            # Drop and recreate tables for non-SQLite backends
-            SQLModel.metadata.drop_all(engine)
-            init_db()
+        # Close every pool first, the async one included (its connections would leak)
+        await dispose_engines()
+        await run_in_threadpool(_reset_database)
         return {"success": True, "message": "Base de données effacée et réinitialisée."}
     except Exception as e:
         # Surface filesystem/DB failures as a 500 with context
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from datetime import date
 from typing import Optional, List
-from sqlmodel import Session
-from app.database import get_db
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_read_db
 from app.api.models_country import CountryEventsResponse
-from app.services.country_events_service import get_country_events_service
+from app.services.country_events_service import get_country_events_service_async
 
 # Router for country event listings
 router = APIRouter()
@@ -14,19 +14,21 @@ router = APIRouter()
     "/countries/{country}/all-events",
     response_model=CountryEventsResponse,
 )
-def get_country_all_events(
+async def get_country_all_events(
     country: str,
     sources: Optional[List[str]] = Query(None),
     labels: Optional[List[str]] = Query(None),
     event_types: Optional[List[str]] = Query(None),
-    session: Session = Depends(get_db),
+    lang: Optional[str] = Query(None),
+    collapse_stories: bool = Query(False),
+    session: AsyncSession = Depends(get_async_read_db),
 ):
     """
     Return all events for a country across all dates (grouped by region/location).
     """
     try:
         # Delegate filtering and grouping to the service layer
-        return get_country_events_service(country, target_date=None, sources=sources, labels=labels, event_types=event_types, session=session)
+        return await get_country_events_service_async(country, target_date=None, sources=sources, labels=labels, event_types=event_types, session=session, target_language=lang, collapse_stories=collapse_stories)
     except Exception as e:
         # Expose service errors as a 400 to the client
         raise HTTPException(status_code=400, detail=str(e))
@@ -35,19 +37,21 @@ def get_country_all_events(
     "/countries/{country}/events",
     response_model=CountryEventsResponse,
 )
-def get_country_events(
+async def get_country_events(
     country: str,
     target_date: date = Query(..., alias="date"),
     sources: Optional[List[str]] = Query(None),
     labels: Optional[List[str]] = Query(None),
-    session: Session = Depends(get_db),
+    lang: Optional[str] = Query(None),
+    collapse_stories: bool = Query(False),
+    session: AsyncSession = Depends(get_async_read_db),
 ):
     """
     List events for a country on a specific date (grouped by region/location).
     """
     try:
         # Delegate filtering and grouping to the service layer
-        return get_country_events_service(country, target_date=target_date, sources=sources, labels=labels, session=session)
+        return await get_country_events_service_async(country, target_date=target_date, sources=sources, labels=labels, session=session, target_language=lang, collapse_stories=collapse_stories)
     except Exception as e:
         # Expose service errors as a 400 to the client
         raise HTTPException(status_code=400, detail=str(e))
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, Query, HTTPException
 from datetime import date, datetime
 from typing import List, Optional
 from sqlmodel import Session, select
-from app.database import get_db
+from app.database import get_read_db
 from app.models.message import Message
 import json
 from pathlib import Path
@@ -11,14 +11,14 @@ from pathlib import Path
 router = APIRouter()
 
 @router.get("/event_types", response_model=List[str])
-def get_event_types(session: Session = Depends(get_db)):
+def get_event_types(session: Session = Depends(get_read_db)):
     # Return distinct, non-null event types found in the DB
     stmt = select(Message.event_type).where(Message.event_type.is_not(None)).distinct().order_by(Message.event_type)
     rows = session.exec(stmt).all()
     return [row for row in rows if row]
 
 @router.get("/labels", response_model=List[str])
-def get_labels(session: Session = Depends(get_db)):
+def get_labels(session: Session = Depends(get_read_db)):
     # Return distinct, non-null labels found in the DB
     stmt = select(Message.label).where(Message.label.is_not(None)).distinct().order_by(Message.label)
     rows = session.exec(stmt).all()
@@ -29,7 +29,7 @@ def get_labels(session: Session = Depends(get_db)):
     return sorted(set(labels))
 
 @router.get("/sources", response_model=List[str])
-def get_sources(session: Session = Depends(get_db)):
+def get_sources(session: Session = Depends(get_read_db)):
     # Return distinct, non-null human-readable sources found in the DB
     stmt = select(Message.source).where(Message.source.is_not(None)).distinct().order_by(Message.source)
     rows = session.exec(stmt).all()
@@ -60,7 +60,7 @@ def normalize_country_names(name: str, aliases: dict) -> list:
 def get_country_sources(
     country: str,
     target_date: Optional[date] = Query(None, alias="date"),
-    session: Session = Depends(get_db),
+    session: Session = Depends(get_read_db),
 ):
     norm_country = country
     # Validate the country against available coordinates
@@ -80,7 +80,7 @@ def get_country_sources(
 def get_country_labels(
     country: str,
     target_date: Optional[date] = Query(None, alias="date"),
-    session: Session = Depends(get_db),
+    session: Session = Depends(get_read_db),
 ):
     norm_country = country
     # Validate the country against available coordinates
@@ -106,7 +106,7 @@ def get_country_labels(
 def get_country_event_types(
     country: str,
     target_date: Optional[date] = Query(None, alias="date"),
-    session: Session = Depends(get_db),
+    session: Session = Depends(get_read_db),
 ):
     norm_country = country
     # Validate the country against available coordinates
@@ -129,7 +129,7 @@ def get_country_event_types(
     return sorted(event_types)
 
 @router.get("/dates", response_model=List[date])
-def get_available_dates(session: Session = Depends(get_db)):
+def get_available_dates(session: Session = Depends(get_read_db)):
     # Use the actual event timestamp to build a recent dates list
     stmt = select(Message.event_timestamp).where(Message.event_timestamp != None).order_by(Message.event_timestamp.desc())
     rows = session.exec(stmt).all()
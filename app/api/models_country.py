@@ -31,6 +31,9 @@ class EventMessage(BaseModel):
     url: Optional[str]
     translated_text: Optional[str] = None
     preview: str
+    # Near-duplicate cluster; with collapse_stories one entry stands for the whole story
+    story_id: Optional[str] = None
+    sources_count: int = 1
 
 # Group of events for a specific region/location
 class ZoneEvents(BaseModel):
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from datetime import date
 from typing import Optional, List
-from sqlmodel import Session
-from app.database import get_db
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_read_db
 from app.api.models_country import CountryEventsResponse
-from app.services.country_events_service import get_non_georef_events_service
+from app.services.country_events_service import get_non_georef_events_service_async
 
 # Router for non-georeferenced event listings (country == None)
 router = APIRouter()
@@ -14,22 +14,26 @@ router = APIRouter()
     "/non-georef/all-events",
     response_model=CountryEventsResponse,
 )
-def get_non_georef_all_events(
+async def get_non_georef_all_events(
     sources: Optional[List[str]] = Query(None),
     labels: Optional[List[str]] = Query(None),
     event_types: Optional[List[str]] = Query(None),
-    session: Session = Depends(get_db),
+    lang: Optional[str] = Query(None),
+    collapse_stories: bool = Query(False),
+    session: AsyncSession = Depends(get_async_read_db),
 ):
     """
     Return all events without a country across all dates (grouped by region/location).
     """
     try:
-        return get_non_georef_events_service(
+        return await get_non_georef_events_service_async(
             target_date=None,
             sources=sources,
             labels=labels,
             event_types=event_types,
             session=session,
+            target_language=lang,
+            collapse_stories=collapse_stories,
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -39,23 +43,27 @@ def get_non_georef_all_events(
     "/non-georef/events",
     response_model=CountryEventsResponse,
 )
-def get_non_georef_events(
+async def get_non_georef_events(
     target_date: date = Query(..., alias="date"),
     sources: Optional[List[str]] = Query(None),
     labels: Optional[List[str]] = Query(None),
     event_types: Optional[List[str]] = Query(None),
-    session: Session = Depends(get_db),
+    lang: Optional[str] = Query(None),
+    collapse_stories: bool = Query(False),
+    session: AsyncSession = Depends(get_async_read_db),
 ):
     """
     List events without a country on a specific date (grouped by region/location).
     """
     try:
-        return get_non_georef_events_service(
+        return await get_non_georef_events_service_async(
             target_date=target_date,
             sources=sources,
             labels=labels,
             event_types=event_types,
             session=session,
+            target_language=lang,
+            collapse_stories=collapse_stories,
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
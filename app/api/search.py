@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Query
 from typing import List
 from app.models.message import Message
-from app.database import get_session
-from sqlmodel import select
+from app.database import get_read_session
+from sqlmodel import func, select
 import unicodedata
 
 # Router for search endpoints
@@ -23,26 +23,26 @@ def normalize_text(text: str) -> str:
 def search_events(q: str = Query(..., min_length=1)):
     # Use DB filtering first, then normalize text for accent-insensitive matching
     norm_q = normalize_text(q)
-    with get_session() as session:
+    with get_read_session() as session:
+        # Messages not translated yet (lazy translation) are searched on their raw text
+        text = func.coalesce(Message.translated_text, Message.raw_text)
         # Broad SQL filters to reduce the candidate set
         results = session.exec(
             select(Message).where(
-                (Message.translated_text != None) & (
-                    (Message.translated_text.ilike(f"%{q}%")) |
-                    (Message.country.ilike(f"%{q}%")) |
-                    (Message.country_norm.ilike(f"%{q}%")) |
-                    (Message.region.ilike(f"%{q}%")) |
-                    (Message.location.ilike(f"%{q}%")) |
-                    (Message.label.ilike(f"%{q}%")) |
-                    (Message.event_type.ilike(f"%{q}%")) |
-                    (Message.source.ilike(f"%{q}%"))
-                )
+                (text.ilike(f"%{q}%")) |
+                (Message.country.ilike(f"%{q}%")) |
+                (Message.country_norm.ilike(f"%{q}%")) |
+                (Message.region.ilike(f"%{q}%")) |
+                (Message.location.ilike(f"%{q}%")) |
+                (Message.label.ilike(f"%{q}%")) |
+                (Message.event_type.ilike(f"%{q}%")) |
+                (Message.source.ilike(f"%{q}%"))
             ).limit(100)
         ).all()
         # In-memory pass to enforce normalized substring matching
         filtered = [
             m for m in results
-            if norm_q in normalize_text(m.translated_text)
+            if norm_q in normalize_text(m.translated_text or m.raw_text or "")
             or (m.country and norm_q in normalize_text(m.country))
             or (m.country_norm and norm_q in normalize_text(m.country_norm))
             or (m.region and norm_q in normalize_text(m.region))
@@ -11,6 +11,14 @@ class Settings(BaseSettings):
     fetch_window_hours: int = 24
     # Automatic deletion window (in days)
     auto_delete_days: int = 7
+    # Retention deletes in id-ranged chunks with a pause between them, then vacuums/analyzes
+    retention_chunk_size: int = 5000
+    retention_pause_ms: int = 200
+    retention_vacuum: bool = True
+    # Postgres only: create message range-partitioned by day (new databases), so retention
+    # drops whole partitions; partitions are created this many days ahead
+    message_partitioning: bool = False
+    message_partition_premake_days: int = 3
     # Allow extra variables in the .env without failing validation
     env_file: ClassVar[str] = ".env" if os.path.exists(os.path.join(os.path.dirname(__file__), "..", ".env")) else ".env.example"
     model_config = SettingsConfigDict(
@@ -29,12 +37,79 @@ class Settings(BaseSettings):
     sources_telegram: str 
 
     max_messages_per_channel: int = 50
+
+    # SQLite profile: WAL journal (pipeline writes no longer block API reads), applied on connect
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 10000
+    sqlite_cache_size_mb: int = 64
+    sqlite_mmap_size_mb: int = 256
+    # Postgres connection pool (write engine; the API read engine gets the same sizing)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_recycle_seconds: int = 1800
+    db_pool_timeout_seconds: int = 30
+    # Run pipeline stages concurrently, connected by queues of pipeline_queue_size batches
+    pipeline_streaming: bool = False
+    pipeline_queue_size: int = 4
+    # Max channels fetched concurrently over the single Telegram client
+    fetch_concurrency: int = 4
+    # Only ask Telegram for messages above the last stored id per channel
+    incremental_fetch: bool = True
+    # Page through history newest-first and stop at the fetch window cutoff
+    # instead of a fixed per-channel limit; fetch_stream_cap is a safety cap
+    fetch_streaming: bool = False
+    fetch_stream_cap: int = 2000
+    # Cached channel entities are re-resolved after this many hours (0 disables the cache)
+    entity_cache_ttl_hours: int = 168
+    # Token-bucket pacing of Telegram requests across all channels (0 disables pacing)
+    fetch_rate_per_second: float = 5.0
+    fetch_rate_burst: int = 10
+    # FloodWait handling: channels are requeued unless the wait exceeds fetch_flood_max_wait
+    fetch_flood_max_wait: int = 300
+    fetch_max_requeues: int = 3
     batch_size: int = 20
+    # AI batches are packed up to this many estimated input tokens (batch_size stays the
+    # hard max item count); 0 keeps fixed batches of batch_size
+    batch_token_budget: int = 4000
+    # Max AI sub-batches in flight at once
+    ai_max_concurrency: int = 4
+    # Follow-up requests for ids missing or malformed in an AI response (0 disables)
+    ai_repair_retries: int = 2
+    # Ask for the translation in the enrichment AI call (one round-trip per batch instead of two)
+    combined_ai_calls: bool = False
 
     # Target language for translation (e.g., fr, es, de)
     target_language: str = "fr"
+    # langdetect runs in a process pool of this many workers (0 = in process) once at
+    # least language_detect_pool_min texts are left after the script/prior fast paths
+    language_detect_workers: int = 0
+    language_detect_pool_min: int = 200
+    # Store messages untranslated and translate them on first view in the event endpoints
+    lazy_translation: bool = False
+    lazy_translation_max_per_request: int = 200
+    # Strip per-channel recurring header/footer blocks (learned from recent posts) before AI calls
+    strip_boilerplate: bool = True
+    boilerplate_sample_size: int = 50
+    boilerplate_min_share: float = 0.6
+    # Posts whose content hash already exists (retention window or same run) skip the AI:
+    # "link" stores them with the original's enrichment, "drop" discards them, "off" disables
+    content_dedupe_mode: str = "link"
+    # Near-duplicate story clustering (MinHash LSH over word shingles, see services/stories.py).
+    # Posts whose estimated similarity reaches story_min_similarity share a story_id; those
+    # at story_reuse_min_similarity naming the same places reuse the story's enrichment
+    story_clustering: bool = True
+    story_min_similarity: float = 0.5
+    story_reuse_min_similarity: float = 0.8
 
     enrichment_version: str = "1"
+    # Persistent cache of AI enrichment results (by normalized text, version and model)
+    enrichment_cache_enabled: bool = True
+    enrichment_cache_max_age_days: int = 30
+    enrichment_cache_max_rows: int = 50000
+    # Persistent translation memory (by normalized source text, language pair and model)
+    translation_memory_enabled: bool = True
+    translation_memory_max_age_days: int = 30
+    translation_memory_max_rows: int = 50000
 
 
 @lru_cache
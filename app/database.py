@@ -1,9 +1,12 @@
 # app/database.py
 from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 import os
 
 
+from sqlalchemy import event, inspect, text
+from sqlalchemy.pool import NullPool
 from sqlmodel import SQLModel, create_engine, Session
 
 # Resolve the database URL (prefer DB_URL, fallback to local SQLite)
@@ -17,21 +20,176 @@ else:
     DATABASE_URL = f"sqlite:///{DB_PATH}"
     is_sqlite = True
 
-# Create the SQLModel engine (SQLite needs check_same_thread disabled)
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,
-    # check_same_thread uniquement pour SQLite
-    connect_args={"check_same_thread": False} if is_sqlite else {},
-    # Validate connections before use to avoid stale/closed SSL sockets
-    pool_pre_ping=True,
-)
+# Optional replica for API reads (defaults to the main database)
+READ_DATABASE_URL = os.getenv("DB_READ_URL") or DATABASE_URL
+
+
+def _setting(name: str):
+    # Settings require Telegram credentials; tools that only touch the DB fall back to defaults
+    from app.config import Settings, get_settings
+    try:
+        return getattr(get_settings(), name)
+    except Exception:
+        return Settings.model_fields[name].default
+
+
+def _sqlite_pragmas(read_only: bool):
+    def on_connect(dbapi_conn, _record) -> None:
+        cursor = dbapi_conn.cursor()
+        if not read_only:
+            # Only effective on a new file (older ones: tools/convert_sqlite_auto_vacuum.py):
+            # freed pages can then be released by PRAGMA incremental_vacuum
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL: readers and the single writer no longer block each other
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={_setting('sqlite_synchronous')}")
+        cursor.execute(f"PRAGMA busy_timeout={int(_setting('sqlite_busy_timeout_ms'))}")
+        # Negative cache_size is in KiB
+        cursor.execute(f"PRAGMA cache_size=-{int(_setting('sqlite_cache_size_mb')) * 1024}")
+        cursor.execute(f"PRAGMA mmap_size={int(_setting('sqlite_mmap_size_mb')) * 1024 * 1024}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+
+def _create_engine(url: str, read_only: bool = False):
+    if url.startswith("sqlite"):
+        new_engine = create_engine(
+            url,
+            echo=False,
+            # check_same_thread uniquement pour SQLite
+            connect_args={"check_same_thread": False},
+            pool_pre_ping=True,
+        )
+        event.listen(new_engine, "connect", _sqlite_pragmas(read_only))
+        return new_engine
+    connect_args = {}
+    if read_only and url.startswith("postgresql"):
+        connect_args["options"] = "-c default_transaction_read_only=on"
+    return create_engine(
+        url,
+        echo=False,
+        connect_args=connect_args,
+        pool_size=int(_setting("db_pool_size")),
+        max_overflow=int(_setting("db_max_overflow")),
+        pool_recycle=int(_setting("db_pool_recycle_seconds")),
+        pool_timeout=int(_setting("db_pool_timeout_seconds")),
+        # Validate connections before use to avoid stale/closed SSL sockets
+        pool_pre_ping=True,
+    )
+
+
+# Write engine (pipeline, migrations, on-demand translations) and read-only engine for
+# API requests, so dashboard reads never hold locks that slow store/delete down
+engine = _create_engine(DATABASE_URL)
+read_engine = _create_engine(READ_DATABASE_URL, read_only=True)
 
 
 def init_db() -> None:
     # Import models so SQLModel registers table metadata
     from app.models.message import Message  # noqa: F401
+    from app.models.channel_state import ChannelState  # noqa: F401
+    from app.models.enrichment_cache import EnrichmentCacheEntry  # noqa: F401
+    from app.models.translation_memory import TranslationMemoryEntry  # noqa: F401
+    from app.models.message_translation import MessageTranslation  # noqa: F401
+    from app.models.story_band import StoryBand  # noqa: F401
+    from app.models.daily_rollup import DailyRollup
+    from app.services.retention import create_partitioned_message_table, ensure_partitions
+    from app.services.rollup import rebuild_rollup
+    # Postgres daily partitioning (opt-in) must exist before create_all sees the table
+    create_partitioned_message_table()
+    new_rollup = not inspect(engine).has_table(DailyRollup.__tablename__)
     SQLModel.metadata.create_all(engine)
+    ensure_partitions()
+    _add_missing_columns()
+    _ensure_message_unique_key()
+    if new_rollup:
+        # Backfill from the messages already stored; kept up to date incrementally afterwards
+        print(f"[db] built {DailyRollup.__tablename__} ({rebuild_rollup()} rows)")
+
+
+def _add_missing_columns() -> None:
+    # create_all never alters existing tables: add nullable columns introduced since
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            added = set()
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'))
+                added.add(column.name)
+                print(f"[db] added column {table.name}.{column.name}")
+            # Indexes on the new columns
+            for index in table.indexes:
+                if added.intersection(col.name for col in index.columns):
+                    index.create(conn, checkfirst=True)
+
+
+def _ensure_message_unique_key() -> None:
+    # Databases created before the (channel, telegram_message_id) unique index may hold
+    # duplicates: keep the first row of each before creating it
+    from app.models.message import Message
+
+    name = "uq_message_channel_telegram_id"
+    if name in {ix["name"] for ix in inspect(engine).get_indexes("message")}:
+        return
+    duplicates = (
+        "SELECT m.id FROM message m WHERE EXISTS (SELECT 1 FROM message o WHERE "
+        "o.channel = m.channel AND o.telegram_message_id = m.telegram_message_id AND o.id < m.id)"
+    )
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM message_translation WHERE message_id IN ({duplicates})"))
+        result = conn.execute(text(f"DELETE FROM message WHERE id IN ({duplicates})"))
+        if result.rowcount:
+            print(f"[db] removed {result.rowcount} duplicate messages")
+        next(ix for ix in Message.__table__.indexes if ix.name == name).create(conn, checkfirst=True)
+        print(f"[db] added index {name}")
+
+
+def insert_ignore_conflicts(session: Session, table, rows: list[dict], conflict_columns: list[str], returning: tuple = ()) -> list:
+    """
+    Bulk INSERT ... ON CONFLICT DO NOTHING (SQLite and Postgres) in one executemany.
+    Returns the `returning` columns of the rows actually inserted.
+    """
+    if not rows:
+        return []
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table).on_conflict_do_nothing(index_elements=conflict_columns)
+    if returning:
+        stmt = stmt.returning(*(table.c[name] for name in returning))
+    result = session.connection().execute(stmt, rows)
+    return result.all() if returning else []
+
+
+def upsert_rows(session: Session, table, rows: list[dict], conflict_columns: list[str], update_columns: list[str]) -> None:
+    """
+    Bulk INSERT ... ON CONFLICT DO UPDATE (SQLite and Postgres) in one executemany:
+    rows already stored get their update_columns overwritten. Safe against concurrent
+    writers of the same keys. Every row must carry the same columns.
+    """
+    if not rows:
+        return
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=conflict_columns,
+        set_={name: stmt.excluded[name] for name in update_columns},
+    )
+    session.connection().execute(stmt, rows)
 
 
 @contextmanager
@@ -41,8 +199,86 @@ def get_session() -> Session:
         yield session
 
 
+def _async_url(url: str) -> str:
+    # Same database through the async drivers (aiosqlite / asyncpg)
+    scheme, _, rest = url.partition("://")
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme.startswith("postgres"):
+        # asyncpg takes ssl=, not libpq's sslmode=
+        return f"postgresql+asyncpg://{rest}".replace("sslmode=", "ssl=")
+    return url
+
+
+@lru_cache(maxsize=1)
+def get_async_read_engine():
+    """
+    Async read-only engine for the API, created on first use so the pipeline never
+    needs the async drivers. Same profiles as the sync engines.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = _async_url(READ_DATABASE_URL)
+    if url.startswith("sqlite"):
+        # Opening a SQLite file is cheap; pooled aiosqlite connections would each keep a
+        # worker thread alive and tie connections to one event loop
+        async_engine = create_async_engine(url, echo=False, poolclass=NullPool)
+        event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas(read_only=True))
+        return async_engine
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg"):
+        connect_args["server_settings"] = {"default_transaction_read_only": "on"}
+    return create_async_engine(
+        url,
+        echo=False,
+        connect_args=connect_args,
+        pool_size=int(_setting("db_pool_size")),
+        max_overflow=int(_setting("db_max_overflow")),
+        pool_recycle=int(_setting("db_pool_recycle_seconds")),
+        pool_timeout=int(_setting("db_pool_timeout_seconds")),
+        pool_pre_ping=True,
+    )
+
+
+@contextmanager
+def get_read_session() -> Session:
+    # Read-only counterpart of get_session (API reads)
+    with Session(read_engine, autoflush=False) as session:
+        yield session
+
+
 # Dépendance FastAPI
 def get_db():
     # FastAPI dependency that yields a DB session
     with Session(engine) as session:
         yield session
+
+
+def get_read_db():
+    # FastAPI dependency for read-only endpoints (read-only engine, no autoflush)
+    with Session(read_engine, autoflush=False) as session:
+        yield session
+
+
+async def dispose_async_engine() -> None:
+    # Close the async pool (application shutdown)
+    if get_async_read_engine.cache_info().currsize:
+        await get_async_read_engine().dispose()
+
+
+async def get_async_read_db():
+    # Async FastAPI dependency for read-only endpoints: no threadpool worker per request
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    async with AsyncSession(get_async_read_engine(), autoflush=False) as session:
+        yield session
+
+
+async def dispose_engines() -> None:
+    # Close pooled connections (before removing or recreating the database); await it
+    # from the application's event loop, which owns the async engine's connections
+    engine.dispose()
+    read_engine.dispose()
+    await dispose_async_engine()
+    # The async engine is rebuilt on next use
+    get_async_read_engine.cache_clear()
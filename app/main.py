@@ -1,10 +1,11 @@
 # app/main.py
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from app.database import init_db
+from app.database import dispose_async_engine, init_db
 init_db()
 
 from fastapi import FastAPI, Request
@@ -14,8 +15,15 @@ from fastapi.templating import Jinja2Templates
 
 from app.api import router as api_router
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    yield
+    # Release pooled async DB connections on shutdown
+    await dispose_async_engine()
+
+
 # FastAPI application entrypoint
-app = FastAPI(title="OSINT Dashboard (from scratch)")
+app = FastAPI(title="OSINT Dashboard (from scratch)", lifespan=lifespan)
 
 # Project root used for static and template directories
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -0,0 +1,23 @@
+# app/models/channel_state.py
+from datetime import datetime
+
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, BigInteger, String
+
+
+# Per-channel fetch state persisted between pipeline runs
+class ChannelState(SQLModel, table=True):
+    __tablename__ = "channel_state"
+
+    channel: str = Field(primary_key=True, max_length=128)
+
+    # Highest telegram_message_id already ingested for this channel (high-water mark)
+    last_message_id: int = Field(default=0)
+
+    # Cached resolution of the channel username (avoids get_entity on every run)
+    peer_id: int | None = Field(default=None, sa_column=Column(BigInteger))
+    access_hash: int | None = Field(default=None, sa_column=Column(BigInteger))
+    title: str | None = Field(default=None, sa_column=Column(String(255)))
+    resolved_at: datetime | None = Field(default=None)
+
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
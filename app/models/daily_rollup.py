@@ -0,0 +1,23 @@
+# app/models/daily_rollup.py
+from datetime import date, datetime
+
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, String
+
+
+# Message counts per day and filter combination, maintained by store/retention, so map
+# counts scale with the number of countries rather than messages.
+# Key parts never hold NULL: missing values are stored as "". country_raw is only set
+# when country_norm is empty (non-georeferenced countries listed as ignored).
+class DailyRollup(SQLModel, table=True):
+    __tablename__ = "message_daily_rollup"
+
+    day: date = Field(primary_key=True)
+    country_norm: str = Field(default="", primary_key=True)
+    country_raw: str = Field(default="", primary_key=True)
+    source: str = Field(default="", sa_column=Column(String(128), primary_key=True))
+    label: str = Field(default="", sa_column=Column(String(255), primary_key=True))
+    event_type: str = Field(default="", primary_key=True)
+
+    count: int = Field(default=0)
+    last_timestamp: datetime | None = Field(default=None)
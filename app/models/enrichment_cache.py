@@ -0,0 +1,25 @@
+# app/models/enrichment_cache.py
+from datetime import datetime
+
+from sqlmodel import SQLModel, Field
+
+
+# AI enrichment results keyed by normalized text hash, pipeline version and model.
+# pipeline_version is stored as "<version>:<target language>" (titles are localized).
+# A field left to None was never requested; an empty string means the AI found nothing.
+class EnrichmentCacheEntry(SQLModel, table=True):
+    __tablename__ = "enrichment_cache"
+
+    text_hash: str = Field(primary_key=True, max_length=64)
+    pipeline_version: str = Field(primary_key=True, max_length=32)
+    model_name: str = Field(primary_key=True, max_length=128)
+
+    country: str | None = None
+    region: str | None = None
+    location: str | None = None
+    title: str | None = None
+    event_type: str | None = None
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Refreshed on every hit; drives age/size eviction
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, index=True)
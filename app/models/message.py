@@ -17,6 +17,12 @@ class Message(SQLModel, table=True):
     # Raw and translated content (translated_text may be null)
     raw_text: str
     translated_text: str | None = None
+    # sha256 of the normalized post text (boilerplate stripped), for exact dedupe across channels
+    content_hash: str | None = Field(default=None, index=True, max_length=64)
+    # Near-duplicate cluster (same event reported with different wording) and the
+    # MinHash signature (hex) it was matched with
+    story_id: str | None = Field(default=None, index=True, max_length=32)
+    minhash: str | None = Field(default=None)
 
     # Geographic metadata derived from NLP/normalization
     country: str | None = Field(default=None, index=True)
@@ -40,6 +46,8 @@ class Message(SQLModel, table=True):
 
     # Common access patterns used by API queries
     __table_args__ = (
+        # Ingestion key: bulk inserts skip posts already stored (ON CONFLICT DO NOTHING)
+        Index("uq_message_channel_telegram_id", "channel", "telegram_message_id", unique=True),
         Index("ix_message_country_created", "country", "created_at"),
         Index("ix_message_country_norm", "country_norm"),
         Index("ix_message_created_at_country_norm", "created_at", "country_norm"),
@@ -0,0 +1,17 @@
+# app/models/message_translation.py
+from datetime import datetime
+
+from sqlmodel import SQLModel, Field
+
+
+# Translations of stored messages into languages other than settings.target_language
+# (the target language itself lives in Message.translated_text)
+class MessageTranslation(SQLModel, table=True):
+    __tablename__ = "message_translation"
+
+    message_id: int = Field(primary_key=True, foreign_key="message.id")
+    target_lang: str = Field(primary_key=True, max_length=16)
+
+    translated_text: str
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,15 @@
+# app/models/story_band.py
+from datetime import datetime
+
+from sqlmodel import SQLModel, Field
+
+
+# MinHash LSH buckets: one row per (band hash, story) so new posts find candidate
+# stories with an indexed lookup instead of comparing against the whole retention window
+class StoryBand(SQLModel, table=True):
+    __tablename__ = "story_band"
+
+    band_key: str = Field(primary_key=True, max_length=24)
+    story_id: str = Field(primary_key=True, max_length=32, index=True)
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
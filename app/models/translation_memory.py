@@ -0,0 +1,20 @@
+# app/models/translation_memory.py
+from datetime import datetime
+
+from sqlmodel import SQLModel, Field
+
+
+# Translations keyed by normalized source text hash, language pair and model
+class TranslationMemoryEntry(SQLModel, table=True):
+    __tablename__ = "translation_memory"
+
+    text_hash: str = Field(primary_key=True, max_length=64)
+    source_lang: str = Field(primary_key=True, max_length=16)
+    target_lang: str = Field(primary_key=True, max_length=16)
+    model_name: str = Field(primary_key=True, max_length=128)
+
+    translation: str
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Refreshed on every hit; drives age/size eviction
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, index=True)
@@ -0,0 +1,46 @@
+# app/services/batching.py
+from typing import Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+def estimate_tokens(text: str | None) -> int:
+    """
+    Cheap token estimate (~4 UTF-8 bytes per token).
+    Errs on the high side for non-Latin scripts, which is the safe direction for budgets.
+    """
+    if not text:
+        return 1
+    return len(text.encode("utf-8")) // 4 + 1
+
+
+def pack_batches(
+    items: Sequence[T],
+    *,
+    cost: Callable[[T], int],
+    token_budget: int,
+    max_items: int,
+) -> List[List[T]]:
+    """
+    Greedily pack items, in order, into batches of at most token_budget estimated tokens
+    and max_items items. An item above the budget on its own gets a batch of its own.
+    A token_budget <= 0 falls back to fixed batches of max_items.
+    """
+    max_items = max(1, max_items)
+    if token_budget <= 0:
+        return [list(items[i:i + max_items]) for i in range(0, len(items), max_items)]
+
+    batches: List[List[T]] = []
+    current: List[T] = []
+    current_tokens = 0
+    for item in items:
+        item_tokens = cost(item)
+        if current and (current_tokens + item_tokens > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(item)
+        current_tokens += item_tokens
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,145 @@
+# app/services/boilerplate.py
+from collections import Counter
+from math import ceil
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import select
+
+from app.config import get_settings
+from app.database import get_session
+from app.models.message import Message
+from app.services.dedupe import content_hash
+
+# Longest prefix/suffix block (in non-empty lines) considered as boilerplate
+_MAX_BLOCK_LINES = 6
+# A block must recur in at least this many posts, whatever the share
+_MIN_POSTS = 5
+
+# channel -> (prefix lines, suffix lines), each a tuple of stripped lines
+Boilerplate = Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+
+def _content_lines(text: str) -> List[Tuple[int, int, str]]:
+    """
+    Non-empty lines of text as (start offset, end offset, stripped line).
+    """
+    lines: List[Tuple[int, int, str]] = []
+    pos = 0
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if stripped:
+            lines.append((pos, pos + len(line), stripped))
+        pos += len(line) + 1
+    return lines
+
+
+def _recurring_block(samples: List[List[str]], *, suffix: bool, min_share: float) -> Tuple[str, ...]:
+    """
+    Longest run of leading (or trailing) lines shared by enough samples.
+    At least one line of each post is always left as content.
+    """
+    counts: Counter = Counter()
+    for lines in samples:
+        for k in range(1, min(_MAX_BLOCK_LINES, len(lines) - 1) + 1):
+            counts[tuple(lines[-k:] if suffix else lines[:k])] += 1
+    threshold = max(_MIN_POSTS, ceil(min_share * len(samples)))
+    best: Tuple[str, ...] = ()
+    for block, count in counts.items():
+        if count >= threshold and len(block) > len(best):
+            best = block
+    return best
+
+
+def learn_boilerplate(
+    messages: List[dict],
+    known: Optional[Dict[str, Boilerplate]] = None,
+) -> Dict[str, Boilerplate]:
+    """
+    Learn recurring per-channel prefix/suffix blocks from stored history plus the
+    current messages. Channels already in known are not learned again.
+    Returns the updated mapping.
+    """
+    settings = get_settings()
+    known = dict(known or {})
+    current: Dict[str, List[str]] = {}
+    for msg in messages:
+        channel = msg.get("channel")
+        if channel and channel not in known:
+            current.setdefault(channel, []).append(msg.get("text") or "")
+    if not current:
+        return known
+
+    with get_session() as session:
+        for channel, texts in current.items():
+            stmt = (
+                select(Message.raw_text)
+                .where(Message.channel == channel)
+                .order_by(Message.id.desc())
+                .limit(settings.boilerplate_sample_size)
+            )
+            history = list(session.exec(stmt).all())
+            samples = [
+                [line for _start, _end, line in _content_lines(text)]
+                for text in history + texts
+            ]
+            known[channel] = (
+                _recurring_block(samples, suffix=False, min_share=settings.boilerplate_min_share),
+                _recurring_block(samples, suffix=True, min_share=settings.boilerplate_min_share),
+            )
+    return known
+
+
+def split_boilerplate(text: str, boilerplate: Boilerplate) -> Tuple[str, str, str]:
+    """
+    Split text into (head, core, tail) so that head + core + tail == text.
+    head/tail hold the channel's prefix/suffix block when the post carries it.
+    """
+    prefix, suffix = boilerplate
+    lines = _content_lines(text)
+    start, end = 0, len(lines)
+    if prefix and tuple(line for _s, _e, line in lines[:len(prefix)]) == prefix:
+        start = len(prefix)
+    if suffix and len(lines) - len(suffix) > start and tuple(line for _s, _e, line in lines[-len(suffix):]) == suffix:
+        end = len(lines) - len(suffix)
+    if start >= end or (start == 0 and end == len(lines)):
+        return "", text, ""
+    core_start = lines[start][0]
+    core_end = lines[end - 1][1]
+    return text[:core_start], text[core_start:core_end], text[core_end:]
+
+
+def strip_boilerplate(messages: List[dict], patterns: Dict[str, Boilerplate]) -> int:
+    """
+    Replace each message text by its core before the AI stages, keeping the removed
+    head/tail on the message for restore_boilerplate. Returns the number of chars removed.
+    """
+    removed = 0
+    for msg in messages:
+        boilerplate = patterns.get(msg.get("channel") or "")
+        text = msg.get("text") or ""
+        if not boilerplate or not text:
+            continue
+        head, core, tail = split_boilerplate(text, boilerplate)
+        if not head and not tail:
+            continue
+        msg["text"] = core
+        msg["boilerplate_head"] = head
+        msg["boilerplate_tail"] = tail
+        # Reposts carrying another channel's footer hash the same
+        msg["content_hash"] = content_hash(core)
+        removed += len(head) + len(tail)
+    return removed
+
+
+def restore_boilerplate(messages: List[dict]) -> None:
+    """
+    Re-attach stripped head/tail blocks, untranslated, to text and translated_text.
+    """
+    for msg in messages:
+        head = msg.pop("boilerplate_head", "")
+        tail = msg.pop("boilerplate_tail", "")
+        if not head and not tail:
+            continue
+        msg["text"] = head + (msg.get("text") or "") + tail
+        if msg.get("translated_text"):
+            msg["translated_text"] = head + msg["translated_text"] + tail
@@ -0,0 +1,39 @@
+# app/services/cache_eviction.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect, tuple_
+from sqlmodel import select, delete, func
+
+from app.database import get_session
+
+_DELETE_CHUNK = 500
+
+
+def evict_least_recently_used(model, max_age_days: int, max_rows: int) -> int:
+    """
+    Drop the rows of a cache table (model with a last_used_at column) unused for
+    max_age_days, then the least recently used ones above max_rows. Ties on
+    last_used_at (a whole batch refreshed at once) are broken by primary key, so
+    exactly the surplus is removed. Returns the number of deleted rows.
+    """
+    deleted = 0
+    key_columns = list(inspect(model).primary_key)
+    with get_session() as session:
+        if max_age_days > 0:
+            cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+            result = session.exec(delete(model).where(model.last_used_at < cutoff))
+            deleted += result.rowcount or 0
+        if max_rows > 0:
+            total = session.exec(select(func.count()).select_from(model)).one()
+            if total > max_rows:
+                surplus = session.exec(
+                    select(*key_columns)
+                    .order_by(model.last_used_at, *key_columns)
+                    .limit(total - max_rows)
+                ).all()
+                for i in range(0, len(surplus), _DELETE_CHUNK):
+                    keys = [tuple(row) for row in surplus[i:i + _DELETE_CHUNK]]
+                    result = session.exec(delete(model).where(tuple_(*key_columns).in_(keys)))
+                    deleted += result.rowcount or 0
+        session.commit()
+    return deleted
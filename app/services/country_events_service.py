@@ -1,28 +1,53 @@
 from datetime import date, datetime, timedelta
 from typing import List, Optional, Dict, Tuple
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.daily_rollup import DailyRollup
 from app.models.message import Message
 from app.api.filters import COUNTRY_ALIASES, COUNTRY_COORDS, normalize_country_names
 from app.api.models_country import CountryStatus, ActiveCountriesResponse, CountryActivity, CountryEventsResponse, EventMessage, ZoneEvents
+from app.services.lazy_translation import ensure_translations, ensure_translations_async
 
 
-def _apply_sources_labels_event_filters(stmt, sources, labels, event_types):
+def _apply_sources_labels_event_filters(stmt, sources, labels, event_types, model=Message):
     if sources:
-        stmt = stmt.where(Message.source.in_(sources))
+        stmt = stmt.where(model.source.in_(sources))
     if labels:
-        stmt = stmt.where(Message.label.in_(labels))
+        stmt = stmt.where(model.label.in_(labels))
     if event_types:
-        stmt = stmt.where(Message.event_type.in_(event_types))
+        stmt = stmt.where(model.event_type.in_(event_types))
     return stmt
 
 
-def _build_event_messages(items: List[Message]) -> List[EventMessage]:
+def _collapse_stories(msgs: List[Message]) -> Tuple[List[Message], Dict[int, Tuple[int, int]]]:
+    # Keep the first report of each story per zone; id -> (messages, distinct sources)
+    groups: Dict[tuple, List[Message]] = {}
+    for m in msgs:
+        key = (m.region, m.location, m.story_id) if m.story_id else ("message", m.id)
+        groups.setdefault(key, []).append(m)
+    kept: List[Message] = []
+    counts: Dict[int, Tuple[int, int]] = {}
+    for members in groups.values():
+        first = min(members, key=lambda m: (m.event_timestamp or m.created_at, m.id))
+        kept.append(first)
+        counts[first.id] = (len(members), len({m.channel or m.source for m in members}))
+    return kept, counts
+
+
+def _build_event_messages(
+    items: List[Message],
+    translations: Optional[Dict[int, str]] = None,
+    story_counts: Optional[Dict[int, Tuple[int, int]]] = None,
+) -> List[EventMessage]:
     event_messages: List[EventMessage] = []
     for m in items:
         url = None
         if m.channel and m.telegram_message_id:
             url = f"https://t.me/{m.channel}/{m.telegram_message_id}"
-        full_text = (m.translated_text or m.raw_text or "").strip()
+        if translations is not None:
+            full_text = (translations.get(m.id) or m.raw_text or "").strip()
+        else:
+            full_text = (m.translated_text or m.raw_text or "").strip()
         preview = full_text[:277] + "..." if len(full_text) > 280 else full_text
         event_messages.append(
             EventMessage(
@@ -37,12 +62,18 @@ def _build_event_messages(items: List[Message]) -> List[EventMessage]:
                 url=url,
                 translated_text=full_text,
                 preview=preview,
+                story_id=m.story_id,
+                sources_count=story_counts[m.id][1] if story_counts and m.id in story_counts else 1,
             )
         )
     return event_messages
 
 
-def _build_zones_payload(msgs: List[Message]) -> List[ZoneEvents]:
+def _build_zones_payload(
+    msgs: List[Message],
+    translations: Optional[Dict[int, str]] = None,
+    story_counts: Optional[Dict[int, Tuple[int, int]]] = None,
+) -> List[ZoneEvents]:
     buckets: Dict[Tuple[Optional[str], Optional[str]], List[Message]] = {}
     for m in msgs:
         key = (m.region, m.location)
@@ -53,8 +84,9 @@ def _build_zones_payload(msgs: List[Message]) -> List[ZoneEvents]:
             ZoneEvents(
                 region=region,
                 location=location,
-                messages_count=len(items),
-                messages=_build_event_messages(items),
+                # Collapsed stories still count every message they stand for
+                messages_count=sum(story_counts[m.id][0] for m in items) if story_counts else len(items),
+                messages=_build_event_messages(items, translations, story_counts),
             )
         )
     zones_payload.sort(key=lambda z: z.messages_count, reverse=True)
@@ -69,10 +101,9 @@ def get_active_countries_service(
     event_types: Optional[List[str]] = None,
     session: Session = None,
 ) -> ActiveCountriesResponse:
+    # Reads the daily rollup (one row per day and filter combination), not the messages
     from sqlmodel import func
-    from sqlmodel import or_
     ignored_countries = set()
-    # Helper to apply optional filters consistently
 
     def add_ignored_country(raw_country: Optional[str]) -> None:
         if not raw_country:
@@ -87,114 +118,35 @@ def get_active_countries_service(
             # Country not in aliases/coords: mark as non-georeferenced
             ignored_countries.add(country)
 
-    if date_filter:
-        # Aggregate counts and last dates per country for each requested day
-        all_stats = {}
-        for d in date_filter:
-            start_dt = datetime.combine(d, datetime.min.time())
-            end_dt = datetime.combine(d, datetime.max.time())
-            stmt = (
-                select(
-                    Message.country_norm,
-                    func.count().label("count"),
-                    func.max(Message.event_timestamp).label("last_date")
-                )
-                .where(
-                    Message.event_timestamp >= start_dt,
-                    Message.event_timestamp <= end_dt,
-                    Message.country_norm.is_not(None)
-                )
-            )
-            stmt = _apply_sources_labels_event_filters(stmt, sources, labels, event_types).group_by(Message.country_norm)
-            for country_norm, count, last_date in session.exec(stmt):
-                if country_norm in COUNTRY_COORDS:
-                    if country_norm not in all_stats:
-                        all_stats[country_norm] = {"count": 0, "last_date": last_date}
-                    all_stats[country_norm]["count"] += count
-                    if last_date and (all_stats[country_norm]["last_date"] is None or last_date > all_stats[country_norm]["last_date"]):
-                        all_stats[country_norm]["last_date"] = last_date
-        # Track non-normalized countries for those dates (same day window)
-        date_ranges = []
-        for d in date_filter:
-            start_dt = datetime.combine(d, datetime.min.time())
-            end_dt = datetime.combine(d, datetime.max.time())
-            date_ranges.append((start_dt, end_dt))
-        stmt_ignored = select(Message.country).where(
-            Message.country_norm.is_(None),
-            Message.country.is_not(None)
+    def in_window(stmt):
+        if date_filter:
+            stmt = stmt.where(DailyRollup.day.in_(date_filter))
+        elif days is not None:
+            # Rolling window at day granularity: the first day is counted whole
+            start_day = (datetime.utcnow() - timedelta(days=days)).date()
+            stmt = stmt.where(DailyRollup.day >= start_day)
+        return _apply_sources_labels_event_filters(stmt, sources, labels, event_types, model=DailyRollup)
+
+    stmt = in_window(
+        select(
+            DailyRollup.country_norm,
+            func.sum(DailyRollup.count).label("count"),
+            func.max(DailyRollup.last_timestamp).label("last_date")
         )
-        if date_ranges:
-            date_clauses = [
-                (Message.event_timestamp >= start_dt) & (Message.event_timestamp <= end_dt)
-                for start_dt, end_dt in date_ranges
-            ]
-            stmt_ignored = stmt_ignored.where(or_(*date_clauses))
-        stmt_ignored = _apply_sources_labels_event_filters(stmt_ignored, sources, labels, event_types)
-        for row in session.exec(stmt_ignored):
-            add_ignored_country(row[0])
-        stats = all_stats
-    else:
-        if days is None:
-            # No date filter: aggregate across all available events
-            stmt = (
-                select(
-                    Message.country_norm,
-                    func.count().label("count"),
-                    func.max(Message.event_timestamp).label("last_date")
-                )
-                .where(
-                    Message.event_timestamp.is_not(None),
-                    Message.country_norm.is_not(None)
-                )
-            )
-            stmt = _apply_sources_labels_event_filters(stmt, sources, labels, event_types).group_by(Message.country_norm)
-            stats = {}
-            for country_norm, count, last_date in session.exec(stmt):
-                if country_norm in COUNTRY_COORDS:
-                    stats[country_norm] = {"count": count, "last_date": last_date.date() if last_date else None}
-            stmt_ignored = (
-                select(Message.country)
-                .where(
-                    Message.event_timestamp.is_not(None),
-                    Message.country_norm.is_(None),
-                    Message.country.is_not(None)
-                )
-            )
-            stmt_ignored = _apply_sources_labels_event_filters(stmt_ignored, sources, labels, event_types)
-            for row in session.exec(stmt_ignored):
-                add_ignored_country(row[0])
-        else:
-            # Aggregate counts and last dates within a rolling window
-            now = datetime.utcnow()
-            start_dt = now - timedelta(days=days)
-            stmt = (
-                select(
-                    Message.country_norm,
-                    func.count().label("count"),
-                    func.max(Message.event_timestamp).label("last_date")
-                )
-                .where(
-                    Message.event_timestamp >= start_dt,
-                    Message.country_norm.is_not(None)
-                )
-            )
-            stmt = _apply_sources_labels_event_filters(stmt, sources, labels, event_types).group_by(Message.country_norm)
-            stats = {}
-            for country_norm, count, last_date in session.exec(stmt):
-                if country_norm in COUNTRY_COORDS:
-                    stats[country_norm] = {"count": count, "last_date": last_date.date() if last_date else None}
-            # Track non-normalized countries in the same window
-            stmt_ignored = (
-                select(Message.country)
-                .where(
-                    Message.event_timestamp >= start_dt,
-                    Message.country_norm.is_(None),
-                    Message.country.is_not(None)
-                )
-            )
-            stmt_ignored = _apply_sources_labels_event_filters(stmt_ignored, sources, labels, event_types)
-            for row in session.exec(stmt_ignored):
-                add_ignored_country(row[0])
+        .where(DailyRollup.country_norm != "")
+    ).group_by(DailyRollup.country_norm)
+    stats = {}
+    for country_norm, count, last_date in session.exec(stmt):
+        if country_norm in COUNTRY_COORDS:
+            stats[country_norm] = {"count": int(count), "last_date": last_date}
+    # Track non-normalized countries in the same window
+    stmt_ignored = in_window(
+        select(DailyRollup.country_raw)
+        .where(DailyRollup.country_norm == "", DailyRollup.country_raw != "")
+        .distinct()
+    )
+    for country_raw in session.exec(stmt_ignored):
+        add_ignored_country(country_raw)
 
     # Format and sort the response payload
     result = [
@@ -209,13 +161,44 @@ def get_active_countries_service(
     return ActiveCountriesResponse(countries=result, ignored_countries=sorted(ignored_countries))
 
 
-def get_country_latest_events_service(
+def _shown_messages(msgs: List[Message], collapse_stories: bool) -> Tuple[List[Message], Optional[Dict[int, Tuple[int, int]]]]:
+    if collapse_stories:
+        return _collapse_stories(msgs)
+    return msgs, None
+
+
+def _fallback_date(msgs: List[Message]) -> date:
+    # Pick a date for the response when no target_date is supplied
+    if msgs:
+        return max(m.created_at for m in msgs).date()
+    return datetime.utcnow().date()
+
+
+def _build_response(
+    session: Session,
+    msgs: List[Message],
+    country: str,
+    date_value: date,
+    collapse_stories: bool,
+    target_language: Optional[str],
+) -> CountryEventsResponse:
+    shown, story_counts = _shown_messages(msgs, collapse_stories)
+    # Translate on first view (batched for the whole request, shown messages only) and persist
+    translations = ensure_translations(session, shown, target_language)
+    return CountryEventsResponse(
+        date=date_value,
+        country=country,
+        zones=_build_zones_payload(shown, translations, story_counts),
+    )
+
+
+def _country_latest_events(
+    session: Session,
     country: str,
     sources: Optional[List[str]] = None,
     labels: Optional[List[str]] = None,
     event_types: Optional[List[str]] = None,
-    session: Session = None
-) -> CountryEventsResponse:
+) -> Tuple[List[Message], date]:
     norm_country = country
     if not norm_country or norm_country not in COUNTRY_COORDS:
         raise ValueError("Pays non normalisé ou non géoréférencé")
@@ -240,13 +223,20 @@ def get_country_latest_events_service(
         Message.country_norm == norm_country
     )
     stmt = _apply_sources_labels_event_filters(stmt, sources, labels, event_types)
-    msgs = session.exec(stmt).all()
-    zones_payload = _build_zones_payload(msgs)
-    return CountryEventsResponse(
-        date=target_date,
-        country=country,
-        zones=zones_payload,
-    )
+    return list(session.exec(stmt).all()), target_date
+
+
+def get_country_latest_events_service(
+    country: str,
+    sources: Optional[List[str]] = None,
+    labels: Optional[List[str]] = None,
+    event_types: Optional[List[str]] = None,
+    session: Session = None,
+    target_language: Optional[str] = None,
+    collapse_stories: bool = False,
+) -> CountryEventsResponse:
+    msgs, target_date = _country_latest_events(session, country, sources, labels, event_types)
+    return _build_response(session, msgs, country, target_date, collapse_stories, target_language)
 
 
 def get_countries_activity_service(
@@ -276,13 +266,13 @@ def get_countries_activity_service(
     return result
 
 
-def get_non_georef_events_service(
+def _non_georef_events(
+    session: Session,
     target_date: Optional[date],
     sources: Optional[List[str]] = None,
     labels: Optional[List[str]] = None,
     event_types: Optional[List[str]] = None,
-    session: Session = None,
-) -> CountryEventsResponse:
+) -> Tuple[List[Message], date]:
     # Return events with no country assigned (country is None or empty).
     if target_date is not None:
         start_dt = datetime.combine(target_date, datetime.min.time())
@@ -294,35 +284,32 @@ def get_non_georef_events_service(
         )
     else:
         stmt = select(Message).where((Message.country.is_(None)) | (Message.country == ""))
-    if sources:
-        stmt = stmt.where(Message.source.in_(sources))
-    if labels:
-        stmt = stmt.where(Message.label.in_(labels))
-    if event_types:
-        stmt = stmt.where(Message.event_type.in_(event_types))
-    msgs = session.exec(stmt).all()
-    zones_payload = _build_zones_payload(msgs)
-    if target_date is not None:
-        date_value = target_date
-    elif msgs:
-        date_value = max(m.created_at for m in msgs).date()
-    else:
-        date_value = datetime.utcnow().date()
-    return CountryEventsResponse(
-        date=date_value,
-        country="Sans pays",
-        zones=zones_payload,
-    )
+    stmt = _apply_sources_labels_event_filters(stmt, sources, labels, event_types)
+    msgs = list(session.exec(stmt).all())
+    return msgs, target_date if target_date is not None else _fallback_date(msgs)
 
 
-def get_country_events_service(
-    country: str,
+def get_non_georef_events_service(
     target_date: Optional[date],
     sources: Optional[List[str]] = None,
     labels: Optional[List[str]] = None,
     event_types: Optional[List[str]] = None,
-    session: Session = None
+    session: Session = None,
+    target_language: Optional[str] = None,
+    collapse_stories: bool = False,
 ) -> CountryEventsResponse:
+    msgs, date_value = _non_georef_events(session, target_date, sources, labels, event_types)
+    return _build_response(session, msgs, "Sans pays", date_value, collapse_stories, target_language)
+
+
+def _country_events(
+    session: Session,
+    country: str,
+    target_date: Optional[date],
+    sources: Optional[List[str]] = None,
+    labels: Optional[List[str]] = None,
+    event_types: Optional[List[str]] = None,
+) -> Tuple[List[Message], date]:
     norm_country = country
     if not norm_country or norm_country not in COUNTRY_COORDS:
         raise ValueError("Pays non normalisé ou non géoréférencé")
@@ -340,23 +327,102 @@ def get_country_events_service(
         stmt = select(Message).where(
             Message.country_norm == norm_country
         )
-    if sources:
-        stmt = stmt.where(Message.source.in_(sources))
-    if labels:
-        stmt = stmt.where(Message.label.in_(labels))
-    if event_types:
-        stmt = stmt.where(Message.event_type.in_(event_types))
-    msgs = session.exec(stmt).all()
-    zones_payload = _build_zones_payload(msgs)
-    # Pick a date for the response when no target_date is supplied
-    if target_date is not None:
-        date_value = target_date
-    elif msgs:
-        date_value = max(m.created_at for m in msgs).date()
-    else:
-        date_value = datetime.utcnow().date()
+    stmt = _apply_sources_labels_event_filters(stmt, sources, labels, event_types)
+    msgs = list(session.exec(stmt).all())
+    return msgs, target_date if target_date is not None else _fallback_date(msgs)
+
+
+def get_country_events_service(
+    country: str,
+    target_date: Optional[date],
+    sources: Optional[List[str]] = None,
+    labels: Optional[List[str]] = None,
+    event_types: Optional[List[str]] = None,
+    session: Session = None,
+    target_language: Optional[str] = None,
+    collapse_stories: bool = False,
+) -> CountryEventsResponse:
+    msgs, date_value = _country_events(session, country, target_date, sources, labels, event_types)
+    return _build_response(session, msgs, country, date_value, collapse_stories, target_language)
+
+
+# Async variants for the async API session: queries run on the async connection
+# (run_sync), on-demand translation in a worker thread
+
+async def _build_response_async(
+    session: AsyncSession,
+    msgs: List[Message],
+    country: str,
+    date_value: date,
+    collapse_stories: bool,
+    target_language: Optional[str],
+) -> CountryEventsResponse:
+    shown, story_counts = _shown_messages(msgs, collapse_stories)
+    translations = await ensure_translations_async(session, shown, target_language)
     return CountryEventsResponse(
         date=date_value,
         country=country,
-        zones=zones_payload,
+        zones=_build_zones_payload(shown, translations, story_counts),
+    )
+
+
+async def get_active_countries_service_async(
+    days: Optional[int] = None,
+    date_filter: Optional[List[date]] = None,
+    sources: Optional[List[str]] = None,
+    labels: Optional[List[str]] = None,
+    event_types: Optional[List[str]] = None,
+    session: AsyncSession = None,
+) -> ActiveCountriesResponse:
+    return await session.run_sync(
+        lambda s: get_active_countries_service(
+            days=days, date_filter=date_filter, sources=sources, labels=labels, event_types=event_types, session=s
+        )
     )
+
+
+async def get_country_latest_events_service_async(
+    country: str,
+    sources: Optional[List[str]] = None,
+    labels: Optional[List[str]] = None,
+    event_types: Optional[List[str]] = None,
+    session: AsyncSession = None,
+    target_language: Optional[str] = None,
+    collapse_stories: bool = False,
+) -> CountryEventsResponse:
+    msgs, target_date = await session.run_sync(_country_latest_events, country, sources, labels, event_types)
+    return await _build_response_async(session, msgs, country, target_date, collapse_stories, target_language)
+
+
+async def get_countries_activity_service_async(
+    target_date: date,
+    session: AsyncSession,
+) -> List[CountryActivity]:
+    return await session.run_sync(lambda s: get_countries_activity_service(target_date=target_date, session=s))
+
+
+async def get_non_georef_events_service_async(
+    target_date: Optional[date],
+    sources: Optional[List[str]] = None,
+    labels: Optional[List[str]] = None,
+    event_types: Optional[List[str]] = None,
+    session: AsyncSession = None,
+    target_language: Optional[str] = None,
+    collapse_stories: bool = False,
+) -> CountryEventsResponse:
+    msgs, date_value = await session.run_sync(_non_georef_events, target_date, sources, labels, event_types)
+    return await _build_response_async(session, msgs, "Sans pays", date_value, collapse_stories, target_language)
+
+
+async def get_country_events_service_async(
+    country: str,
+    target_date: Optional[date],
+    sources: Optional[List[str]] = None,
+    labels: Optional[List[str]] = None,
+    event_types: Optional[List[str]] = None,
+    session: AsyncSession = None,
+    target_language: Optional[str] = None,
+    collapse_stories: bool = False,
+) -> CountryEventsResponse:
+    msgs, date_value = await session.run_sync(_country_events, country, target_date, sources, labels, event_types)
+    return await _build_response_async(session, msgs, country, date_value, collapse_stories, target_language)
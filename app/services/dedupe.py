@@ -1,15 +1,32 @@
 # app/services/dedupe.py
-from typing import List, Dict
+from typing import List, Dict, Optional, Set
+import hashlib
 
+from app.services.enrichment import normalize_text
 
-def dedupe_messages(messages: List[Dict]) -> List[Dict]:
+
+def content_hash(text: Optional[str]) -> Optional[str]:
+    """
+    Exact-duplicate key for a post: sha256 of its normalized, case-folded text.
+    None for empty texts, which are never treated as duplicates.
+    """
+    norm = normalize_text(text or "").casefold()
+    if not norm:
+        return None
+    return hashlib.sha256(norm.encode("utf-8")).hexdigest()
+
+
+def dedupe_messages(messages: List[Dict], seen: Optional[Set[bytes]] = None) -> List[Dict]:
     """
     Simple dedupe logic:
     - if title exists: key = (source, channel, country, title)
     - otherwise: key = (source, channel, country, translated_text/raw_text)
     Keeps the first occurrence and drops the rest.
+    Pass the same `seen` set across calls to dedupe a stream of batches; it holds
+    16-byte key digests, not the texts.
     """
-    seen = set()
+    if seen is None:
+        seen = set()
     result: List[Dict] = []
 
     for msg in messages:
@@ -28,9 +45,10 @@ def dedupe_messages(messages: List[Dict]) -> List[Dict]:
             key = ("text", source, channel, country, text)
 
         # Keep the first seen message for each key
-        if key in seen:
+        digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+        if digest in seen:
             continue
-        seen.add(key)
+        seen.add(digest)
         result.append(msg)
 
     return result
@@ -1,6 +1,7 @@
 # app/services/enrichment.py
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from functools import lru_cache
 from pathlib import Path
@@ -10,13 +11,15 @@ import re
 import unicodedata
 
 from app.config import get_settings
+from app.services.batching import estimate_tokens, pack_batches
+from app.services.gazetteer import infer_place
 try:
     import pycountry
 except Exception:  # pragma: no cover - optional dependency at runtime
     pycountry = None
 
 
-AI_FIELDS: List[str] = ["country", "region", "location", "title"]
+AI_FIELDS: List[str] = ["country", "region", "location", "title", "event_type"]
 
 
 def normalize_text(text: str) -> str:
@@ -47,14 +50,6 @@ def _strip_emoji_prefix(value: str) -> str:
     return value.strip()
 
 
-def _alias_matches(text_lower: str, alias: str) -> Optional[int]:
-    pattern = r"(?<!\w)" + re.escape(alias) + r"(?!\w)"
-    match = re.search(pattern, text_lower)
-    if not match:
-        return None
-    return match.start()
-
-
 @lru_cache(maxsize=1)
 def _pycountry_names() -> List[str]:
     if pycountry is None:
@@ -71,6 +66,138 @@ def _pycountry_names() -> List[str]:
     return sorted(unique, key=lambda s: (-len(s), s))
 
 
+@lru_cache(maxsize=1)
+def _load_event_lexicon() -> Dict[str, List[str]]:
+    """
+    Event type -> keywords/phrases (lowercase, several languages). A trailing "*" on a
+    word matches any word ending ("обстрел*" -> "обстрелы", "обстрелом").
+    Types are listed by priority, which breaks ties between equally matched types.
+    """
+    base_dir = Path(__file__).resolve().parents[2]
+    lexicon_path = base_dir / "static" / "data" / "event_types.json"
+    return json.loads(lexicon_path.read_text(encoding="utf-8"))
+
+
+def _keyword_pattern(term: str) -> str:
+    return r"\s+".join(
+        re.escape(word[:-1]) + r"\w*" if word.endswith("*") else re.escape(word)
+        for word in term.split()
+    )
+
+
+@dataclass(frozen=True)
+class _TextMatcher:
+    pattern: re.Pattern
+    aliases: Dict[str, str]
+    # lowercased pycountry name -> (priority rank, display name)
+    names: Dict[str, tuple[int, str]]
+    # exact event keyword -> event type
+    events: Dict[str, str]
+    # wildcard event keywords, checked only when the exact lookup misses
+    event_wildcards: tuple[tuple[re.Pattern, str], ...]
+
+
+@lru_cache(maxsize=1)
+def _text_matcher() -> _TextMatcher:
+    """
+    Compile country aliases + pycountry names (group 1) and event keywords (group 2)
+    into a single alternation, built once.
+    Country alternatives are ordered by priority (aliases in file order, then pycountry
+    names longest first), so at any position the captured term is the one the per-term
+    scan would have preferred. Event keywords are only tried where no country matches.
+    """
+    aliases, _coords = _load_country_data()
+    # Matching runs on lowercased text, so aliases with uppercase letters can never match
+    alias_terms = {alias: canonical for alias, canonical in aliases.items() if alias and alias == alias.lower()}
+    name_terms: Dict[str, tuple[int, str]] = {}
+    for rank, name in enumerate(_pycountry_names()):
+        name_terms.setdefault(name.lower(), (rank, name))
+    terms = list(alias_terms) + [t for t in name_terms if t not in alias_terms]
+
+    event_terms: Dict[str, str] = {}
+    for event_type, keywords in _load_event_lexicon().items():
+        for keyword in keywords:
+            event_terms.setdefault(keyword.strip().lower(), event_type)
+    keywords = sorted(event_terms, key=lambda t: (-len(t), t))
+    event_wildcards = tuple(
+        (re.compile(_keyword_pattern(k)), event_terms[k]) for k in keywords if "*" in k
+    )
+
+    # Zero-width lookahead so every start position is scanned, including overlapping mentions
+    pattern = re.compile(
+        r"(?<!\w)(?=(?:(" + "|".join(re.escape(t) for t in terms) + r")"
+        r"|(" + "|".join(_keyword_pattern(k) for k in keywords) + r"))(?!\w))"
+    )
+    return _TextMatcher(
+        pattern=pattern,
+        aliases=alias_terms,
+        names=name_terms,
+        events={k: t for k, t in event_terms.items() if "*" not in k},
+        event_wildcards=event_wildcards,
+    )
+
+
+def find_country_mentions(text: str) -> List[tuple[int, str, float]]:
+    """
+    Return every country mention in a single scan as (position, country, confidence),
+    ordered by position. Aliases score 0.95, bare pycountry names 0.7.
+    """
+    if not text:
+        return []
+    matcher = _text_matcher()
+    mentions: List[tuple[int, str, float]] = []
+    for match in matcher.pattern.finditer(text.lower()):
+        term = match.group(1)
+        if term is None:
+            continue
+        canonical = matcher.aliases.get(term)
+        if canonical is not None:
+            mentions.append((match.start(), _strip_emoji_prefix(canonical), 0.95))
+        else:
+            mentions.append((match.start(), matcher.names[term][1], 0.7))
+    return mentions
+
+
+def _scan_text(text: str) -> tuple[Optional[str], float, Dict[str, int]]:
+    """
+    Single pass over text for the country and event keywords.
+    Returns (country_name, confidence, {event_type: keyword hits}).
+    """
+    matcher = _text_matcher()
+    first_alias: Optional[str] = None
+    first_name: Optional[tuple[int, str]] = None
+    event_hits: Dict[str, int] = {}
+    for match in matcher.pattern.finditer(text.lower()):
+        term = match.group(1)
+        if term is None:
+            keyword = match.group(2)
+            event_type = matcher.events.get(keyword)
+            if event_type is None:
+                event_type = next(
+                    (t for rx, t in matcher.event_wildcards if rx.fullmatch(keyword)), None
+                )
+            if event_type is not None:
+                event_hits[event_type] = event_hits.get(event_type, 0) + 1
+            continue
+        if first_alias is not None:
+            continue
+        canonical = matcher.aliases.get(term)
+        if canonical is not None:
+            # Multiple matches: pick the first alias mention deterministically
+            first_alias = _strip_emoji_prefix(canonical)
+            continue
+        # Fallback to pycountry names: highest priority name wins, not the first mention
+        candidate = matcher.names[term]
+        if first_name is None or candidate < first_name:
+            first_name = candidate
+
+    if first_alias is not None:
+        return first_alias, 0.95, event_hits
+    if first_name is not None:
+        return first_name[1], 0.7, event_hits
+    return None, 0.0, event_hits
+
+
 def infer_country(text: str) -> tuple[Optional[str], float]:
     """
     Try to infer a country name from text using aliases + pycountry.
@@ -78,31 +205,34 @@ def infer_country(text: str) -> tuple[Optional[str], float]:
     """
     if not text:
         return None, 0.0
-    aliases, _coords = _load_country_data()
-    text_lower = text.lower()
+    country, confidence, _events = _scan_text(text)
+    return country, confidence
 
-    matches: List[tuple[int, str]] = []
-    for alias, canonical in aliases.items():
-        pos = _alias_matches(text_lower, alias)
-        if pos is None:
-            continue
-        matches.append((pos, canonical))
-
-    if matches:
-        matches.sort(key=lambda x: x[0])
-        canonical = matches[0][1]
-        if len(matches) == 1:
-            return _strip_emoji_prefix(canonical), 0.95
-        # Multiple matches: pick the first mention deterministically
-        return _strip_emoji_prefix(canonical), 0.95
-
-    # Fallback to pycountry names
-    for name in _pycountry_names():
-        alias = name.lower()
-        if _alias_matches(text_lower, alias) is not None:
-            return name, 0.7
 
-    return None, 0.0
+def _pick_event_type(event_hits: Dict[str, int]) -> tuple[Optional[str], float]:
+    """
+    Most matched event type, ties broken by lexicon order.
+    A clear winner scores 0.9; a tie with another type only 0.6 (left to the AI).
+    """
+    if not event_hits:
+        return None, 0.0
+    order = {t: i for i, t in enumerate(_load_event_lexicon())}
+    ranked = sorted(event_hits.items(), key=lambda kv: (-kv[1], order.get(kv[0], len(order))))
+    best, hits = ranked[0]
+    if len(ranked) > 1 and ranked[1][1] == hits:
+        return best, 0.6
+    return best, 0.9
+
+
+def infer_event_type(text: str) -> tuple[Optional[str], float]:
+    """
+    Classify text into an event type with the keyword lexicon.
+    Returns (event_type, confidence).
+    """
+    if not text:
+        return None, 0.0
+    _country, _confidence, event_hits = _scan_text(text)
+    return _pick_event_type(event_hits)
 
 
 _COORD_REGEX = re.compile(
@@ -152,20 +282,31 @@ def enrich_record(record: Dict[str, str]) -> tuple[Dict[str, Optional[str]], Dic
     original_text = record.get("text") or ""
     text_norm = normalize_text(original_text)
 
-    country, country_conf = infer_country(text_norm)
+    # Country and event type come from the same scan of the text
+    country, country_conf, event_hits = _scan_text(text_norm) if text_norm else (None, 0.0, {})
+    event_type, event_conf = _pick_event_type(event_hits)
     location, location_conf = infer_location(text_norm)
 
+    # Offline gazetteer: explicit coordinates still win for location
+    city, city_conf, region, region_conf = infer_place(text_norm, country)
+    if location is None and city is not None:
+        location, location_conf = city.name, city_conf
+    if country is None and city is not None and city_conf >= 0.9:
+        country, country_conf = city.country, city_conf
+
     fields: Dict[str, Optional[str]] = {
         "country": country,
-        "region": None,
+        "region": region,
         "location": location,
         "title": None,
+        "event_type": event_type,
     }
     confidences: Dict[str, float] = {
         "country": country_conf,
-        "region": 0.0,
+        "region": region_conf,
         "location": location_conf,
         "title": 0.0,
+        "event_type": event_conf,
     }
     return fields, confidences, text_norm
 
@@ -174,7 +315,9 @@ class EnrichmentConfig:
     min_confidence: Dict[str, float] = field(
         default_factory=lambda: {
             "country": 0.9,
+            "region": 0.9,
             "location": 0.9,
+            "event_type": 0.9,
         }
     )
     pipeline_version: str = "1"
@@ -184,6 +327,12 @@ class EnrichmentConfig:
     model_name: Optional[str] = None
     target_language: str = "fr"
     batch_size: int = 20
+    use_cache: bool = True
+    max_concurrency: int = 0
+    token_budget: int = 0
+    repair_retries: Optional[int] = None
+    # Also request translated_text in the same AI call (None = settings.combined_ai_calls)
+    translate: Optional[bool] = None
 
 
 def _get_openai_client(api_key: Optional[str]):
@@ -191,18 +340,15 @@ def _get_openai_client(api_key: Optional[str]):
     return OpenAI(api_key=api_key)
 
 
-def _enrich_subbatch(
+def _request_enrichment(
     items: List[Dict[str, Any]],
     config: EnrichmentConfig,
     api_key: Optional[str],
-) -> List[Dict[str, Optional[str]]]:
+) -> Dict[int, Dict[str, Optional[str]]]:
     """
-    items: [{"id": int, "text": str, "lang": str, "known_fields": {}, "missing_fields": []}]
-    Returns list of dicts with missing fields only (same order as items).
+    One AI call for items. Returns {id: fields} for the ids that came back well-formed
+    (valid JSON carrying every requested field); anything else is left out.
     """
-    if not items:
-        return []
-
     header = (
         "You are an OSINT information extraction system.\n"
         "You will receive one JSON object per line. Each object contains:\n"
@@ -219,10 +365,16 @@ def _enrich_subbatch(
         "- country must be the main impacted country in English, or empty string if uncertain.\n"
         "- region is a large area (province/region), or empty string.\n"
         "- location is a city or specific place, or empty string.\n"
+        f"- event_type must be one of: {', '.join(_load_event_lexicon())}; or empty string.\n"
         "Do NOT repeat known_fields. Do NOT infer fields not requested.\n"
-        "\n"
-        "Inputs:\n"
     )
+    if any(item.get("translate") for item in items):
+        header += (
+            "- If an input has \"translate\": true, also include \"translation\": the full text "
+            f"translated into {config.target_language}. Extract fields from the original text, "
+            "never from the translation.\n"
+        )
+    header += "\nInputs:\n"
 
     body_lines = [json.dumps(item, ensure_ascii=False) for item in items]
     prompt = header + "\n".join(body_lines)
@@ -240,8 +392,9 @@ def _enrich_subbatch(
         raw = str(resp)
 
     lines = [line.strip() for line in raw.splitlines() if line.strip()]
-    id_to_index = {int(it["id"]): idx for idx, it in enumerate(items)}
-    results: List[Dict[str, Optional[str]]] = [dict() for _ in items]
+    missing_by_id = {int(it["id"]): it.get("missing_fields", []) for it in items}
+    translate_ids = {int(it["id"]) for it in items if it.get("translate")}
+    parsed: Dict[int, Dict[str, Optional[str]]] = {}
 
     for line in lines:
         try:
@@ -254,10 +407,13 @@ def _enrich_subbatch(
             obj_id = int(obj["id"])
         except Exception:
             continue
-        if obj_id not in id_to_index:
+        if obj_id not in missing_by_id:
+            continue
+        missing = missing_by_id[obj_id]
+        if any(field not in obj for field in missing):
+            continue
+        if obj_id in translate_ids and not obj.get("translation"):
             continue
-        idx = id_to_index[obj_id]
-        missing = set(items[idx].get("missing_fields", []))
         filtered: Dict[str, Optional[str]] = {}
         for field in missing:
             value = obj.get(field, "")
@@ -265,10 +421,49 @@ def _enrich_subbatch(
                 value = ""
             elif not isinstance(value, str):
                 value = str(value)
+            if field == "event_type" and value not in _load_event_lexicon():
+                value = ""
             filtered[field] = value
-        results[idx] = filtered
+        if obj_id in translate_ids:
+            filtered["translation"] = str(obj["translation"])
+        parsed[obj_id] = filtered
 
-    return results
+    return parsed
+
+
+def _enrich_subbatch(
+    items: List[Dict[str, Any]],
+    config: EnrichmentConfig,
+    api_key: Optional[str],
+) -> List[Dict[str, Optional[str]]]:
+    """
+    items: [{"id": int, "text": str, "lang": str, "known_fields": {}, "missing_fields": []}]
+    Returns list of dicts with missing fields only (same order as items).
+    Ids missing or malformed in the response are re-requested on their own, in smaller
+    follow-up batches, up to config.repair_retries times.
+    """
+    if not items:
+        return []
+
+    parsed = _request_enrichment(items, config, api_key)
+    pending = [it for it in items if int(it["id"]) not in parsed]
+    # None (settings default) is resolved by _resolve_config; direct callers may skip it
+    retries = max(0, config.repair_retries or 0)
+    for attempt in range(1, retries + 1):
+        if not pending:
+            break
+        chunk = max(1, (len(pending) + 1) // 2)
+        print(
+            f"[pipeline] [ENRICH][AI] repair {attempt}/{retries}: "
+            f"{len(pending)} missing id(s), chunk={chunk}"
+        )
+        for i in range(0, len(pending), chunk):
+            parsed.update(_request_enrichment(pending[i:i + chunk], config, api_key))
+        pending = [it for it in pending if int(it["id"]) not in parsed]
+    if pending:
+        print(f"[pipeline] [ENRICH][AI] {len(pending)} id(s) still missing after repair")
+
+    return [parsed.get(int(it["id"]), {}) for it in items]
 
 
 def _resolve_config(config: Optional[EnrichmentConfig]) -> EnrichmentConfig:
@@ -279,6 +474,11 @@ def _resolve_config(config: Optional[EnrichmentConfig]) -> EnrichmentConfig:
             model_name=settings.openai_model,
             target_language=settings.target_language,
             batch_size=settings.batch_size,
+            use_cache=settings.enrichment_cache_enabled,
+            max_concurrency=settings.ai_max_concurrency,
+            token_budget=settings.batch_token_budget,
+            repair_retries=settings.ai_repair_retries,
+            translate=settings.combined_ai_calls and not settings.lazy_translation,
         )
 
     if not config.pipeline_version:
@@ -289,6 +489,14 @@ def _resolve_config(config: Optional[EnrichmentConfig]) -> EnrichmentConfig:
         config.target_language = settings.target_language
     if not config.batch_size:
         config.batch_size = settings.batch_size
+    if not config.max_concurrency:
+        config.max_concurrency = settings.ai_max_concurrency
+    if not config.token_budget:
+        config.token_budget = settings.batch_token_budget
+    if config.repair_retries is None:
+        config.repair_retries = settings.ai_repair_retries
+    if config.translate is None:
+        config.translate = settings.combined_ai_calls and not settings.lazy_translation
     return config
 
 
@@ -296,13 +504,37 @@ def enrich_messages(messages: List[dict], *, config: Optional[EnrichmentConfig]
     """
     Takes a list of dicts with 'text', enriches them in batches.
     Deterministic enrichment runs first; AI is a fallback for missing fields.
+    AI payloads are packed by estimated tokens (config.token_budget, at most batch_size
+    items) and sub-batches run concurrently (config.max_concurrency in flight).
+    With config.translate, 'translated_text' is requested in the same AI call; fields are
+    still extracted from the original text.
     """
     if not messages:
         return messages
 
     config = _resolve_config(config)
     settings = get_settings()
-    print(f"[pipeline] [ENRICH] batch_size={config.batch_size}")
+    print(
+        f"[pipeline] [ENRICH] batch_size={config.batch_size} | token_budget={config.token_budget}"
+        f" | combined_translation={bool(config.translate)}"
+    )
+    use_memory = bool(config.translate) and settings.translation_memory_enabled
+    if config.translate:
+        from app.services.language import detect_languages
+    if use_memory:
+        from app.services.translation_memory import load_translations, source_hash, store_translations
+    if config.use_cache:
+        from app.services.enrichment_cache import (
+            evict_enrichment_cache,
+            load_cached_enrichments,
+            store_enrichments,
+            text_hash,
+        )
+    cache_hits = 0
+    cache_misses = 0
+    # Payloads still missing fields after the deterministic and cache passes (id = message index)
+    ai_items: List[Dict[str, Any]] = []
+    hashes: Dict[int, str] = {}
     total = len(messages)
     for start in range(0, total, config.batch_size):
         end = min(start + config.batch_size, total)
@@ -310,11 +542,16 @@ def enrich_messages(messages: List[dict], *, config: Optional[EnrichmentConfig]
 
         print(f"[pipeline] [ENRICH] batch {start + 1}-{end} / {total} (size={len(sub)})")
 
-        ai_items: List[Dict[str, Any]] = []
-        ai_payloads: List[Dict[str, Any]] = []
+        batch_items: List[Dict[str, Any]] = []
         deterministic_resolved = 0
+        languages: List[Optional[str]] = []
+        if config.translate:
+            languages = detect_languages(
+                [msg.get("text", "") or "" for msg in sub],
+                [msg.get("channel") for msg in sub],
+            )
 
-        for idx, msg in enumerate(sub):
+        for idx, msg in enumerate(sub, start=start):
             fields, confidences, text_norm = enrich_record(msg)
 
             # Apply deterministic values only if confidence is high enough
@@ -332,7 +569,17 @@ def enrich_messages(messages: List[dict], *, config: Optional[EnrichmentConfig]
                 if not (msg.get(field) or "").strip()
             ]
 
-            if not missing_fields:
+            translate = False
+            source_lang = None
+            if config.translate and not msg.get("translated_text"):
+                source_lang = languages[idx - start]
+                if source_lang and source_lang.lower() != config.target_language.lower():
+                    translate = True
+                    source_lang = source_lang.lower()
+                else:
+                    msg["translated_text"] = msg.get("text", "")
+
+            if not missing_fields and not translate:
                 deterministic_resolved += 1
                 if config.debug:
                     print("[pipeline] [ENRICH][AI] AI enrichment skipped: all fields resolved deterministically")
@@ -344,38 +591,151 @@ def enrich_messages(messages: List[dict], *, config: Optional[EnrichmentConfig]
                 "known_fields": {k: msg.get(k) for k in AI_FIELDS if msg.get(k)},
                 "missing_fields": missing_fields,
             }
-            ai_payloads.append(payload)
-            ai_items.append(payload)
-
-        if ai_items and config.ai_client is None and (not settings.openai_api_key or not config.model_name):
-            if config.debug:
-                print("[pipeline] [ENRICH][AI] disabled (missing OpenAI settings).")
-            continue
+            if translate:
+                payload["lang"] = source_lang
+                payload["translate"] = True
+            batch_items.append(payload)
+
+        # Texts already in the translation memory don't need translating again
+        if use_memory:
+            by_lang: Dict[str, List[Dict[str, Any]]] = {}
+            for item in batch_items:
+                if item.get("translate"):
+                    by_lang.setdefault(item["lang"], []).append(item)
+            for lang, lang_items in by_lang.items():
+                found = load_translations(
+                    [source_hash(item["text"]) for item in lang_items],
+                    source_lang=lang,
+                    target_lang=config.target_language,
+                    model_name=config.model_name,
+                )
+                for item in lang_items:
+                    trans = found.get(source_hash(item["text"]))
+                    if trans:
+                        messages[item["id"]]["translated_text"] = trans
+                        del item["translate"]
+            batch_items = [item for item in batch_items if item["missing_fields"] or item.get("translate")]
+
+        # Serve texts already enriched by the AI from the persistent cache
+        if batch_items and config.use_cache:
+            batch_hashes = {item["id"]: text_hash(item["text"]) for item in batch_items}
+            cached = load_cached_enrichments(
+                batch_hashes.values(),
+                pipeline_version=config.pipeline_version,
+                model_name=config.model_name,
+                target_language=config.target_language,
+            )
+            remaining: List[Dict[str, Any]] = []
+            hits = 0
+            for item in batch_items:
+                entry = cached.get(batch_hashes[item["id"]])
+                if not item["missing_fields"]:
+                    # Translation only: nothing to look up
+                    remaining.append(item)
+                    continue
+                if entry is None or any(entry.get(field) is None for field in item["missing_fields"]):
+                    remaining.append(item)
+                    cache_misses += 1
+                    continue
+                hits += 1
+                msg = messages[item["id"]]
+                for field in item["missing_fields"]:
+                    if entry[field]:
+                        msg[field] = entry[field]
+                if item.get("translate"):
+                    # Fields are served from the cache, the AI call only translates
+                    item["known_fields"] = {k: msg.get(k) for k in AI_FIELDS if msg.get(k)}
+                    item["missing_fields"] = []
+                    remaining.append(item)
+            cache_hits += hits
+            hashes.update(batch_hashes)
+            batch_items = remaining
 
         if config.debug:
             print(
-                f"[pipeline] [ENRICH][AI] to_call={len(ai_items)}"
+                f"[pipeline] [ENRICH][AI] to_call={len(batch_items)}"
             )
+        ai_items.extend(batch_items)
 
-        if not ai_items:
-            continue
-
-        # Call AI for the remaining items
-        results = _enrich_subbatch(ai_payloads, config, settings.openai_api_key)
+    if ai_items and config.ai_client is None and (not settings.openai_api_key or not config.model_name):
+        if config.debug:
+            print("[pipeline] [ENRICH][AI] disabled (missing OpenAI settings).")
+        ai_items = []
+
+    def apply_results(items: List[Dict[str, Any]], results) -> None:
+        if config.use_cache:
+            # Unparsed items (empty result) are left out so they are retried next time
+            store_enrichments(
+                {
+                    hashes[item["id"]]: result
+                    for item, result in zip(items, results)
+                    if result and item["missing_fields"]
+                },
+                pipeline_version=config.pipeline_version,
+                model_name=config.model_name,
+                target_language=config.target_language,
+            )
 
-        for item, result in zip(ai_items, results):
+        for item, result in zip(items, results):
             if not isinstance(result, dict) or not result:
                 continue
             missing_fields = item.get("missing_fields", [])
-            msg = sub[item["id"]]
+            msg = messages[item["id"]]
             for field in missing_fields:
                 value = result.get(field, "")
                 if value:
                     msg[field] = value
+            if item.get("translate"):
+                msg["translated_text"] = result["translation"]
+                if use_memory:
+                    store_translations(
+                        {source_hash(item["text"]): result["translation"]},
+                        source_lang=item["lang"],
+                        target_lang=config.target_language,
+                        model_name=config.model_name,
+                    )
+
+    # Pack the remaining payloads by estimated size so long posts don't blow the context
+    ai_batches = pack_batches(
+        ai_items,
+        cost=lambda item: estimate_tokens(item["text"]),
+        token_budget=config.token_budget,
+        max_items=config.batch_size,
+    )
+    if ai_batches:
+        sizes = [len(b) for b in ai_batches]
+        tokens = [sum(estimate_tokens(item["text"]) for item in b) for b in ai_batches]
+        print(
+            f"[pipeline] [ENRICH][AI] sub-batches={len(ai_batches)} | sizes min/avg/max="
+            f"{min(sizes)}/{sum(sizes) / len(sizes):.1f}/{max(sizes)} | est_tokens max={max(tokens)} total={sum(tokens)}"
+        )
 
-        for msg in sub:
-            for field in AI_FIELDS:
-                if not (msg.get(field) or "").strip():
-                    msg[field] = None
+    # Call AI for the remaining items, up to max_concurrency sub-batches in flight
+    max_workers = max(1, config.max_concurrency)
+    if max_workers == 1 or len(ai_batches) <= 1:
+        for items in ai_batches:
+            apply_results(items, _enrich_subbatch(items, config, settings.openai_api_key))
+    else:
+        print(f"[pipeline] [ENRICH][AI] max_concurrency={max_workers}")
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(_enrich_subbatch, items, config, settings.openai_api_key): items
+                for items in ai_batches
+            }
+            # Results are applied on this thread and mapped back by message id
+            for future in as_completed(futures):
+                apply_results(futures[future], future.result())
+
+    for msg in messages:
+        for field in AI_FIELDS:
+            if not (msg.get(field) or "").strip():
+                msg[field] = None
+
+    if config.use_cache:
+        evicted = evict_enrichment_cache(
+            settings.enrichment_cache_max_age_days,
+            settings.enrichment_cache_max_rows,
+        )
+        print(f"[pipeline] [ENRICH][CACHE] hits={cache_hits} | misses={cache_misses} | evicted={evicted}")
 
     return messages
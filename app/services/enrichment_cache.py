@@ -0,0 +1,114 @@
+# app/services/enrichment_cache.py
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+import hashlib
+
+from sqlmodel import select, update
+
+from app.database import get_session, upsert_rows
+from app.services.cache_eviction import evict_least_recently_used
+from app.models.enrichment_cache import EnrichmentCacheEntry
+
+CACHED_FIELDS = ["country", "region", "location", "title", "event_type"]
+
+
+def text_hash(text_norm: str) -> str:
+    """
+    Stable key for a normalized message text.
+    """
+    return hashlib.sha256((text_norm or "").encode("utf-8")).hexdigest()
+
+
+def _cache_version(pipeline_version: str, target_language: Optional[str]) -> str:
+    # title is written in the target language: entries of another language never match
+    return f"{pipeline_version}:{(target_language or '').lower()}"
+
+
+def load_cached_enrichments(
+    hashes: Iterable[str],
+    *,
+    pipeline_version: str,
+    model_name: Optional[str],
+    target_language: Optional[str],
+) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Return cached AI fields by text hash and mark the entries as recently used.
+    """
+    pipeline_version = _cache_version(pipeline_version, target_language)
+    hashes = list(set(hashes))
+    if not hashes:
+        return {}
+    with get_session() as session:
+        stmt = select(EnrichmentCacheEntry).where(
+            EnrichmentCacheEntry.text_hash.in_(hashes),
+            EnrichmentCacheEntry.pipeline_version == pipeline_version,
+            EnrichmentCacheEntry.model_name == (model_name or ""),
+        )
+        entries = {
+            entry.text_hash: {field: getattr(entry, field) for field in CACHED_FIELDS}
+            for entry in session.exec(stmt).all()
+        }
+        if entries:
+            session.exec(
+                update(EnrichmentCacheEntry)
+                .where(
+                    EnrichmentCacheEntry.text_hash.in_(list(entries)),
+                    EnrichmentCacheEntry.pipeline_version == pipeline_version,
+                    EnrichmentCacheEntry.model_name == (model_name or ""),
+                )
+                .values(last_used_at=datetime.utcnow())
+            )
+            session.commit()
+    return entries
+
+
+def store_enrichments(
+    results: Dict[str, Dict[str, Optional[str]]],
+    *,
+    pipeline_version: str,
+    model_name: Optional[str],
+    target_language: Optional[str],
+) -> int:
+    """
+    Insert or complete cache entries with AI results (text hash -> {field: value}).
+    Returns the number of entries written.
+    """
+    if not results:
+        return 0
+    pipeline_version = _cache_version(pipeline_version, target_language)
+    now = datetime.utcnow()
+    # Only the fields present are written, so entries are completed, not cleared:
+    # one upsert per set of fields
+    groups: Dict[tuple, list] = {}
+    for key, fields in results.items():
+        names = tuple(field for field in CACHED_FIELDS if field in fields)
+        groups.setdefault(names, []).append(
+            {
+                "text_hash": key,
+                "pipeline_version": pipeline_version,
+                "model_name": model_name or "",
+                **{field: fields[field] or "" for field in names},
+                "created_at": now,
+                "last_used_at": now,
+            }
+        )
+    # Concurrent sub-batches and streaming stages may store the same key at once
+    with get_session() as session:
+        for names, rows in groups.items():
+            upsert_rows(
+                session,
+                EnrichmentCacheEntry.__table__,
+                rows,
+                ["text_hash", "pipeline_version", "model_name"],
+                [*names, "last_used_at"],
+            )
+        session.commit()
+    return len(results)
+
+
+def evict_enrichment_cache(max_age_days: int, max_rows: int) -> int:
+    """
+    Drop entries unused for max_age_days, then the least recently used ones above max_rows.
+    Returns the number of deleted entries.
+    """
+    return evict_least_recently_used(EnrichmentCacheEntry, max_age_days, max_rows)
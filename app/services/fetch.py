@@ -1,13 +1,19 @@
 # app/services/fetch.py
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict
-import os  # 👈 ajouté
+from typing import Any, Awaitable, Callable, List, Dict
+import asyncio
+import os
+import time
 
 from telethon import TelegramClient
-from telethon.errors import UsernameInvalidError, UsernameNotOccupiedError
+from telethon.errors import FloodWaitError, UsernameInvalidError, UsernameNotOccupiedError
 from telethon.sessions import StringSession  # 👈 ajouté
+from telethon.tl.types import Channel, InputPeerChannel
 
 from app.config import get_settings
+from app.database import get_session
+from app.models.channel_state import ChannelState
+from app.services.dedupe import content_hash
 
 # Load settings once for fetch configuration
 settings = get_settings()
@@ -53,9 +59,371 @@ def _parse_sources_env() -> Dict[str, str | None]:
     return mapping
 
 
-async def fetch_raw_messages_24h() -> List[Dict]:
+def load_channel_watermarks(channels: List[str]) -> Dict[str, int]:
     """
-    Fetch messages from the configurable window (FETCH_WINDOW_HOURS) with a per-channel cap.
+    Return the stored high-water mark (last telegram_message_id) per channel.
+    Channels never fetched before are absent from the mapping.
+    """
+    if not channels:
+        return {}
+    from sqlmodel import select
+    with get_session() as session:
+        stmt = select(ChannelState.channel, ChannelState.last_message_id).where(
+            ChannelState.channel.in_(channels)
+        )
+        return {chan: last_id for chan, last_id in session.exec(stmt).all() if last_id}
+
+
+def save_channel_watermarks(messages: List[Dict]) -> None:
+    """
+    Advance per-channel high-water marks from a batch of fetched messages.
+    Call only once the batch is safely stored, so a failed run is refetched.
+    Channels whose fetch hit the per-channel cap ("fetch_truncated") keep their mark:
+    the posts between it and the oldest one fetched were never downloaded.
+    """
+    latest: Dict[str, int] = {}
+    truncated = {msg.get("channel") for msg in messages if msg.get("fetch_truncated")}
+    for msg in messages:
+        chan = msg.get("channel")
+        msg_id = msg.get("telegram_message_id")
+        if not chan or msg_id is None or chan in truncated:
+            continue
+        if msg_id > latest.get(chan, 0):
+            latest[chan] = msg_id
+    if not latest:
+        return
+    with get_session() as session:
+        for chan, msg_id in latest.items():
+            state = session.get(ChannelState, chan)
+            if state is None:
+                state = ChannelState(channel=chan, last_message_id=msg_id)
+            elif msg_id > state.last_message_id:
+                state.last_message_id = msg_id
+                state.updated_at = datetime.utcnow()
+            else:
+                continue
+            session.add(state)
+        session.commit()
+
+
+def load_entity_cache(channels: List[str], ttl_hours: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Return cached channel entities (peer_id, access_hash, title) still within the TTL.
+    """
+    if not channels or ttl_hours <= 0:
+        return {}
+    from sqlmodel import select
+    min_resolved_at = datetime.utcnow() - timedelta(hours=ttl_hours)
+    with get_session() as session:
+        stmt = select(ChannelState).where(
+            ChannelState.channel.in_(channels),
+            ChannelState.peer_id.is_not(None),
+            ChannelState.access_hash.is_not(None),
+            ChannelState.resolved_at >= min_resolved_at,
+        )
+        return {
+            state.channel: {
+                "peer_id": state.peer_id,
+                "access_hash": state.access_hash,
+                "title": state.title,
+            }
+            for state in session.exec(stmt).all()
+        }
+
+
+def save_entity_cache(entries: Dict[str, Dict[str, Any] | None]) -> None:
+    """
+    Persist freshly resolved channel entities. A None entry clears the channel's cached
+    entity (source resolved to something other than a channel).
+    """
+    if not entries:
+        return
+    now = datetime.utcnow()
+    with get_session() as session:
+        for chan, entry in entries.items():
+            state = session.get(ChannelState, chan)
+            if entry is None:
+                if state is None or state.peer_id is None:
+                    continue
+                entry = {"peer_id": None, "access_hash": None, "title": None}
+            state = state or ChannelState(channel=chan)
+            state.peer_id = entry["peer_id"]
+            state.access_hash = entry["access_hash"]
+            state.title = entry["title"]
+            state.resolved_at = now if entry["peer_id"] is not None else None
+            state.updated_at = now
+            session.add(state)
+        session.commit()
+
+
+class RequestScheduler:
+    """
+    Token-bucket pacing shared by every Telethon call of a fetch run.
+    FloodWait feedback pauses all requests and halves the rate (recovered gradually),
+    and counters are kept for the run summary (flood_wait_seconds counts waits actually slept).
+    """
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.base_rate = rate_per_second
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+        self.stats = {
+            "requests": 0,
+            "flood_waits": 0,
+            "flood_wait_seconds": 0,
+            "requeues": 0,
+            "dropped": 0,
+        }
+
+    async def acquire(self) -> None:
+        # Serialize acquisition so waiting requests are served in arrival order
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if self.base_rate <= 0:
+                    break
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    # Additive recovery towards the configured rate after a slowdown
+                    self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+                    break
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+            self.stats["requests"] += 1
+
+    def on_flood_wait(self, seconds: int, *, pause: bool = True) -> None:
+        self.stats["flood_waits"] += 1
+        if not pause:
+            return
+        self.stats["flood_wait_seconds"] += seconds
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        if self.base_rate > 0:
+            self.rate = max(self.base_rate / 16, self.rate / 2)
+        self.tokens = 0.0
+
+    def summary(self) -> str:
+        parts = [f"{key}={value}" for key, value in self.stats.items()]
+        if self.base_rate > 0:
+            parts.append(f"rate={self.rate:.2f}/s")
+        return " | ".join(parts)
+
+
+async def _resolve_entity(
+    client: TelegramClient,
+    chan: str,
+    entity_cache: Dict[str, Dict[str, Any]],
+    resolved: Dict[str, Dict[str, Any]],
+    scheduler: RequestScheduler,
+) -> tuple[Any, str] | None:
+    """
+    Return (input entity, source title) for a channel, from the cache when possible.
+    Fresh resolutions are recorded in `resolved` so the caller can persist them
+    (None for sources that are not channels, which are never cached).
+    """
+    cached = entity_cache.get(chan)
+    if cached:
+        peer = InputPeerChannel(channel_id=cached["peer_id"], access_hash=cached["access_hash"])
+        return peer, cached["title"] or chan
+
+    try:
+        await scheduler.acquire()
+        entity = await client.get_entity(chan)
+    except FloodWaitError:
+        raise
+    except (UsernameInvalidError, UsernameNotOccupiedError) as e:
+        print(f"[fetch] Canal invalide ou introuvable : {chan} ({e})")
+        return None
+    except Exception as e:
+        print(f"[fetch] Erreur get_entity({chan}) : {e}")
+        return None
+
+    # Prefer channel title for source label, fallback to username
+    real_source = getattr(entity, "title", None) or getattr(entity, "username", chan)
+    # Only channels are cached: the cache is rebuilt as InputPeerChannel, which would be
+    # the wrong peer for a user or basic group source
+    if isinstance(entity, Channel) and entity.access_hash is not None:
+        resolved[chan] = {"peer_id": entity.id, "access_hash": entity.access_hash, "title": real_source}
+    else:
+        resolved[chan] = None
+    return entity, real_source
+
+
+async def _iter_until_cutoff(
+    client: TelegramClient,
+    entity,
+    *,
+    cutoff: datetime,
+    min_id: int,
+    cap: int,
+    scheduler: RequestScheduler,
+) -> list:
+    """
+    Page through a channel history newest-first and stop at the first message older than cutoff.
+    Telethon requests pages of 100 messages, so quiet channels cost a single request.
+    """
+    msgs = []
+    await scheduler.acquire()
+    async for m in client.iter_messages(entity, limit=cap, min_id=min_id):
+        dt = getattr(m, "date", None)
+        if dt is not None and dt < cutoff:
+            break
+        msgs.append(m)
+        # Pace each following page request like any other call
+        if len(msgs) % 100 == 0 and len(msgs) < cap:
+            await scheduler.acquire()
+    return msgs
+
+
+async def _fetch_channel_once(
+    client: TelegramClient,
+    chan: str,
+    *,
+    max_per_channel: int,
+    cutoff: datetime,
+    min_id: int,
+    stream_cap: int,
+    entity_cache: Dict[str, Dict[str, Any]],
+    resolved: Dict[str, Dict[str, Any]],
+    scheduler: RequestScheduler,
+) -> tuple[list, str]:
+    """
+    Resolve a channel and download its messages once.
+    Returns (telethon messages, source title); FloodWaitError is left to the caller.
+    """
+    while True:
+        resolution = await _resolve_entity(client, chan, entity_cache, resolved, scheduler)
+        if resolution is None:
+            return [], chan
+        entity, real_source = resolution
+
+        try:
+            if stream_cap:
+                msgs = await _iter_until_cutoff(
+                    client, entity, cutoff=cutoff, min_id=min_id, cap=stream_cap, scheduler=scheduler
+                )
+                if len(msgs) >= stream_cap:
+                    print(f"[fetch] Plafond atteint pour {chan} ({stream_cap} messages), fenêtre tronquée.")
+            else:
+                await scheduler.acquire()
+                msgs = await client.get_messages(entity, limit=max_per_channel, min_id=min_id)
+            return msgs, real_source
+        except FloodWaitError:
+            raise
+        except Exception as e:
+            # A stale cached entity is dropped and resolved again once
+            if chan in entity_cache:
+                print(f"[fetch] Entité en cache invalide pour {chan}, nouvelle résolution ({e})")
+                entity_cache.pop(chan)
+                continue
+            print(f"[fetch] Erreur get_messages({chan}) : {e}")
+            return [], real_source
+
+
+async def _fetch_channel(
+    client: TelegramClient,
+    chan: str,
+    orient: str | None,
+    label: str | None,
+    *,
+    max_per_channel: int,
+    cutoff: datetime,
+    min_id: int,
+    stream_cap: int,
+    entity_cache: Dict[str, Dict[str, Any]],
+    resolved: Dict[str, Dict[str, Any]],
+    scheduler: RequestScheduler,
+    semaphore: asyncio.Semaphore,
+) -> List[Dict]:
+    """
+    Fetch recent messages for a single channel (only ids above min_id when set).
+    With stream_cap set, history is paged until the cutoff instead of using max_per_channel.
+    Entities come from entity_cache when present; new resolutions are added to `resolved`.
+    A FloodWait requeues the channel (its slot is released while the scheduler waits).
+    Errors are isolated: a failing channel returns an empty list.
+    When the cap cut a fetch above min_id, messages carry "fetch_truncated": True.
+    """
+    attempt = 0
+    while True:
+        try:
+            async with semaphore:
+                msgs, real_source = await _fetch_channel_once(
+                    client,
+                    chan,
+                    max_per_channel=max_per_channel,
+                    cutoff=cutoff,
+                    min_id=min_id,
+                    stream_cap=stream_cap,
+                    entity_cache=entity_cache,
+                    resolved=resolved,
+                    scheduler=scheduler,
+                )
+            break
+        except FloodWaitError as e:
+            attempt += 1
+            if e.seconds > settings.fetch_flood_max_wait or attempt > settings.fetch_max_requeues:
+                # Too long to wait for: skip the channel without stalling the others
+                scheduler.on_flood_wait(e.seconds, pause=False)
+                scheduler.stats["dropped"] += 1
+                print(f"[fetch] FloodWait {e.seconds}s sur {chan}, canal abandonné.")
+                return []
+            scheduler.on_flood_wait(e.seconds)
+            scheduler.stats["requeues"] += 1
+            print(f"[fetch] FloodWait {e.seconds}s sur {chan}, canal remis en file ({attempt}/{settings.fetch_max_requeues}).")
+
+    # Capped above a high-water mark: older new posts were left out, the mark must stay
+    truncated = min_id > 0 and len(msgs) >= (stream_cap or max_per_channel)
+    if truncated:
+        print(f"[fetch] {chan} : plafond atteint au-dessus du high-water mark, il n'avance pas.")
+
+    results: List[Dict] = []
+    for m in msgs:
+        dt = getattr(m, "date", None)
+        if dt is None:
+            continue
+        if dt < cutoff:
+            continue
+
+        # Skip empty messages
+        text = getattr(m, "message", "") or ""
+        if not text.strip():
+            continue
+
+        # Normalize message fields for the pipeline
+        results.append(
+            {
+                "source": real_source,
+                "channel": chan,
+                "orientation": (orient or "inconnu").lower(),
+                "text": text,
+                "content_hash": content_hash(text),
+                "date": dt,
+                "telegram_message_id": m.id,
+                "label": label,
+            }
+        )
+        if truncated:
+            results[-1]["fetch_truncated"] = True
+    return results
+
+
+async def fetch_raw_messages_24h(
+    on_channel: Callable[[List[Dict]], Awaitable[None]] | None = None,
+) -> List[Dict]:
+    """
+    Fetch messages from the configurable window (FETCH_WINDOW_HOURS) with a per-channel cap
+    (MAX_MESSAGES_PER_CHANNEL, or FETCH_STREAM_CAP when FETCH_STREAMING is enabled).
+    Channels are fetched concurrently (FETCH_CONCURRENCY in flight) over a single client;
+    results keep the SOURCES_TELEGRAM order so downstream dedupe stays stable.
+    When on_channel is given, each channel's messages are handed to it as soon as the
+    channel completes and are not accumulated (the returned list is then empty).
     """
     sources_map = _parse_sources_env()
     if not sources_map:
@@ -75,58 +443,63 @@ async def fetch_raw_messages_24h() -> List[Dict]:
             StringSession(session_str.strip()),
             settings.telegram_api_id,
             settings.telegram_api_hash,
+            # FloodWaits are handled by the RequestScheduler instead of silent sleeps
+            flood_sleep_threshold=0,
         )
     else:
         raise RuntimeError("Aucune string session Telegram trouvée. Renseignez TELEGRAM_SESSION dans le .env ou TG_SESSION dans les variables d'environnement.")
 
-    results: List[Dict] = []
+    # Known channels resume after their high-water mark; new ones use the cutoff only
+    watermarks = load_channel_watermarks(list(sources_map)) if settings.incremental_fetch else {}
+    if watermarks:
+        print(f"[fetch] Fetch incrémental : {len(watermarks)}/{len(sources_map)} canaux avec high-water mark.")
 
-    # Connect to Telegram and pull recent messages for each configured channel
-    async with client:
-        for chan, orient in sources_map.items():
-            try:
-                entity = await client.get_entity(chan)
-            except (UsernameInvalidError, UsernameNotOccupiedError) as e:
-                print(f"[fetch] Canal invalide ou introuvable : {chan} ({e})")
-                continue
-            except Exception as e:
-                print(f"[fetch] Erreur get_entity({chan}) : {e}")
-                continue
+    # Cached entities skip username resolution (slow and flood-limited by Telegram)
+    entity_cache = load_entity_cache(list(sources_map), settings.entity_cache_ttl_hours)
+    resolved: Dict[str, Dict[str, Any]] = {}
 
-            try:
-                msgs = await client.get_messages(entity, limit=max_per_channel)
-            except Exception as e:
-                print(f"[fetch] Erreur get_messages({chan}) : {e}")
-                continue
+    # Bound the number of channels in flight and pace requests to stay under Telegram rate limits
+    semaphore = asyncio.Semaphore(max(1, settings.fetch_concurrency))
+    scheduler = RequestScheduler(settings.fetch_rate_per_second, settings.fetch_rate_burst)
 
-            for m in msgs:
-                dt = getattr(m, "date", None)
-                if dt is None:
-                    continue
-                if dt < cutoff:
-                    continue
+    fetched_count = 0
 
-                # Skip empty messages
-                text = getattr(m, "message", "") or ""
-                if not text.strip():
-                    continue
+    async def fetch_one(chan: str, orient: str | None) -> List[Dict]:
+        nonlocal fetched_count
+        msgs = await _fetch_channel(
+            client,
+            chan,
+            orient,
+            channel_to_label.get(chan),
+            max_per_channel=max_per_channel,
+            cutoff=cutoff,
+            min_id=watermarks.get(chan, 0),
+            stream_cap=settings.fetch_stream_cap if settings.fetch_streaming else 0,
+            entity_cache=entity_cache,
+            resolved=resolved,
+            scheduler=scheduler,
+            semaphore=semaphore,
+        )
+        fetched_count += len(msgs)
+        if on_channel is None:
+            return msgs
+        if msgs:
+            await on_channel(msgs)
+        return []
 
-                # Prefer channel title for source label, fallback to username
-                real_source = getattr(entity, "title", None) or getattr(entity, "username", chan)
-                label = channel_to_label.get(chan)
-
-                # Normalize message fields for the pipeline
-                results.append(
-                    {
-                        "source": real_source,
-                        "channel": chan,
-                        "orientation": (orient or "inconnu").lower(),
-                        "text": text,
-                        "date": dt,
-                        "telegram_message_id": m.id,
-                        "label": label,
-                    }
-                )
+    # Connect to Telegram and pull recent messages for each configured channel
+    async with client:
+        per_channel = await asyncio.gather(
+            *[fetch_one(chan, orient) for chan, orient in sources_map.items()]
+        )
+
+    print(f"[fetch] Scheduler : {scheduler.summary()}")
+    if settings.entity_cache_ttl_hours > 0:
+        save_entity_cache(resolved)
+        print(f"[fetch] Cache entités : {len(entity_cache)} hits, {len(resolved)} résolutions.")
+
+    # gather preserves input order, so flattening keeps a deterministic output
+    results: List[Dict] = [msg for chunk in per_channel for msg in chunk]
 
-    print(f"[fetch] Total messages 24h récupérés : {len(results)}")
+    print(f"[fetch] Total messages 24h récupérés : {fetched_count}")
     return results
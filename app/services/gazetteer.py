@@ -0,0 +1,214 @@
+# app/services/gazetteer.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import json
+import re
+
+try:
+    import pycountry
+except Exception:  # pragma: no cover - optional dependency at runtime
+    pycountry = None
+
+
+_CYRILLIC_WORD = re.compile(r"^[а-яёіїєґ'-]+$")
+# Trailing vowels / soft signs dropped from Cyrillic aliases so inflected forms still match
+# ("херсон" -> "херсоне", "донецкая область" -> "донецкой области").
+_CYRILLIC_ENDING = "аеиоуыэюяьйіїє"
+_CYRILLIC_SUFFIX = "[а-яёіїєґ]{0,3}"
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    kind: str  # "city" | "region"
+    country: str
+    region: Optional[str]
+    coordinates: Tuple[float, float]
+
+
+@dataclass(frozen=True)
+class _PlaceMatcher:
+    pattern: re.Pattern
+    # exact lowercased alias -> places sharing it
+    exact: Dict[str, Tuple[Place, ...]]
+    # inflected Cyrillic aliases, checked only when the exact lookup misses
+    inflected: Tuple[Tuple[re.Pattern, Tuple[Place, ...]], ...]
+
+
+def _base_dir() -> Path:
+    return Path(__file__).resolve().parents[2]
+
+
+def _alias_pattern(alias: str) -> str:
+    words = alias.split(" ")
+    if not all(_CYRILLIC_WORD.match(w) for w in words):
+        return re.escape(alias)
+    parts: List[str] = []
+    for word in words:
+        stem = word
+        for _ in range(2):
+            if len(stem) > 4 and stem[-1] in _CYRILLIC_ENDING:
+                stem = stem[:-1]
+        # Short words are matched exactly: a loose suffix on 3-4 letters matches too much
+        parts.append(re.escape(stem) + _CYRILLIC_SUFFIX if len(stem) >= 4 else re.escape(word))
+    return r"\s+".join(parts)
+
+
+def _compile(terms: Dict[str, Tuple[Place, ...]]) -> _PlaceMatcher:
+    # Longest alias first so "kyiv oblast" wins over "kyiv" at the same position
+    ordered = sorted(terms, key=lambda t: (-len(t), t))
+    patterns = {term: _alias_pattern(term) for term in ordered}
+    pattern = re.compile(
+        r"(?<!\w)(?=(" + "|".join(patterns[t] for t in ordered) + r")(?!\w))"
+    )
+    inflected = tuple(
+        (re.compile(patterns[t]), terms[t])
+        for t in ordered
+        if patterns[t] != re.escape(t)
+    )
+    return _PlaceMatcher(pattern=pattern, exact=terms, inflected=inflected)
+
+
+@lru_cache(maxsize=1)
+def _gazetteer_matcher() -> _PlaceMatcher:
+    """
+    Load static/data/gazetteer.json once and compile every alias into a single alternation.
+    """
+    path = _base_dir() / "static" / "data" / "gazetteer.json"
+    data = json.loads(path.read_text(encoding="utf-8"))
+    terms: Dict[str, List[Place]] = {}
+    for kind, key in (("region", "regions"), ("city", "cities")):
+        for entry in data.get(key, []):
+            lat, lon = entry["coordinates"]
+            place = Place(
+                name=entry["name"],
+                kind=kind,
+                country=entry["country"],
+                region=entry.get("region") if kind == "city" else entry["name"],
+                coordinates=(float(lat), float(lon)),
+            )
+            for alias in entry.get("aliases", []):
+                alias = alias.strip().lower()
+                if alias:
+                    terms.setdefault(alias, []).append(place)
+    return _compile({term: tuple(places) for term, places in terms.items()})
+
+
+@lru_cache(maxsize=512)
+def _country_key(name: str) -> str:
+    """
+    Comparable key for a country name: ISO alpha-2 when pycountry knows it,
+    so "Russia" (aliases) and "Russian Federation" (pycountry) compare equal.
+    """
+    if pycountry is not None:
+        try:
+            return pycountry.countries.lookup(name).alpha_2
+        except LookupError:
+            pass
+        try:
+            return pycountry.countries.search_fuzzy(name)[0].alpha_2
+        except LookupError:
+            pass
+    return name.strip().lower()
+
+
+@lru_cache(maxsize=64)
+def _subdivision_matcher(country_code: str) -> Optional[_PlaceMatcher]:
+    """
+    First-level ISO 3166-2 subdivisions of one country, compiled on first use.
+    """
+    if pycountry is None:
+        return None
+    subdivisions = pycountry.subdivisions.get(country_code=country_code) or []
+    terms: Dict[str, Tuple[Place, ...]] = {}
+    for sub in subdivisions:
+        if sub.parent_code is not None:
+            continue
+        alias = sub.name.strip().lower()
+        if len(alias) < 4:
+            continue
+        place = Place(name=sub.name, kind="region", country=country_code, region=sub.name, coordinates=(0.0, 0.0))
+        terms.setdefault(alias, (place,))
+    if not terms:
+        return None
+    return _compile(terms)
+
+
+def _find(matcher: _PlaceMatcher, text: str) -> List[Tuple[Place, ...]]:
+    found: List[Tuple[Place, ...]] = []
+    for match in matcher.pattern.finditer(text):
+        term = match.group(1)
+        places = matcher.exact.get(term)
+        if places is None:
+            places = next((p for rx, p in matcher.inflected if rx.fullmatch(term)), None)
+        if places:
+            found.append(places)
+    return found
+
+
+def find_places(text: str) -> List[Tuple[Place, ...]]:
+    """
+    Return gazetteer places mentioned in text, in order of appearance.
+    Each mention is the tuple of places sharing the matched alias.
+    """
+    if not text:
+        return []
+    return _find(_gazetteer_matcher(), text.lower())
+
+
+def infer_place(
+    text: str,
+    country: Optional[str] = None,
+) -> Tuple[Optional[Place], float, Optional[str], float]:
+    """
+    Resolve the first city and region mentioned in text.
+    Returns (city, city_confidence, region, region_confidence).
+
+    Confidence is 0.95 when the place lies in the inferred country, 0.9 when no country
+    is known and the alias is unambiguous, 0.5 when it contradicts the country.
+    A city's parent region fills region when no region is named explicitly.
+    """
+    if not text:
+        return None, 0.0, None, 0.0
+    country_key = _country_key(country) if country else None
+
+    def pick(candidates: Tuple[Place, ...]) -> Tuple[Optional[Place], float]:
+        if country_key is not None:
+            for place in candidates:
+                if _country_key(place.country) == country_key:
+                    return place, 0.95
+            return candidates[0], 0.5
+        if len({(p.name, p.country) for p in candidates}) == 1:
+            return candidates[0], 0.9
+        return candidates[0], 0.5
+
+    best: Dict[str, Tuple[Optional[Place], float]] = {"city": (None, 0.0), "region": (None, 0.0)}
+    for places in find_places(text):
+        for kind in ("city", "region"):
+            candidates = tuple(p for p in places if p.kind == kind)
+            if not candidates:
+                continue
+            place, conf = pick(candidates)
+            if conf > best[kind][1]:
+                best[kind] = (place, conf)
+
+    city, city_conf = best["city"]
+    region_place, region_conf = best["region"]
+    region = region_place.name if region_place else None
+
+    if region is None and city is not None and city.region:
+        region, region_conf = city.region, city_conf
+
+    if region is None and country_key is not None and len(country_key) == 2:
+        # Fall back to ISO subdivisions of the inferred country (agreement is implied)
+        matcher = _subdivision_matcher(country_key.upper())
+        if matcher is not None:
+            hits = _find(matcher, text.lower())
+            if hits:
+                region, region_conf = hits[0][0].name, 0.9
+
+    return city, city_conf, region, region_conf
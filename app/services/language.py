@@ -0,0 +1,213 @@
+# app/services/language.py
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+import atexit
+import hashlib
+import re
+import threading
+
+from app.config import get_settings
+
+# Letters per script; Latin is the only one left to langdetect
+_SCRIPTS = {
+    "cyrillic": re.compile("[\u0400-\u04FF]"),
+    "arabic": re.compile("[\u0600-\u06FF\u0750-\u077F]"),
+    "hebrew": re.compile("[\u0590-\u05FF]"),
+    "hangul": re.compile("[\uAC00-\uD7AF\u1100-\u11FF]"),
+    "kana": re.compile("[\u3040-\u30FF]"),
+    "han": re.compile("[\u4E00-\u9FFF]"),
+    "greek": re.compile("[\u0370-\u03FF]"),
+    "thai": re.compile("[\u0E00-\u0E7F]"),
+    "latin": re.compile("[A-Za-z\u00C0-\u024F]"),
+}
+_SCRIPT_LANG = {
+    "cyrillic": "ru",
+    "arabic": "ar",
+    "hebrew": "he",
+    "hangul": "ko",
+    "kana": "ja",
+    "han": "zh-cn",
+    "greek": "el",
+    "thai": "th",
+}
+_UKRAINIAN_LETTERS = re.compile(r"[іїєґІЇЄҐ]")
+_PERSIAN_LETTERS = re.compile(r"[پچژگ]")
+
+# Channel prior: used for short Latin texts, where langdetect is least reliable
+_PRIOR_MIN_SAMPLES = 20
+_PRIOR_MIN_SHARE = 0.9
+_PRIOR_MAX_CHARS = 200
+
+_MEMO_MAX = 50000
+_memo: "OrderedDict[str, Optional[str]]" = OrderedDict()
+_channel_langs: Dict[str, Counter] = {}
+# Callers are enrichment worker threads and API threads (lazy translation)
+_lock = threading.Lock()
+
+# langdetect process pool, created on first use and kept for the life of the process
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def detect_script_language(text: str) -> tuple[Optional[str], bool]:
+    """
+    Resolve the language from the dominant Unicode script alone.
+    Returns (language, resolved); resolved is False for Latin text, which needs langdetect.
+    """
+    counts = {script: len(rx.findall(text)) for script, rx in _SCRIPTS.items()}
+    total = sum(counts.values())
+    if not total:
+        return None, True
+    if counts["kana"]:
+        # Japanese mixes kana with kanji, which would otherwise count as Chinese
+        counts["kana"] += counts["han"]
+        counts["han"] = 0
+    script = max(counts, key=counts.get)
+    if script == "latin" or counts[script] * 2 < total:
+        return None, False
+    if script == "cyrillic" and _UKRAINIAN_LETTERS.search(text):
+        return "uk", True
+    if script == "arabic" and _PERSIAN_LETTERS.search(text):
+        return "fa", True
+    return _SCRIPT_LANG[script], True
+
+
+def _langdetect(text: str) -> Optional[str]:
+    try:
+        from langdetect import DetectorFactory, detect
+    except Exception:
+        return None
+    # Fixed seed: the same text always gets the same answer
+    DetectorFactory.seed = 0
+    try:
+        return detect(text)
+    except Exception:
+        return None
+
+
+def _langdetect_many(texts: List[str]) -> List[Optional[str]]:
+    return [_langdetect(text) for text in texts]
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    # Sized by the first caller; language_detect_workers is read once per process
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers)
+        return _pool
+
+
+@atexit.register
+def _shutdown_pool() -> None:
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _text_key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _remember(key: str, lang: Optional[str]) -> None:
+    # Callers hold _lock (as for _channel_prior and _learn)
+    _memo[key] = lang
+    _memo.move_to_end(key)
+    while len(_memo) > _MEMO_MAX:
+        _memo.popitem(last=False)
+
+
+def _channel_prior(channel: Optional[str]) -> Optional[str]:
+    counts = _channel_langs.get(channel) if channel else None
+    if not counts:
+        return None
+    total = sum(counts.values())
+    lang, hits = counts.most_common(1)[0]
+    if total >= _PRIOR_MIN_SAMPLES and hits >= _PRIOR_MIN_SHARE * total:
+        return lang
+    return None
+
+
+def _learn(channel: Optional[str], lang: Optional[str]) -> None:
+    if channel and lang:
+        _channel_langs.setdefault(channel, Counter())[lang] += 1
+
+
+def _fast_path(text: str, channel: Optional[str]) -> tuple[Optional[str], bool, bool]:
+    """
+    Returns (language, resolved, from_prior). Answers taken from the prior are not
+    learned again, so the prior cannot reinforce itself.
+    """
+    lang, resolved = detect_script_language(text)
+    if resolved:
+        return lang, True, False
+    prior = _channel_prior(channel)
+    if prior is not None and len(text) <= _PRIOR_MAX_CHARS:
+        return prior, True, True
+    return None, False, False
+
+
+def detect_languages(
+    texts: Sequence[str],
+    channels: Optional[Sequence[Optional[str]]] = None,
+) -> List[Optional[str]]:
+    """
+    Detect the language of many texts at once.
+    Script fast path first (Cyrillic, Arabic, Hebrew, CJK... resolve immediately), then the
+    channel prior for short Latin texts, then memoized langdetect for what is left, in a
+    process pool when there are enough texts (settings.language_detect_workers).
+    """
+    settings = get_settings()
+    channels = list(channels) if channels is not None else [None] * len(texts)
+    results: List[Optional[str]] = [None] * len(texts)
+    pending: Dict[str, List[int]] = {}
+    pending_text: Dict[str, str] = {}
+
+    with _lock:
+        for i, (text, channel) in enumerate(zip(texts, channels)):
+            text = text or ""
+            lang, resolved, from_prior = _fast_path(text, channel)
+            if resolved:
+                results[i] = lang
+                if not from_prior:
+                    _learn(channel, lang)
+                continue
+            key = _text_key(text)
+            if key in _memo:
+                _memo.move_to_end(key)
+                results[i] = _memo[key]
+                _learn(channel, results[i])
+                continue
+            pending.setdefault(key, []).append(i)
+            pending_text[key] = text
+
+    if not pending:
+        return results
+
+    keys = list(pending)
+    todo = [pending_text[key] for key in keys]
+    workers = settings.language_detect_workers
+    if workers > 0 and len(todo) >= settings.language_detect_pool_min:
+        chunk = max(1, len(todo) // (workers * 4))
+        chunks = [todo[i:i + chunk] for i in range(0, len(todo), chunk)]
+        pool = _get_pool(workers)
+        detected = [lang for part in pool.map(_langdetect_many, chunks) for lang in part]
+    else:
+        detected = _langdetect_many(todo)
+
+    with _lock:
+        for key, lang in zip(keys, detected):
+            _remember(key, lang)
+            for i in pending[key]:
+                results[i] = lang
+                _learn(channels[i], lang)
+    return results
+
+
+def detect_language(text: str, channel: Optional[str] = None) -> Optional[str]:
+    """
+    Detect the language of one text (see detect_languages).
+    Returns a language code or None if undetected.
+    """
+    return detect_languages([text], [channel])[0]
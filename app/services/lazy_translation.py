@@ -0,0 +1,145 @@
+# app/services/lazy_translation.py
+from typing import Dict, List, Optional, Tuple
+import asyncio
+
+from sqlmodel import Session, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import get_settings
+from app.database import get_session, insert_ignore_conflicts
+from app.models.message import Message
+from app.models.message_translation import MessageTranslation
+from app.services.translation import translate_messages
+
+
+def _languages(target_language: Optional[str]) -> Tuple[str, str]:
+    settings = get_settings()
+    default_lang = (settings.target_language or "fr").lower()
+    return default_lang, (target_language or default_lang).lower()
+
+
+def _stored_translations(session: Session, msgs: List[Message], target_lang: str, default_lang: str) -> Dict[int, str]:
+    translations: Dict[int, str] = {}
+    if target_lang == default_lang:
+        for m in msgs:
+            if m.translated_text:
+                translations[m.id] = m.translated_text
+    else:
+        stmt = select(MessageTranslation).where(
+            MessageTranslation.message_id.in_([m.id for m in msgs]),
+            MessageTranslation.target_lang == target_lang,
+        )
+        for row in session.exec(stmt):
+            translations[row.message_id] = row.translated_text
+    return translations
+
+
+def _translate_missing(missing: List[Message], target_lang: str, default_lang: str) -> Dict[int, str]:
+    """
+    Translate missing messages (newest first, capped) and persist them through the
+    write engine. Blocking: the async path runs it in a worker thread.
+    Request path: no boilerplate learning (per-channel history reads) and no translation
+    memory eviction, both left to the pipeline.
+    """
+    settings = get_settings()
+    missing = sorted(missing, key=lambda m: m.event_timestamp or m.created_at, reverse=True)
+    missing = missing[: settings.lazy_translation_max_per_request]
+    batch = [{"text": m.raw_text, "channel": m.channel} for m in missing]
+    print(f"[api] [TRAD] on-demand translation of {len(batch)} message(s) to {target_lang}")
+    try:
+        translate_messages(batch, target_language=target_lang, evict_memory=False)
+    except Exception as e:
+        # Listing events must not fail because the model is unavailable
+        print(f"[api] [TRAD][ERROR] on-demand translation failed: {e}")
+        return {}
+
+    translations: Dict[int, str] = {}
+    rows: List[dict] = []
+    for m, item in zip(missing, batch):
+        translated = item.get("translated_text")
+        # Fallbacks (original text) are neither returned nor stored: retried on a later view
+        if not translated or item.get("translation_fallback"):
+            continue
+        translations[m.id] = translated
+        rows.append({"message_id": m.id, "target_lang": target_lang, "translated_text": translated})
+    if not rows:
+        return translations
+
+    # The request session is read-only: persist through the write engine
+    try:
+        with get_session() as write_session:
+            if target_lang == default_lang:
+                for row in rows:
+                    # First writer wins when two requests translated the same message
+                    write_session.exec(
+                        update(Message)
+                        .where(Message.id == row["message_id"], Message.translated_text.is_(None))
+                        .values(translated_text=row["translated_text"])
+                    )
+            else:
+                # A concurrent request may have stored the same translation first
+                insert_ignore_conflicts(
+                    write_session, MessageTranslation.__table__, rows, ["message_id", "target_lang"]
+                )
+            write_session.commit()
+    except Exception as e:
+        # Serve the translations anyway; they are redone on a later view
+        print(f"[api] [TRAD][ERROR] storing on-demand translations failed: {e}")
+    return translations
+
+
+def _missing(msgs: List[Message], translations: Dict[int, str]) -> List[Message]:
+    settings = get_settings()
+    if not settings.lazy_translation:
+        # The pipeline translates at ingestion: views only read stored translations
+        return []
+    if not settings.openai_api_key or not settings.openai_model:
+        # Without AI settings nothing is persisted, so messages get translated once enabled
+        return []
+    return [m for m in msgs if m.id not in translations and (m.raw_text or "").strip()]
+
+
+def ensure_translations(
+    session: Session,
+    msgs: List[Message],
+    target_language: Optional[str] = None,
+) -> Dict[int, str]:
+    """
+    Return {message id: translated text} for msgs, translating on first view.
+    Stored translations are reused: Message.translated_text for settings.target_language,
+    the message_translation side table for any other language. Missing ones are
+    translated in one batched call for the whole request (newest first, at most
+    lazy_translation_max_per_request) and persisted, so later views are free.
+    Missing ones are only translated with settings.lazy_translation on.
+    Messages left untranslated are simply absent from the result.
+    session is only read from (it may be a read-only API session).
+    """
+    default_lang, target_lang = _languages(target_language)
+    msgs = [m for m in msgs if m.id is not None]
+    if not msgs:
+        return {}
+    translations = _stored_translations(session, msgs, target_lang, default_lang)
+    missing = _missing(msgs, translations)
+    if missing:
+        translations.update(_translate_missing(missing, target_lang, default_lang))
+    return translations
+
+
+async def ensure_translations_async(
+    session: AsyncSession,
+    msgs: List[Message],
+    target_language: Optional[str] = None,
+) -> Dict[int, str]:
+    """
+    ensure_translations for async sessions: stored translations are read on the async
+    connection, the AI call and its persistence run in a worker thread.
+    """
+    default_lang, target_lang = _languages(target_language)
+    msgs = [m for m in msgs if m.id is not None]
+    if not msgs:
+        return {}
+    translations = await session.run_sync(_stored_translations, msgs, target_lang, default_lang)
+    missing = _missing(msgs, translations)
+    if missing:
+        translations.update(await asyncio.to_thread(_translate_missing, missing, target_lang, default_lang))
+    return translations
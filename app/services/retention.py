@@ -0,0 +1,283 @@
+# app/services/retention.py
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import re
+import time
+
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlmodel import delete, select
+
+from app.config import get_settings
+from app.database import _setting, engine, get_session
+from app.models.message import Message
+from app.models.daily_rollup import DailyRollup
+from app.models.message_translation import MessageTranslation
+from app.services.rollup import subtract_from_rollup
+
+# Daily partitions of a partitioned (Postgres) message table
+_PARTITION_NAME = re.compile(r"^message_p(\d{8})$")
+_DEFAULT_PARTITION = "message_default"
+# Pages released per PRAGMA incremental_vacuum step
+_VACUUM_STEP_PAGES = 2000
+
+
+def _is_postgres() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+@lru_cache(maxsize=1)
+def is_message_partitioned() -> bool:
+    """
+    True when message is a range-partitioned Postgres table (see create_partitioned_message_table).
+    """
+    if not _is_postgres():
+        return False
+    with engine.connect() as conn:
+        return bool(conn.execute(text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = 'message'"
+        )).first())
+
+
+def message_conflict_columns() -> List[str]:
+    """
+    Columns of the ingestion unique key. A partitioned table's unique indexes must contain
+    the partition key; a post's event_timestamp never changes, so the key stays equivalent.
+    """
+    if is_message_partitioned():
+        return ["channel", "telegram_message_id", "event_timestamp"]
+    return ["channel", "telegram_message_id"]
+
+
+def create_partitioned_message_table() -> bool:
+    """
+    On Postgres with message_partitioning, create message (and message_translation,
+    without its foreign key, which cannot reference a partitioned table) before
+    create_all, as a table range-partitioned by day on event_timestamp.
+    Existing tables are left alone. Returns True when the table was created.
+    """
+    # Runs from init_db: read through _setting, which tolerates incomplete settings
+    if not _is_postgres() or not _setting("message_partitioning"):
+        return False
+    table = Message.__table__
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT to_regclass('message')")).scalar() is not None:
+            if not is_message_partitioned():
+                print("[db] message_partitioning: message already exists unpartitioned, left unchanged")
+            return False
+        ddl = str(CreateTable(table).compile(dialect=engine.dialect)).strip()
+        # The partition key must belong to the primary key (and event_timestamp becomes NOT NULL)
+        ddl = ddl.replace("PRIMARY KEY (id)", "PRIMARY KEY (id, event_timestamp)")
+        conn.execute(text(f"{ddl} PARTITION BY RANGE (event_timestamp)"))
+        for index in table.indexes:
+            if index.unique:
+                columns = ", ".join([col.name for col in index.columns] + ["event_timestamp"])
+                conn.execute(text(f"CREATE UNIQUE INDEX {index.name} ON message ({columns})"))
+            else:
+                conn.execute(CreateIndex(index))
+        conn.execute(text(f"CREATE TABLE {_DEFAULT_PARTITION} PARTITION OF message DEFAULT"))
+        translation_table = MessageTranslation.__table__
+        if conn.execute(text("SELECT to_regclass('message_translation')")).scalar() is None:
+            conn.execute(CreateTable(translation_table, include_foreign_key_constraints=[]))
+    is_message_partitioned.cache_clear()
+    print("[db] created message partitioned by day on event_timestamp")
+    ensure_partitions()
+    return True
+
+
+def _partition_name(day: date) -> str:
+    return f"message_p{day:%Y%m%d}"
+
+
+def ensure_partitions(today: Optional[date] = None) -> int:
+    """
+    Create the daily partitions of the retention window plus message_partition_premake_days
+    ahead. Returns the number created.
+    """
+    if not is_message_partitioned():
+        return 0
+    today = today or datetime.now(timezone.utc).date()
+    first = today - timedelta(days=int(_setting("auto_delete_days")))
+    last = today + timedelta(days=int(_setting("message_partition_premake_days")))
+    created = 0
+    day = first
+    while day <= last:
+        name = _partition_name(day)
+        try:
+            with engine.begin() as conn:
+                if conn.execute(text(f"SELECT to_regclass('{name}')")).scalar() is None:
+                    conn.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF message "
+                        f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                    ))
+                    created += 1
+        except Exception as e:
+            # Rows for that day already sit in the default partition: they are purged by chunks
+            print(f"[db] partition {name} not created: {e}")
+        day += timedelta(days=1)
+    return created
+
+
+def _daily_partitions() -> List[Tuple[str, date]]:
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = 'message'"
+        )).all()
+    partitions: List[Tuple[str, date]] = []
+    for (name,) in rows:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, datetime.strptime(match.group(1), "%Y%m%d").date()))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def drop_expired_partitions(cutoff: datetime) -> int:
+    """
+    Drop the daily partitions entirely older than cutoff (with their side-table
+    translations and rollup days). Returns the number of messages dropped.
+    """
+    dropped = 0
+    for name, day in _daily_partitions():
+        if datetime.combine(day + timedelta(days=1), datetime.min.time()) > cutoff.replace(tzinfo=None):
+            continue
+        with engine.begin() as conn:
+            dropped += conn.execute(text(f"SELECT count(*) FROM {name}")).scalar() or 0
+            conn.execute(text(f"DELETE FROM message_translation WHERE message_id IN (SELECT id FROM {name})"))
+            # A daily partition holds exactly that day's messages
+            conn.execute(delete(DailyRollup).where(DailyRollup.day == day))
+            conn.execute(text(f"DROP TABLE {name}"))
+        print(f"[db] dropped partition {name}")
+    return dropped
+
+
+def delete_in_chunks(cutoff: datetime) -> int:
+    """
+    Delete messages older than cutoff in id-ranged chunks of retention_chunk_size, one
+    short transaction each with retention_pause_ms in between, so readers and the
+    pipeline writer get the lock back. Returns the number of messages deleted.
+    """
+    settings = get_settings()
+    chunk_size = max(1, settings.retention_chunk_size)
+    pause = max(0, settings.retention_pause_ms) / 1000
+    deleted = 0
+    last_id = 0
+    while True:
+        with get_session() as session:
+            ids = session.exec(
+                select(Message.id)
+                .where(Message.event_timestamp < cutoff, Message.id > last_id)
+                .order_by(Message.id)
+                .limit(chunk_size)
+            ).all()
+            if not ids:
+                break
+            low, high = ids[0], ids[-1]
+            in_range = (Message.id >= low) & (Message.id <= high) & (Message.event_timestamp < cutoff)
+            subtract_from_rollup(session, in_range)
+            # Side-table translations first, they reference the messages
+            session.exec(
+                delete(MessageTranslation).where(
+                    MessageTranslation.message_id >= low,
+                    MessageTranslation.message_id <= high,
+                    MessageTranslation.message_id.in_(select(Message.id).where(in_range)),
+                )
+            )
+            result = session.exec(delete(Message).where(in_range))
+            session.commit()
+        deleted += result.rowcount or 0
+        last_id = high
+        if len(ids) < chunk_size:
+            break
+        time.sleep(pause)
+    return deleted
+
+
+def _sqlite_auto_vacuum(sqlite) -> int:
+    # 0 = NONE, 1 = FULL, 2 = INCREMENTAL
+    return sqlite.execute("PRAGMA auto_vacuum").fetchone()[0]
+
+
+def _sqlite_reclaim() -> None:
+    # Hand freed pages back to the filesystem in small steps, then refresh planner stats
+    settings = get_settings()
+    pause = max(0, settings.retention_pause_ms) / 1000
+    raw = engine.raw_connection()
+    try:
+        # executescript runs each pragma to completion (a plain execute frees one page per call)
+        sqlite = raw.driver_connection
+        if _sqlite_auto_vacuum(sqlite) == 2:
+            # Bounded by the pages free at the start: pages concurrent writers free
+            # meanwhile are left for the next run
+            free_pages = sqlite.execute("PRAGMA freelist_count").fetchone()[0]
+            steps = -(-free_pages // _VACUUM_STEP_PAGES)
+            for step in range(steps):
+                sqlite.executescript(f"PRAGMA incremental_vacuum({_VACUUM_STEP_PAGES});")
+                if step + 1 < steps:
+                    time.sleep(pause)
+        else:
+            # Freed pages are still reused by later inserts; the file just never shrinks
+            print(
+                "[db] SQLite file not in auto_vacuum=INCREMENTAL: space is not returned to the disk. "
+                "Run tools/convert_sqlite_auto_vacuum.py once, in a maintenance window"
+            )
+        sqlite.executescript("PRAGMA optimize; PRAGMA wal_checkpoint(TRUNCATE);")
+    finally:
+        raw.close()
+
+
+def convert_sqlite_auto_vacuum() -> bool:
+    """
+    Switch a SQLite file created before auto_vacuum=INCREMENTAL with one full VACUUM.
+    The whole file is rewritten under an exclusive lock and needs about twice its size
+    on disk: maintenance command only, never run by the pipeline.
+    Returns False when there was nothing to convert.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    raw = engine.raw_connection()
+    try:
+        sqlite = raw.driver_connection
+        if _sqlite_auto_vacuum(sqlite) == 2:
+            return False
+        sqlite.executescript("PRAGMA auto_vacuum=INCREMENTAL; VACUUM; PRAGMA wal_checkpoint(TRUNCATE);")
+        return _sqlite_auto_vacuum(sqlite) == 2
+    finally:
+        raw.close()
+
+
+def _postgres_vacuum() -> None:
+    # VACUUM cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in ("message", "message_translation", "story_band"):
+            conn.exec_driver_sql(f"VACUUM (ANALYZE) {table}")
+
+
+def purge_old_messages() -> Tuple[int, int]:
+    """
+    Retention: drop expired daily partitions (partitioned Postgres), delete what is left
+    older than auto_delete_days in chunks, then vacuum/analyze when retention_vacuum.
+    Returns (messages in dropped partitions, messages deleted by chunks).
+    """
+    from app.services.stories import delete_orphan_story_bands
+
+    settings = get_settings()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.auto_delete_days)
+    dropped = 0
+    if is_message_partitioned():
+        dropped = drop_expired_partitions(cutoff)
+        ensure_partitions()
+    deleted = delete_in_chunks(cutoff)
+    if dropped or deleted:
+        with get_session() as session:
+            delete_orphan_story_bands(session)
+            session.commit()
+        if settings.retention_vacuum:
+            if engine.dialect.name == "sqlite":
+                _sqlite_reclaim()
+            elif _is_postgres():
+                _postgres_vacuum()
+    return dropped, deleted
@@ -0,0 +1,155 @@
+# app/services/rollup.py
+from datetime import date, datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Date, and_, bindparam, cast, func
+from sqlmodel import Session, delete, select, update
+
+from app.database import engine, get_session
+from app.models.daily_rollup import DailyRollup
+from app.models.message import Message
+
+# (day, country_norm, country_raw, source, label, event_type)
+RollupKey = Tuple[date, str, str, str, str, str]
+KEY_COLUMNS = ["day", "country_norm", "country_raw", "source", "label", "event_type"]
+
+
+def _as_date(value) -> Optional[date]:
+    # SQLite returns date(...) as text
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+def _day_expr():
+    if engine.dialect.name == "sqlite":
+        return func.date(Message.event_timestamp)
+    return cast(Message.event_timestamp, Date)
+
+
+def rollup_key(
+    day: date,
+    country_norm: Optional[str],
+    country: Optional[str],
+    source: Optional[str],
+    label: Optional[str],
+    event_type: Optional[str],
+) -> RollupKey:
+    norm = country_norm or ""
+    raw = "" if norm else (country or "").strip()
+    return (day, norm, raw, source or "", label or "", event_type or "")
+
+
+def add_to_rollup(session: Session, rows: Iterable[dict]) -> None:
+    """
+    Count stored message rows (column dicts) into the rollup with one upsert
+    (INSERT ... ON CONFLICT DO UPDATE). Rows without event_timestamp are never shown
+    on the map and are not counted. The caller commits.
+    """
+    totals: Dict[RollupKey, Tuple[int, datetime]] = {}
+    for row in rows:
+        timestamp = row.get("event_timestamp")
+        if timestamp is None:
+            continue
+        key = rollup_key(
+            timestamp.date(), row.get("country_norm"), row.get("country"),
+            row.get("source"), row.get("label"), row.get("event_type"),
+        )
+        count, last = totals.get(key, (0, timestamp))
+        totals[key] = (count + 1, max(last, timestamp))
+    if not totals:
+        return
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        latest = func.greatest
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        # Multi-argument max() is SQLite's scalar maximum
+        latest = func.max
+    table = DailyRollup.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={
+            "count": table.c.count + stmt.excluded.count,
+            "last_timestamp": latest(table.c.last_timestamp, stmt.excluded.last_timestamp),
+        },
+    )
+    values = [
+        dict(zip(KEY_COLUMNS, key), count=count, last_timestamp=last)
+        for key, (count, last) in totals.items()
+    ]
+    session.connection().execute(stmt, values)
+
+
+def subtract_from_rollup(session: Session, where) -> None:
+    """
+    Uncount the messages matching `where` (call before deleting them) and drop emptied
+    rollup rows. Aggregated in SQL, so the cost follows the number of keys touched.
+    The caller commits. last_timestamp is left as is: retention removes the oldest
+    messages, so a surviving key's latest message survives too.
+    """
+    stmt = (
+        select(
+            _day_expr(), Message.country_norm, Message.country, Message.source,
+            Message.label, Message.event_type, func.count(),
+        )
+        .where(where, Message.event_timestamp.is_not(None))
+        .group_by(
+            _day_expr(), Message.country_norm, Message.country, Message.source,
+            Message.label, Message.event_type,
+        )
+    )
+    totals: Dict[RollupKey, int] = {}
+    for day, norm, country, source, label, event_type, count in session.exec(stmt).all():
+        key = rollup_key(_as_date(day), norm, country, source, label, event_type)
+        totals[key] = totals.get(key, 0) + count
+    if not totals:
+        return
+    table = DailyRollup.__table__
+    decrement = (
+        update(table)
+        .where(and_(*[table.c[name] == bindparam(f"k_{name}") for name in KEY_COLUMNS]))
+        .values(count=table.c.count - bindparam("k_count"))
+    )
+    session.connection().execute(
+        decrement,
+        [
+            {**{f"k_{name}": value for name, value in zip(KEY_COLUMNS, key)}, "k_count": count}
+            for key, count in totals.items()
+        ],
+    )
+    session.exec(delete(DailyRollup).where(DailyRollup.count <= 0))
+
+
+def rebuild_rollup() -> int:
+    """
+    Recompute the rollup from message (one GROUP BY, used to backfill existing databases).
+    Returns the number of rollup rows.
+    """
+    with get_session() as session:
+        session.exec(delete(DailyRollup))
+        stmt = (
+            select(
+                _day_expr(), Message.country_norm, Message.country, Message.source,
+                Message.label, Message.event_type, func.count(), func.max(Message.event_timestamp),
+            )
+            .where(Message.event_timestamp.is_not(None))
+            .group_by(
+                _day_expr(), Message.country_norm, Message.country, Message.source,
+                Message.label, Message.event_type,
+            )
+        )
+        totals: Dict[RollupKey, Tuple[int, datetime]] = {}
+        for day, norm, country, source, label, event_type, count, last in session.exec(stmt).all():
+            key = rollup_key(_as_date(day), norm, country, source, label, event_type)
+            prev_count, prev_last = totals.get(key, (0, last))
+            totals[key] = (prev_count + count, max(prev_last, last))
+        session.add_all(
+            DailyRollup(**dict(zip(KEY_COLUMNS, key)), count=count, last_timestamp=last)
+            for key, (count, last) in totals.items()
+        )
+        session.commit()
+    return len(totals)
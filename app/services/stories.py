@@ -0,0 +1,270 @@
+# app/services/stories.py
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import hashlib
+import random
+import re
+import uuid
+
+from sqlmodel import select
+
+from app.config import get_settings
+from app.database import get_session
+from app.models.message import Message
+from app.models.story_band import StoryBand
+from app.services.enrichment import find_country_mentions, normalize_text
+from app.services.gazetteer import find_places
+
+# MinHash over word 3-shingles, 20 LSH bands of 3 rows: posts with an estimated Jaccard
+# similarity of 0.5 share at least one band ~93% of the time, unrelated posts (< 0.1) ~2%
+_SHINGLE_WORDS = 3
+_BANDS = 20
+_ROWS = 3
+_NUM_PERM = _BANDS * _ROWS
+# Shorter posts ("Sirens in Kyiv") are too generic to cluster
+_MIN_WORDS = 8
+_QUERY_CHUNK = 500
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = tuple(
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(_NUM_PERM)
+)
+_WORD = re.compile(r"\w+")
+
+Signature = Tuple[int, ...]
+# What a post was matched with: a stored row or an earlier message dict of the run
+StoryMatch = Tuple[dict, Union[Message, dict], float]
+
+
+def _shingle_hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash_signature(text: Optional[str]) -> Optional[Signature]:
+    """
+    MinHash signature of the normalized word 3-shingles of text.
+    None for posts shorter than _MIN_WORDS words, which are never clustered.
+    """
+    words = _WORD.findall(normalize_text(text or "").casefold())
+    if len(words) < _MIN_WORDS:
+        return None
+    hashes = {
+        _shingle_hash(" ".join(words[i:i + _SHINGLE_WORDS]))
+        for i in range(len(words) - _SHINGLE_WORDS + 1)
+    }
+    return tuple(min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH for a, b in _PERMUTATIONS)
+
+
+def encode_signature(signature: Signature) -> str:
+    return "".join(f"{value:08x}" for value in signature)
+
+
+def decode_signature(value: Optional[str]) -> Optional[Signature]:
+    if not value or len(value) != _NUM_PERM * 8:
+        return None
+    return tuple(int(value[i:i + 8], 16) for i in range(0, len(value), 8))
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """
+    Estimated Jaccard similarity of two signatures (share of equal slots).
+    """
+    return sum(1 for x, y in zip(a, b) if x == y) / _NUM_PERM
+
+
+def band_keys(signature: Signature) -> List[str]:
+    keys: List[str] = []
+    for band in range(_BANDS):
+        rows = signature[band * _ROWS:(band + 1) * _ROWS]
+        digest = hashlib.blake2b(b"".join(v.to_bytes(4, "big") for v in rows), digest_size=8).hexdigest()
+        keys.append(f"{band:02d}{digest}")
+    return keys
+
+
+def place_mentions(text: Optional[str]) -> frozenset:
+    """
+    Gazetteer places and countries named in text.
+    """
+    text = text or ""
+    places = {place.name for found in find_places(text) for place in found}
+    countries = {country for _pos, country, _conf in find_country_mentions(text)}
+    return frozenset(places | countries)
+
+
+def same_places(a: Optional[str], b: Optional[str]) -> bool:
+    """
+    True when both texts name the same places, so a near-duplicate can reuse the
+    other's enrichment.
+    """
+    return place_mentions(a) == place_mentions(b)
+
+
+def _compatible(a: frozenset, b: frozenset) -> bool:
+    # "Strike on Kharkiv" and "strike on Kherson" are different events, however similar the
+    # wording; a post that merely adds the country ("Kharkiv, Ukraine") is not
+    return a <= b or b <= a
+
+
+class StoryIndex:
+    """
+    In-memory LSH index of the posts clustered during the run, so near-duplicates in
+    the same run (or an earlier streaming batch) match before anything is stored.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: Dict[str, List[Tuple[Signature, dict]]] = {}
+
+    def add(self, signature: Signature, msg: dict) -> None:
+        for key in band_keys(signature):
+            self._buckets.setdefault(key, []).append((signature, msg))
+
+    def remove(self, messages: Iterable[dict]) -> None:
+        """
+        Forget stored messages: story_band serves them from now on.
+        """
+        by_key: Dict[str, set] = {}
+        for msg in messages:
+            signature = decode_signature(msg.get("minhash"))
+            if signature is not None:
+                for key in band_keys(signature):
+                    by_key.setdefault(key, set()).add(id(msg))
+        for key, ids in by_key.items():
+            kept = [entry for entry in self._buckets.get(key, ()) if id(entry[1]) not in ids]
+            if kept:
+                self._buckets[key] = kept
+            else:
+                self._buckets.pop(key, None)
+
+    def matches(self, signature: Signature, min_similarity: float) -> List[Tuple[dict, float]]:
+        found: List[Tuple[dict, float]] = []
+        checked = set()
+        for key in band_keys(signature):
+            for other_sig, msg in self._buckets.get(key, ()):
+                if id(msg) in checked:
+                    continue
+                checked.add(id(msg))
+                score = similarity(signature, other_sig)
+                if score >= min_similarity:
+                    found.append((msg, score))
+        return found
+
+
+def _stored_candidates(signatures: Sequence[Signature]) -> Tuple[Dict[str, set], Dict[str, List[Message]]]:
+    """
+    Look up the LSH bands of signatures in story_band, then load the members of the
+    candidate stories still inside the retention window.
+    Returns (band key -> story ids, story id -> member rows).
+    """
+    settings = get_settings()
+    keys = sorted({key for sig in signatures for key in band_keys(sig)})
+    by_key: Dict[str, set] = {}
+    members: Dict[str, List[Message]] = {}
+    if not keys:
+        return by_key, members
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.auto_delete_days)
+    with get_session() as session:
+        for i in range(0, len(keys), _QUERY_CHUNK):
+            stmt = select(StoryBand.band_key, StoryBand.story_id).where(
+                StoryBand.band_key.in_(keys[i:i + _QUERY_CHUNK])
+            )
+            for band_key, story_id in session.exec(stmt).all():
+                by_key.setdefault(band_key, set()).add(story_id)
+        story_ids = sorted({story_id for ids in by_key.values() for story_id in ids})
+        for i in range(0, len(story_ids), _QUERY_CHUNK):
+            stmt = select(Message).where(
+                Message.story_id.in_(story_ids[i:i + _QUERY_CHUNK]),
+                Message.minhash.is_not(None),
+                Message.event_timestamp >= cutoff,
+            )
+            for row in session.exec(stmt).all():
+                members.setdefault(row.story_id, []).append(row)
+    return by_key, members
+
+
+def assign_story_ids(messages: List[dict], index: Optional[StoryIndex] = None) -> List[StoryMatch]:
+    """
+    Give every message a story_id: the one of its most similar stored post (retention
+    window, via story_band) or earlier post of the run (via index) that does not name
+    other places, else a new one. Messages too short to cluster get none.
+    Sets "story_id" and "minhash" on each message and returns (message, matched post,
+    similarity) for those that joined a story.
+    """
+    settings = get_settings()
+    index = index if index is not None else StoryIndex()
+    threshold = settings.story_min_similarity
+
+    signatures = [minhash_signature(msg.get("text")) for msg in messages]
+    by_key, members = _stored_candidates([sig for sig in signatures if sig is not None])
+
+    mentions: Dict[int, frozenset] = {}
+
+    def mentions_of(post: Union[Message, dict]) -> frozenset:
+        if id(post) not in mentions:
+            mentions[id(post)] = place_mentions(post.raw_text if isinstance(post, Message) else post.get("text"))
+        return mentions[id(post)]
+
+    matches: List[StoryMatch] = []
+    for msg, signature in zip(messages, signatures):
+        if signature is None:
+            msg["story_id"] = None
+            msg["minhash"] = None
+            continue
+        found: List[Tuple[Union[Message, dict], float]] = []
+        candidates = {story_id for key in band_keys(signature) for story_id in by_key.get(key, ())}
+        for story_id in candidates:
+            for row in members.get(story_id, ()):
+                row_sig = decode_signature(row.minhash)
+                if row_sig is None:
+                    continue
+                score = similarity(signature, row_sig)
+                if score >= threshold:
+                    found.append((row, score))
+        found.extend(index.matches(signature, threshold))
+        found.sort(key=lambda item: -item[1])
+        matched, score = next(
+            ((post, score) for post, score in found if _compatible(mentions_of(msg), mentions_of(post))),
+            (None, 0.0),
+        )
+        if matched is None:
+            msg["story_id"] = uuid.uuid4().hex
+        else:
+            msg["story_id"] = matched.story_id if isinstance(matched, Message) else matched.get("story_id")
+            matches.append((msg, matched, score))
+        msg["minhash"] = encode_signature(signature)
+        index.add(signature, msg)
+    return matches
+
+
+def save_story_bands(messages: Iterable[dict]) -> int:
+    """
+    Register the LSH bands of stored messages under their story. Returns rows added.
+    """
+    pairs = set()
+    for msg in messages:
+        signature = decode_signature(msg.get("minhash"))
+        if signature is not None and msg.get("story_id"):
+            pairs.update((key, msg["story_id"]) for key in band_keys(signature))
+    if not pairs:
+        return 0
+    keys = sorted({key for key, _story in pairs})
+    with get_session() as session:
+        for i in range(0, len(keys), _QUERY_CHUNK):
+            stmt = select(StoryBand.band_key, StoryBand.story_id).where(
+                StoryBand.band_key.in_(keys[i:i + _QUERY_CHUNK])
+            )
+            pairs.difference_update(tuple(row) for row in session.exec(stmt).all())
+        session.add_all(StoryBand(band_key=key, story_id=story_id) for key, story_id in sorted(pairs))
+        session.commit()
+    return len(pairs)
+
+
+def delete_orphan_story_bands(session) -> None:
+    """
+    Drop bands of stories that no longer have any stored member (after retention cleanup).
+    """
+    from sqlmodel import delete
+
+    live = select(Message.story_id).where(Message.story_id.is_not(None)).distinct()
+    session.exec(delete(StoryBand).where(StoryBand.story_id.not_in(live)))
@@ -2,22 +2,9 @@
 from typing import Dict, List, Optional, Tuple
 
 from app.config import get_settings
+from app.services.batching import estimate_tokens, pack_batches
 from app.services.enrichment import normalize_text
-
-
-def detect_language(text: str) -> str | None:
-    """
-    Lightweight language detection wrapper.
-    Returns a language code or None if undetected.
-    """
-    try:
-        from langdetect import detect
-    except Exception:
-        return None
-    try:
-        return detect(text)
-    except Exception:
-        return None
+from app.services.language import detect_language, detect_languages  # noqa: F401
 
 
 def _get_openai_client(api_key: Optional[str]):
@@ -42,25 +29,19 @@ def _lang_label(lang: Optional[str]) -> str:
     return lang
 
 
-def _translate_subbatch(
+def _request_translations(
     texts: List[str],
     *,
-    source_lang: Optional[str],
-    target_lang: str,
+    source_label: str,
+    target_label: str,
     model_name: str,
     api_key: Optional[str],
     ai_client: Optional[object] = None,
-) -> List[str]:
+) -> Dict[int, str]:
     """
-    Translate a sub-batch of messages from source language to the target language.
-    Input texts map to output translations in the same order.
+    One AI call for texts. Returns {index: translation} for the indexes that came back
+    as valid, non-empty JSONL lines; anything else is left out.
     """
-    if not texts:
-        return []
-
-    source_label = _lang_label(source_lang)
-    target_label = _lang_label(target_lang)
-
     # Build a JSONL-only translation prompt
     header = (
         f"You are a professional translator.\n"
@@ -93,7 +74,7 @@ def _translate_subbatch(
 
     import json
     lines = [l.strip() for l in raw.splitlines() if l.strip()]
-    translations = [""] * len(texts)
+    translations: Dict[int, str] = {}
 
     # Parse JSONL lines and map translations back by index
     for line in lines:
@@ -108,26 +89,75 @@ def _translate_subbatch(
         idx = obj["index"]
         if not isinstance(idx, int):
             continue
-        if 0 <= idx < len(texts):
+        if 0 <= idx < len(texts) and obj["translation"]:
             translations[idx] = str(obj["translation"])
 
-    # Fallback: keep original text when a translation is missing
-    for i, t in enumerate(translations):
-        if not t:
-            translations[i] = texts[i]
-
     return translations
 
 
+def _translate_subbatch(
+    texts: List[str],
+    *,
+    source_lang: Optional[str],
+    target_lang: str,
+    model_name: str,
+    api_key: Optional[str],
+    ai_client: Optional[object] = None,
+    repair_retries: int = 0,
+) -> List[str]:
+    """
+    Translate a sub-batch of messages from source language to the target language.
+    Input texts map to output translations in the same order.
+    Indexes missing or malformed in the response are re-requested on their own, in
+    smaller follow-up batches, up to repair_retries times.
+    """
+    if not texts:
+        return []
+
+    request = dict(
+        source_label=_lang_label(source_lang),
+        target_label=_lang_label(target_lang),
+        model_name=model_name,
+        api_key=api_key,
+        ai_client=ai_client,
+    )
+    translations = _request_translations(texts, **request)
+    pending = [i for i in range(len(texts)) if i not in translations]
+    for attempt in range(1, repair_retries + 1):
+        if not pending:
+            break
+        chunk = max(1, (len(pending) + 1) // 2)
+        print(
+            f"[pipeline] [TRAD] repair {attempt}/{repair_retries}: "
+            f"{len(pending)} missing index(es), chunk={chunk}"
+        )
+        for i in range(0, len(pending), chunk):
+            indexes = pending[i:i + chunk]
+            # Follow-up prompts are renumbered from 0, map them back to the sub-batch
+            retried = _request_translations([texts[j] for j in indexes], **request)
+            for local, trans in retried.items():
+                translations[indexes[local]] = trans
+        pending = [i for i in pending if i not in translations]
+
+    # Fallback: keep original text when a translation is still missing
+    return [translations.get(i) or texts[i] for i in range(len(texts))]
+
+
 def translate_messages(
     messages: List[dict],
     *,
     target_language: Optional[str] = None,
     ai_client: Optional[object] = None,
+    evict_memory: bool = True,
 ) -> List[dict]:
     """
     Takes a list of dicts with at least 'text',
     adds 'translated_text' in successive batches.
+    Messages already carrying 'translated_text' (combined enrichment call) are kept.
+    Texts found in the translation memory are filled without calling the model.
+    Messages left untranslated by a failure (no AI settings, undetected language,
+    model error) keep their original text and get 'translation_fallback': True.
+    evict_memory=False skips the translation memory eviction (API request path).
     Mutates the list in place and returns it.
     """
     if not messages:
@@ -141,22 +171,35 @@ def translate_messages(
     print(f"[pipeline] [TRAD] batch_size={settings.batch_size}")
     if ai_client is None and (not settings.openai_api_key or not settings.openai_model):
         for msg in messages:
-            msg["translated_text"] = msg.get("text", "")
+            if not msg.get("translated_text"):
+                msg["translated_text"] = msg.get("text", "")
+                msg["translation_fallback"] = True
         return messages
 
-    has_text = any((msg.get("text") or "").strip() for msg in messages)
+    has_text = any(
+        (msg.get("text") or "").strip() and not msg.get("translated_text") for msg in messages
+    )
     if not has_text:
         for msg in messages:
-            msg["translated_text"] = msg.get("text", "")
+            if not msg.get("translated_text"):
+                msg["translated_text"] = msg.get("text", "")
         print("[pipeline] [TRAD] Translation skipped: no translatable fields required")
         return messages
 
+    # Detect all languages up front: script fast path, channel prior, then memoized langdetect
+    pending = [idx for idx, msg in enumerate(messages) if not msg.get("translated_text")]
+    detected = detect_languages(
+        [messages[idx].get("text", "") or "" for idx in pending],
+        [messages[idx].get("channel") for idx in pending],
+    )
+
     groups: Dict[str, List[Tuple[int, str, Optional[str]]]] = {}
-    for idx, msg in enumerate(messages):
+    for idx, source_lang in zip(pending, detected):
+        msg = messages[idx]
         text = msg.get("text", "") or ""
-        source_lang = detect_language(text)
         if not source_lang:
             msg["translated_text"] = text
+            msg["translation_fallback"] = True
             print("[pipeline] [TRAD] Translation skipped: missing source_lang")
             continue
         source_lang_code = source_lang.lower()
@@ -170,19 +213,69 @@ def translate_messages(
         print("[pipeline] [TRAD] Translation skipped: no translatable fields required")
         return messages
 
+    use_memory = settings.translation_memory_enabled
+    if use_memory:
+        from app.services.translation_memory import (
+            evict_translation_memory,
+            load_translations,
+            source_hash,
+            store_translations,
+        )
+    memory_hits = 0
+    memory_misses = 0
+
     batch_size = settings.batch_size
+    token_budget = settings.batch_token_budget
     total = len(messages)
-    print(f"[pipeline] [TRAD] batch_size={batch_size} | total={total} | groups={len(groups)}")
+    print(f"[pipeline] [TRAD] batch_size={batch_size} | token_budget={token_budget} | total={total} | groups={len(groups)}")
     for source_lang_code, items in groups.items():
-        for start in range(0, len(items), batch_size):
-            batch = items[start:start + batch_size]
+        if use_memory:
+            keys = {idx: source_hash(text) for idx, text, _lang in items}
+            found = load_translations(
+                keys.values(),
+                source_lang=source_lang_code,
+                target_lang=target_lang,
+                model_name=settings.openai_model,
+            )
+            remaining = []
+            for item in items:
+                trans = found.get(keys[item[0]])
+                if trans:
+                    messages[item[0]]["translated_text"] = trans
+                else:
+                    remaining.append(item)
+            memory_hits += len(items) - len(remaining)
+            memory_misses += len(remaining)
+            items = remaining
+
+        # Identical texts (linked duplicates, reposts) are translated once
+        copies: Dict[str, List[int]] = {}
+        unique_items = []
+        for item in items:
+            if item[1] in copies:
+                copies[item[1]].append(item[0])
+                continue
+            copies[item[1]] = [item[0]]
+            unique_items.append(item)
+        items = unique_items
+
+        # Pack by estimated tokens (batch_size stays the hard max item count)
+        batches = pack_batches(
+            items,
+            cost=lambda item: estimate_tokens(item[1]),
+            token_budget=token_budget,
+            max_items=batch_size,
+        )
+        start = 0
+        for batch in batches:
             indices = [i for i, _text, _lang in batch]
             texts = [text for _i, text, _lang in batch]
             source_lang = batch[0][2]
+            est_tokens = sum(estimate_tokens(text) for text in texts)
 
             print(
-                f"[pipeline] [TRAD] batch {start + 1}-{min(start + batch_size, len(items))} / {total} "
-                f"(size={len(batch)} | lang={source_lang or source_lang_code})"
+                f"[pipeline] [TRAD] batch {start + 1}-{start + len(batch)} / {total} "
+                f"(size={len(batch)} | est_tokens={est_tokens} | lang={source_lang or source_lang_code})"
             )
             translations = _translate_subbatch(
                 texts,
@@ -191,13 +284,44 @@ def translate_messages(
                 model_name=settings.openai_model,
                 api_key=settings.openai_api_key,
                 ai_client=ai_client,
+                repair_retries=settings.ai_repair_retries,
             )
 
-            for idx, trans in zip(indices, translations):
-                messages[idx]["translated_text"] = trans
+            for text, trans in zip(texts, translations):
+                for idx in copies[text]:
+                    messages[idx]["translated_text"] = trans
+                    if trans == text:
+                        messages[idx]["translation_fallback"] = True
+            if use_memory:
+                # Untranslated fallbacks (original text) are not remembered
+                try:
+                    store_translations(
+                        {keys[idx]: trans for idx, text, trans in zip(indices, texts, translations) if trans != text},
+                        source_lang=source_lang_code,
+                        target_lang=target_lang,
+                        model_name=settings.openai_model,
+                    )
+                except Exception as e:
+                    # The memory is a cache: keep the translations already paid for
+                    print(f"[pipeline] [TRAD][MEMORY][ERROR] storing translations failed: {e}")
             print(
-                f"[pipeline] [TRAD] batch done {start + 1}-{min(start + batch_size, len(items))} / {total} "
+                f"[pipeline] [TRAD] batch done {start + 1}-{start + len(batch)} / {total} "
                 f"(size={len(batch)} | lang={source_lang or source_lang_code})"
             )
+            start += len(batch)
+
+    if use_memory:
+        evicted = 0
+        if evict_memory:
+            evicted = evict_translation_memory(
+                settings.translation_memory_max_age_days,
+                settings.translation_memory_max_rows,
+            )
+        looked_up = memory_hits + memory_misses
+        hit_rate = memory_hits / looked_up if looked_up else 0.0
+        print(
+            f"[pipeline] [TRAD][MEMORY] hits={memory_hits} | misses={memory_misses} | "
+            f"hit_rate={hit_rate:.0%} | evicted={evicted}"
+        )
 
     return messages
@@ -0,0 +1,102 @@
+# app/services/translation_memory.py
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlmodel import select, update
+
+from app.database import get_session, upsert_rows
+from app.services.cache_eviction import evict_least_recently_used
+from app.models.translation_memory import TranslationMemoryEntry
+from app.services.enrichment import normalize_text
+from app.services.enrichment_cache import text_hash
+
+
+def source_hash(text: str) -> str:
+    """
+    Translation memory key for a source text (normalized, so reposts with different
+    spacing share an entry).
+    """
+    return text_hash(normalize_text(text))
+
+
+def _key_filter(hashes, source_lang: str, target_lang: str, model_name: Optional[str]):
+    return (
+        TranslationMemoryEntry.text_hash.in_(hashes),
+        TranslationMemoryEntry.source_lang == source_lang,
+        TranslationMemoryEntry.target_lang == target_lang,
+        TranslationMemoryEntry.model_name == (model_name or ""),
+    )
+
+
+def load_translations(
+    hashes: Iterable[str],
+    *,
+    source_lang: str,
+    target_lang: str,
+    model_name: Optional[str],
+) -> Dict[str, str]:
+    """
+    Return stored translations by source hash and mark the entries as recently used.
+    """
+    hashes = list(set(hashes))
+    if not hashes:
+        return {}
+    where = _key_filter(hashes, source_lang, target_lang, model_name)
+    with get_session() as session:
+        stmt = select(TranslationMemoryEntry.text_hash, TranslationMemoryEntry.translation).where(*where)
+        found = {key: translation for key, translation in session.exec(stmt).all()}
+        if found:
+            session.exec(
+                update(TranslationMemoryEntry)
+                .where(*_key_filter(list(found), source_lang, target_lang, model_name))
+                .values(last_used_at=datetime.utcnow())
+            )
+            session.commit()
+    return found
+
+
+def store_translations(
+    translations: Dict[str, str],
+    *,
+    source_lang: str,
+    target_lang: str,
+    model_name: Optional[str],
+) -> int:
+    """
+    Insert or refresh translations (source hash -> translation).
+    Returns the number of entries written.
+    """
+    if not translations:
+        return 0
+    now = datetime.utcnow()
+    rows = [
+        {
+            "text_hash": key,
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "model_name": model_name or "",
+            "translation": translation,
+            "created_at": now,
+            "last_used_at": now,
+        }
+        for key, translation in translations.items()
+    ]
+    # Pipeline stages and API threads may store the same key at once
+    with get_session() as session:
+        upsert_rows(
+            session,
+            TranslationMemoryEntry.__table__,
+            rows,
+            ["text_hash", "source_lang", "target_lang", "model_name"],
+            ["translation", "last_used_at"],
+        )
+        session.commit()
+    return len(translations)
+
+
+def evict_translation_memory(max_age_days: int, max_rows: int) -> int:
+    """
+    Drop entries unused for max_age_days, then the least recently used ones above max_rows.
+    Returns the number of deleted entries.
+    """
+    return evict_least_recently_used(TranslationMemoryEntry, max_age_days, max_rows)
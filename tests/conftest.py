@@ -0,0 +1,53 @@
+# tests/conftest.py
+from pathlib import Path
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings require Telegram credentials; the database must be chosen before app.database
+# is imported (engines are created at import time)
+_TMP_DIR = Path(tempfile.mkdtemp(prefix="osint-tests-"))
+os.environ.setdefault("TELEGRAM_API_ID", "1")
+os.environ.setdefault("TELEGRAM_API_HASH", "test")
+os.environ.setdefault("TELEGRAM_SESSION", "test")
+os.environ.setdefault("SOURCES_TELEGRAM", "test_channel")
+os.environ["DB_URL"] = f"sqlite:///{_TMP_DIR / 'test.db'}"
+os.environ.pop("DB_READ_URL", None)
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+for path in (ROOT_DIR, ROOT_DIR / "tools"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import app.api  # noqa: E402,F401  (resolves the app.api <-> services import cycle first)
+from sqlmodel import SQLModel, delete  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.database import get_session, init_db  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def _schema():
+    init_db()
+
+
+@pytest.fixture
+def db(_schema):
+    """
+    Empty database for the test (tables created once per session).
+    """
+    with get_session() as session:
+        for table in reversed(SQLModel.metadata.sorted_tables):
+            session.exec(delete(table))
+        session.commit()
+    yield
+
+
+@pytest.fixture
+def settings():
+    """
+    Process settings; change fields for one test with monkeypatch.setattr(settings, ...).
+    """
+    return get_settings()
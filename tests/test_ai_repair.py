@@ -0,0 +1,151 @@
+# tests/test_ai_repair.py
+import json
+import re
+from types import SimpleNamespace
+from typing import Callable, List
+
+from app.services.enrichment import EnrichmentConfig, _enrich_subbatch
+from app.services.translation import _translate_subbatch
+
+
+class FakeClient:
+    """
+    Stand-in for the OpenAI client: client.responses.create(...) hands the prompt to
+    reply(prompt, call_number) and returns its text as output_text.
+    """
+
+    def __init__(self, reply: Callable[[str, int], str]) -> None:
+        self.prompts: List[str] = []
+        self._reply = reply
+        self.responses = SimpleNamespace(create=self._create)
+
+    def _create(self, *, model, input, **_kwargs):
+        self.prompts.append(input)
+        return SimpleNamespace(output_text=self._reply(input, len(self.prompts)))
+
+
+# --- translation ---------------------------------------------------------------
+
+def _numbered_texts(prompt: str) -> List[str]:
+    body = prompt.split("Messages:\n", 1)[1]
+    return [re.sub(r"^\[\d+\] ", "", line) for line in body.split("\n")]
+
+
+def _translation_line(index: int, text: str) -> str:
+    return json.dumps({"index": index, "translation": text.upper()})
+
+
+def _translate(texts, client, repair_retries):
+    return _translate_subbatch(
+        texts, source_lang="en", target_lang="fr", model_name="test-model",
+        api_key=None, ai_client=client, repair_retries=repair_retries,
+    )
+
+
+def test_translation_repair_re_requests_only_missing_indexes():
+    def reply(prompt, call):
+        texts = _numbered_texts(prompt)
+        if call == 1:
+            # Index 1 missing, index 2 malformed, index 3 empty
+            return "\n".join([
+                _translation_line(0, texts[0]),
+                '{"index": 2, "translation": "broken',
+                json.dumps({"index": 3, "translation": ""}),
+            ])
+        return "\n".join(_translation_line(i, t) for i, t in enumerate(texts))
+
+    client = FakeClient(reply)
+    texts = ["zero", "one", "two", "three"]
+    assert _translate(texts, client, repair_retries=2) == ["ZERO", "ONE", "TWO", "THREE"]
+    # Three pending indexes, re-requested in halves (2 + 1), renumbered from 0
+    assert [_numbered_texts(p) for p in client.prompts[1:]] == [["one", "two"], ["three"]]
+
+
+def test_translation_without_repair_keeps_the_original_text():
+    client = FakeClient(lambda prompt, call: _translation_line(0, _numbered_texts(prompt)[0]))
+    assert _translate(["zero", "one"], client, repair_retries=0) == ["ZERO", "one"]
+    assert len(client.prompts) == 1
+
+
+def test_translation_repair_gives_up_after_the_retries():
+    client = FakeClient(lambda prompt, call: "not json at all")
+    assert _translate(["a", "b", "c", "d"], client, repair_retries=2) == ["a", "b", "c", "d"]
+    # 1 request, then 2 chunks of 2, then 2 chunks of 2 again
+    assert len(client.prompts) == 5
+
+
+def test_translation_ignores_out_of_range_indexes():
+    client = FakeClient(lambda prompt, call: _translation_line(5, "x") + "\n" + _translation_line(0, "zero"))
+    assert _translate(["zero"], client, repair_retries=1) == ["ZERO"]
+    assert len(client.prompts) == 1
+
+
+# --- enrichment ----------------------------------------------------------------
+
+def _inputs(prompt: str) -> List[dict]:
+    return [json.loads(line) for line in prompt.split("Inputs:\n", 1)[1].split("\n")]
+
+
+def _enrichment_line(item: dict, **overrides) -> str:
+    obj = {"id": item["id"]}
+    for name in item["missing_fields"]:
+        obj[name] = f"{name}-{item['id']}"
+    if "event_type" in obj:
+        obj["event_type"] = "shelling"
+    obj.update(overrides)
+    return json.dumps(obj)
+
+
+def _items(count: int) -> List[dict]:
+    return [
+        {"id": i, "text": f"text {i}", "known_fields": {}, "missing_fields": ["title", "event_type"]}
+        for i in range(count)
+    ]
+
+
+def test_enrichment_repair_re_requests_missing_and_incomplete_ids():
+    def reply(prompt, call):
+        items = _inputs(prompt)
+        if call == 1:
+            # id 1 omitted, id 2 lacks a requested field
+            return "\n".join([
+                _enrichment_line(items[0]),
+                json.dumps({"id": 2, "title": "no event_type"}),
+            ])
+        return "\n".join(_enrichment_line(item) for item in items)
+
+    client = FakeClient(reply)
+    config = EnrichmentConfig(ai_client=client, model_name="test-model", repair_retries=1)
+    results = _enrich_subbatch(_items(3), config, api_key=None)
+    assert results == [
+        {"title": f"title-{i}", "event_type": "shelling"} for i in range(3)
+    ]
+    assert [[item["id"] for item in _inputs(p)] for p in client.prompts[1:]] == [[1], [2]]
+
+
+def test_enrichment_without_repair_retries_makes_a_single_call():
+    client = FakeClient(lambda prompt, call: _enrichment_line(_inputs(prompt)[0]))
+    # None is what direct callers get when they skip _resolve_config
+    for retries in (None, 0):
+        client.prompts.clear()
+        config = EnrichmentConfig(ai_client=client, model_name="test-model", repair_retries=retries)
+        results = _enrich_subbatch(_items(2), config, api_key=None)
+        assert results == [{"title": "title-0", "event_type": "shelling"}, {}]
+        assert len(client.prompts) == 1
+
+
+def test_enrichment_repair_gives_up_after_the_retries():
+    client = FakeClient(lambda prompt, call: "")
+    config = EnrichmentConfig(ai_client=client, model_name="test-model", repair_retries=3)
+    assert _enrich_subbatch(_items(1), config, api_key=None) == [{}]
+    assert len(client.prompts) == 4
+
+
+def test_enrichment_drops_event_types_outside_the_lexicon():
+    client = FakeClient(
+        lambda prompt, call: "\n".join(_enrichment_line(item, event_type="alien_invasion") for item in _inputs(prompt))
+    )
+    config = EnrichmentConfig(ai_client=client, model_name="test-model", repair_retries=1)
+    assert _enrich_subbatch(_items(1), config, api_key=None) == [{"title": "title-0", "event_type": ""}]
+    # A valid line with an unknown type is not re-requested
+    assert len(client.prompts) == 1
@@ -0,0 +1,60 @@
+# tests/test_batching.py
+import random
+
+from app.services.batching import estimate_tokens, pack_batches
+
+
+def _identity(value: int) -> int:
+    return value
+
+
+def test_estimate_tokens():
+    assert estimate_tokens(None) == 1
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("abcd" * 10) == 11
+    # Counted in UTF-8 bytes: Cyrillic costs twice as much as Latin
+    assert estimate_tokens("а" * 40) == estimate_tokens("a" * 80)
+
+
+def test_packs_up_to_the_token_budget():
+    batches = pack_batches([40, 30, 30, 50, 10, 60], cost=_identity, token_budget=100, max_items=10)
+    assert batches == [[40, 30, 30], [50, 10], [60]]
+
+
+def test_max_items_caps_each_batch():
+    batches = pack_batches([1] * 7, cost=_identity, token_budget=1000, max_items=3)
+    assert batches == [[1, 1, 1], [1, 1, 1], [1]]
+
+
+def test_oversized_item_gets_a_batch_of_its_own():
+    batches = pack_batches([10, 500, 10], cost=_identity, token_budget=100, max_items=10)
+    assert batches == [[10], [500], [10]]
+
+
+def test_zero_budget_falls_back_to_fixed_batches():
+    items = list(range(5))
+    assert pack_batches(items, cost=_identity, token_budget=0, max_items=2) == [[0, 1], [2, 3], [4]]
+    # max_items below 1 still makes progress
+    assert pack_batches(items, cost=_identity, token_budget=0, max_items=0) == [[i] for i in items]
+
+
+def test_empty_input():
+    assert pack_batches([], cost=_identity, token_budget=100, max_items=5) == []
+
+
+def test_random_packing_keeps_order_and_limits():
+    rng = random.Random(3)
+    for _ in range(200):
+        items = [rng.randint(1, 150) for _ in range(rng.randint(0, 60))]
+        budget = rng.randint(50, 400)
+        max_items = rng.randint(1, 12)
+        batches = pack_batches(items, cost=_identity, token_budget=budget, max_items=max_items)
+        # Every item exactly once, in order
+        assert [item for batch in batches for item in batch] == items
+        for i, batch in enumerate(batches):
+            assert 1 <= len(batch) <= max_items
+            assert sum(batch) <= budget or len(batch) == 1
+            # Greedy: the next batch's first item did not fit in this one
+            if i + 1 < len(batches):
+                nxt = batches[i + 1][0]
+                assert len(batch) == max_items or sum(batch) + nxt > budget
@@ -0,0 +1,115 @@
+# tests/test_country_matcher.py
+import random
+import re
+from typing import List, Optional
+
+import pytest
+
+from app.services.enrichment import (
+    _load_country_data,
+    _pycountry_names,
+    _strip_emoji_prefix,
+    find_country_mentions,
+    infer_country,
+    infer_event_type,
+)
+
+_FILLER = [
+    "strike", "near", "the", "border", "reported", "overnight", "in", "of", "and",
+    "officials", "said", "sources", "region", "city", "north", "south", "—", ",", ".",
+    "обстрел", "город", "ville", "près", "de",
+]
+
+
+def _baseline_infer_country(text: str) -> tuple[Optional[str], float]:
+    # Per-term scan infer_country used before the single alternation
+    if not text:
+        return None, 0.0
+    aliases, _coords = _load_country_data()
+    text_lower = text.lower()
+
+    def position(term: str) -> Optional[int]:
+        match = re.search(r"(?<!\w)" + re.escape(term) + r"(?!\w)", text_lower)
+        return match.start() if match else None
+
+    matches: List[tuple[int, str]] = []
+    for alias, canonical in aliases.items():
+        pos = position(alias)
+        if pos is not None:
+            matches.append((pos, canonical))
+    if matches:
+        matches.sort(key=lambda x: x[0])
+        return _strip_emoji_prefix(matches[0][1]), 0.95
+    for name in _pycountry_names():
+        if position(name.lower()) is not None:
+            return name, 0.7
+    return None, 0.0
+
+
+def _random_texts(count: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    aliases, _coords = _load_country_data()
+    terms = list(aliases) + _pycountry_names()
+    texts = []
+    for _ in range(count):
+        words = [rng.choice(_FILLER) for _ in range(rng.randint(0, 12))]
+        for _ in range(rng.randint(0, 3)):
+            term = rng.choice(terms)
+            # Mixed case, glued to neighbouring letters or punctuation
+            term = rng.choice([term, term.upper(), term.title()])
+            words.insert(rng.randint(0, len(words)), rng.choice([term, term + "s", "x" + term, f"({term})"]))
+        texts.append(" ".join(words))
+    return texts
+
+
+def test_infer_country_matches_baseline_scan():
+    for text in _random_texts(500):
+        assert infer_country(text) == _baseline_infer_country(text), text
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("", (None, 0.0)),
+        ("Nothing to see here", (None, 0.0)),
+        # Country names inside other words never match
+        ("Frenchfries and Ukrainex", (None, 0.0)),
+    ],
+)
+def test_infer_country_edge_cases(text, expected):
+    assert infer_country(text) == expected == _baseline_infer_country(text)
+
+
+def test_find_country_mentions_lists_every_match_in_order():
+    text = "Talks between Ukraine and Poland, then Ukraine again"
+    mentions = find_country_mentions(text)
+    assert [pos for pos, _country, _conf in mentions] == sorted(pos for pos, _c, _f in mentions)
+    countries = [country for _pos, country, _conf in mentions]
+    assert countries.count("Ukraine") == 2
+    assert "Poland" in countries
+    assert mentions[0][1] == infer_country(text)[0]
+
+
+def test_event_type_clear_winner():
+    assert infer_event_type("Drone attack on Kharkiv: shahed drones shot down") == ("drone_attack", 0.9)
+
+
+def test_event_type_wildcard_keywords_match_word_endings():
+    assert infer_event_type("Ночью обстрелы Херсона") == ("shelling", 0.9)
+    assert infer_event_type("Missiles hit the port")[0] == "missile_strike"
+
+
+def test_event_type_tie_is_left_to_the_ai():
+    # One hit each: lexicon order picks the type, at low confidence
+    assert infer_event_type("Protest after the explosion") == ("explosion", 0.6)
+
+
+def test_event_type_none_without_keywords():
+    assert infer_event_type("Weather is mild today") == (None, 0.0)
+    assert infer_event_type("") == (None, 0.0)
+
+
+def test_country_terms_do_not_count_as_event_keywords():
+    country, _conf = infer_country("Strike in Ukraine")
+    assert country == "Ukraine"
+    assert infer_event_type("Ukraine")[0] is None
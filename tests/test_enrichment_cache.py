@@ -0,0 +1,32 @@
+# tests/test_enrichment_cache.py
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from app.services.enrichment_cache import load_cached_enrichments, store_enrichments, text_hash
+
+KEY = dict(pipeline_version="1", model_name="test-model", target_language="fr")
+
+
+def test_store_enrichments_completes_entries(db):
+    key = text_hash("strike on kharkiv")
+    store_enrichments({key: {"country": "Ukraine", "title": None}}, **KEY)
+    # A later call asking for other fields keeps the ones already stored
+    store_enrichments({key: {"location": "Kharkiv", "title": "Frappe sur Kharkiv"}}, **KEY)
+    assert load_cached_enrichments([key], **KEY) == {
+        key: {"country": "Ukraine", "region": None, "location": "Kharkiv", "title": "Frappe sur Kharkiv", "event_type": None}
+    }
+    # Titles are localized: another target language is another entry
+    assert load_cached_enrichments([key], **dict(KEY, target_language="en")) == {}
+
+
+def test_concurrent_writers_of_the_same_keys(db):
+    results = {text_hash(f"text {i}"): {"country": "Poland", "title": f"t{i}"} for i in range(50)}
+    start = threading.Barrier(6)
+
+    def write(_n):
+        start.wait()
+        return store_enrichments(results, **KEY)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        assert list(pool.map(write, range(6))) == [50] * 6
+    assert len(load_cached_enrichments(results, **KEY)) == 50
@@ -0,0 +1,106 @@
+# tests/test_fetch.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from telethon.tl.types import Channel, InputPeerChannel, User
+
+from app.services.fetch import (
+    RequestScheduler,
+    _fetch_channel,
+    _resolve_entity,
+    load_entity_cache,
+    save_entity_cache,
+)
+
+NOW = datetime.now(timezone.utc)
+CUTOFF = NOW - timedelta(hours=24)
+
+
+class FakeTelegram:
+    """
+    Channel history for get_messages / iter_messages: newest first, ids above min_id.
+    """
+
+    def __init__(self, ids):
+        self.history = [
+            SimpleNamespace(id=i, date=NOW - timedelta(minutes=100 - i), message=f"post {i}")
+            for i in sorted(ids, reverse=True)
+        ]
+        self.entity = SimpleNamespace(id=42, access_hash=7, title="Channel")
+
+    async def get_entity(self, chan):
+        return self.entity
+
+    async def get_messages(self, entity, *, limit, min_id):
+        return [m for m in self.history if m.id > min_id][:limit]
+
+    async def iter_messages(self, entity, *, limit, min_id):
+        for m in (await self.get_messages(entity, limit=limit, min_id=min_id)):
+            yield m
+
+
+def _fetch(client, *, min_id, max_per_channel=50, stream_cap=0):
+    return asyncio.run(
+        _fetch_channel(
+            client, "chan", "neutral", None,
+            max_per_channel=max_per_channel, cutoff=CUTOFF, min_id=min_id, stream_cap=stream_cap,
+            entity_cache={}, resolved={}, scheduler=RequestScheduler(0, 1),
+            semaphore=asyncio.Semaphore(1),
+        )
+    )
+
+
+def test_capped_fetch_above_a_watermark_is_flagged():
+    client = FakeTelegram(range(1, 91))
+    msgs = _fetch(client, min_id=10, max_per_channel=50)
+    assert [m["telegram_message_id"] for m in msgs] == list(range(90, 40, -1))
+    assert all(m.get("fetch_truncated") for m in msgs)
+
+    msgs = _fetch(client, min_id=10, stream_cap=30)
+    assert len(msgs) == 30 and all(m.get("fetch_truncated") for m in msgs)
+
+
+def test_complete_or_first_fetches_are_not_flagged():
+    client = FakeTelegram(range(1, 91))
+    # Everything above the watermark fits under the cap
+    msgs = _fetch(client, min_id=60, max_per_channel=50)
+    assert len(msgs) == 30 and not any(m.get("fetch_truncated") for m in msgs)
+    # No watermark yet: nothing was skipped between it and the posts fetched
+    msgs = _fetch(client, min_id=0, max_per_channel=50)
+    assert len(msgs) == 50 and not any(m.get("fetch_truncated") for m in msgs)
+
+
+def _telethon(cls, **attrs):
+    # Bare Telethon entity with just the attributes the fetch code reads
+    entity = cls.__new__(cls)
+    for name, value in attrs.items():
+        setattr(entity, name, value)
+    return entity
+
+
+def _resolve(entity, entity_cache=None):
+    client = SimpleNamespace(get_entity=lambda chan: asyncio.sleep(0, entity))
+    resolved = {}
+    result = asyncio.run(_resolve_entity(client, "chan", entity_cache or {}, resolved, RequestScheduler(0, 1)))
+    return result, resolved
+
+
+def test_only_channels_are_cached(db):
+    channel = _telethon(Channel, id=42, access_hash=7, title="News", username="news")
+    (peer, title), resolved = _resolve(channel)
+    assert (peer, title) == (channel, "News")
+    save_entity_cache(resolved)
+    assert load_entity_cache(["chan"], ttl_hours=1) == {"chan": {"peer_id": 42, "access_hash": 7, "title": "News"}}
+
+    # Cache hits are rebuilt as channel peers
+    (peer, title), resolved = _resolve(None, load_entity_cache(["chan"], ttl_hours=1))
+    assert isinstance(peer, InputPeerChannel) and (peer.channel_id, peer.access_hash, title) == (42, 7, "News")
+    assert resolved == {}
+
+    # A source that turns out to be a user drops the cached channel entry
+    user = _telethon(User, id=5, access_hash=9, username="someone")
+    (peer, title), resolved = _resolve(user)
+    assert (peer, title) == (user, "someone") and resolved == {"chan": None}
+    save_entity_cache(resolved)
+    assert load_entity_cache(["chan"], ttl_hours=1) == {}
@@ -0,0 +1,87 @@
+# tests/test_lazy_translation.py
+from concurrent.futures import ThreadPoolExecutor
+import json
+import threading
+
+import pytest
+from sqlmodel import select
+
+from app.database import get_session
+from app.models.message import Message
+from app.models.message_translation import MessageTranslation
+from app.services import translation, translation_memory
+from app.services.lazy_translation import ensure_translations
+from test_ai_repair import FakeClient, _numbered_texts
+
+
+def _translate_all(prompt, _call):
+    return "\n".join(
+        json.dumps({"index": i, "translation": f"EN: {text}"}) for i, text in enumerate(_numbered_texts(prompt))
+    )
+
+
+@pytest.fixture
+def messages(db):
+    with get_session() as session:
+        rows = [Message(source="test", channel="a", telegram_message_id=i, raw_text=f"Взрыв номер {i}") for i in range(3)]
+        session.add_all(rows)
+        session.commit()
+        for row in rows:
+            session.refresh(row)
+        session.expunge_all()
+    return rows
+
+
+@pytest.fixture
+def client(settings, monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "test-key")
+    monkeypatch.setattr(settings, "openai_model", "test-model")
+    monkeypatch.setattr(settings, "translation_memory_enabled", True)
+    fake = FakeClient(_translate_all)
+    monkeypatch.setattr(translation, "_get_openai_client", lambda api_key: fake)
+    return fake
+
+
+def _side_table():
+    with get_session() as session:
+        return sorted((row.message_id, row.translated_text) for row in session.exec(select(MessageTranslation)).all())
+
+
+def test_views_do_not_translate_when_lazy_translation_is_off(messages, client, settings, monkeypatch):
+    monkeypatch.setattr(settings, "lazy_translation", False)
+    with get_session() as session:
+        assert ensure_translations(session, messages, "en") == {}
+    assert client.prompts == []
+
+
+def test_first_view_translates_and_stores_without_maintenance(messages, client, settings, monkeypatch):
+    monkeypatch.setattr(settings, "lazy_translation", True)
+
+    def no_eviction(*_args):
+        raise AssertionError("eviction on the request path")
+
+    monkeypatch.setattr(translation_memory, "evict_translation_memory", no_eviction)
+    with get_session() as session:
+        translations = ensure_translations(session, messages, "en")
+        assert translations == {m.id: f"EN: {m.raw_text}" for m in messages}
+        assert len(client.prompts) == 1
+        # Later views read the side table
+        assert ensure_translations(session, messages, "en") == translations
+    assert len(client.prompts) == 1
+    assert _side_table() == sorted(translations.items())
+
+
+def test_concurrent_first_views_store_each_translation_once(messages, client, settings, monkeypatch):
+    monkeypatch.setattr(settings, "lazy_translation", True)
+    start = threading.Barrier(4)
+
+    def view(_n):
+        start.wait()
+        with get_session() as session:
+            return ensure_translations(session, messages, "en")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(view, range(4)))
+    expected = {m.id: f"EN: {m.raw_text}" for m in messages}
+    assert results == [expected] * 4
+    assert _side_table() == sorted(expected.items())
@@ -0,0 +1,164 @@
+# tests/test_retention.py
+from datetime import datetime, timedelta, timezone
+import sqlite3
+
+import pytest
+from sqlmodel import select
+
+from app.database import _create_engine, engine, get_session
+from app.models.daily_rollup import DailyRollup
+from app.models.message import Message
+from app.models.message_translation import MessageTranslation
+from app.models.story_band import StoryBand
+from app.services import retention
+from app.services.retention import delete_in_chunks, purge_old_messages
+from app.services.rollup import rebuild_rollup
+from run_pipeline import store_messages
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def _seed(old: int, recent: int) -> None:
+    messages = [
+        {
+            "source": "test", "channel": "a", "telegram_message_id": i, "text": f"post {i}",
+            "country": "Ukraine" if i % 2 else "Poland", "label": "neutral",
+            # Old posts are interleaved with recent ones in id order
+            "date": NOW - timedelta(days=10 if i % 3 == 0 and i // 3 < old else 0, minutes=i),
+        }
+        for i in range(old * 3 + recent)
+    ]
+    store_messages(messages)
+    with get_session() as session:
+        ids = session.exec(select(Message.id)).all()
+        session.add_all(MessageTranslation(message_id=i, target_lang="en", translated_text="x") for i in ids)
+        session.add_all([StoryBand(band_key="old", story_id="s-old"), StoryBand(band_key="new", story_id="s-new")])
+        session.commit()
+
+
+def _rollup_rows():
+    with get_session() as session:
+        return sorted(
+            (row.day, row.country_norm, row.country_raw, row.source, row.label, row.event_type, row.count)
+            for row in session.exec(select(DailyRollup)).all()
+        )
+
+
+def _counts():
+    with get_session() as session:
+        messages = session.exec(select(Message)).all()
+        translations = session.exec(select(MessageTranslation)).all()
+    return messages, translations
+
+
+def test_delete_in_chunks_removes_only_expired_messages(db, settings, monkeypatch):
+    monkeypatch.setattr(settings, "retention_chunk_size", 7)
+    monkeypatch.setattr(settings, "retention_pause_ms", 0)
+    _seed(old=30, recent=20)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=7)
+
+    assert delete_in_chunks(cutoff) == 30
+    messages, translations = _counts()
+    assert len(messages) == 3 * 30 + 20 - 30
+    assert all(m.event_timestamp.replace(tzinfo=timezone.utc) >= cutoff for m in messages)
+    assert sorted(t.message_id for t in translations) == sorted(m.id for m in messages)
+    # The rollup followed the deletes
+    before = _rollup_rows()
+    rebuild_rollup()
+    assert _rollup_rows() == before
+
+    assert delete_in_chunks(cutoff) == 0
+
+
+def test_delete_in_chunks_pauses_between_full_chunks(db, settings, monkeypatch):
+    monkeypatch.setattr(settings, "retention_chunk_size", 10)
+    monkeypatch.setattr(settings, "retention_pause_ms", 5)
+    pauses = []
+    monkeypatch.setattr(retention.time, "sleep", pauses.append)
+    _seed(old=25, recent=0)
+
+    assert delete_in_chunks(datetime.now(timezone.utc) - timedelta(days=7)) == 25
+    # Chunks of 10, 10 and 5: no pause after the last one
+    assert pauses == [0.005, 0.005]
+
+
+def test_purge_old_messages_drops_orphan_story_bands(db, settings, monkeypatch):
+    monkeypatch.setattr(settings, "retention_pause_ms", 0)
+    monkeypatch.setattr(settings, "auto_delete_days", 7)
+    _seed(old=5, recent=5)
+    with get_session() as session:
+        for message in session.exec(select(Message)).all():
+            message.story_id = "s-old" if message.event_timestamp < (NOW - timedelta(days=7)).replace(tzinfo=None) else "s-new"
+            session.add(message)
+        session.commit()
+
+    assert purge_old_messages() == (0, 5)
+    with get_session() as session:
+        assert session.exec(select(StoryBand.story_id)).all() == ["s-new"]
+    assert purge_old_messages() == (0, 0)
+
+
+def _freelist(sqlite_engine) -> int:
+    with sqlite_engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+
+
+def test_sqlite_reclaim_releases_freed_pages(db, settings, monkeypatch, capsys):
+    monkeypatch.setattr(settings, "retention_pause_ms", 0)
+    with engine.connect() as conn:
+        # New files get INCREMENTAL from the connect pragmas
+        assert conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2
+    _seed(old=200, recent=0)
+    delete_in_chunks(datetime.now(timezone.utc) - timedelta(days=7))
+    assert _freelist(engine) > 0
+    retention._sqlite_reclaim()
+    assert _freelist(engine) == 0
+    assert "convert_sqlite_auto_vacuum" not in capsys.readouterr().out
+
+
+@pytest.fixture
+def legacy_engine(tmp_path, monkeypatch):
+    # A file created before auto_vacuum=INCREMENTAL, with free pages to reclaim
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        "CREATE TABLE filler (payload TEXT);"
+        "INSERT INTO filler SELECT hex(randomblob(500)) FROM (WITH RECURSIVE n(i) AS "
+        "(SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 2000) SELECT i FROM n);"
+        "DELETE FROM filler;"
+    )
+    conn.close()
+    legacy = _create_engine(f"sqlite:///{path}")
+    monkeypatch.setattr(retention, "engine", legacy)
+    yield legacy
+    legacy.dispose()
+
+
+def test_sqlite_reclaim_only_hints_on_legacy_files(legacy_engine, capsys):
+    free_pages = _freelist(legacy_engine)
+    assert free_pages > 0
+    retention._sqlite_reclaim()
+    assert "convert_sqlite_auto_vacuum" in capsys.readouterr().out
+    # No full VACUUM from retention: the free pages are still there
+    assert _freelist(legacy_engine) == free_pages
+
+
+def test_convert_sqlite_auto_vacuum_runs_once(legacy_engine):
+    assert retention.convert_sqlite_auto_vacuum() is True
+    assert retention.convert_sqlite_auto_vacuum() is False
+    assert _freelist(legacy_engine) == 0
+
+
+def test_sqlite_reclaim_steps_are_bounded_by_the_initial_freelist(db, settings, monkeypatch):
+    monkeypatch.setattr(settings, "retention_pause_ms", 1)
+    monkeypatch.setattr(retention, "_VACUUM_STEP_PAGES", 3)
+    pauses = []
+    monkeypatch.setattr(retention.time, "sleep", pauses.append)
+    _seed(old=200, recent=0)
+    delete_in_chunks(datetime.now(timezone.utc) - timedelta(days=7))
+    pauses.clear()
+    free_pages = _freelist(engine)
+    retention._sqlite_reclaim()
+    # ceil(free / step) steps, pausing between them
+    assert len(pauses) == -(-free_pages // 3) - 1
+    assert _freelist(engine) == 0
@@ -0,0 +1,123 @@
+# tests/test_rollup.py
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+import random
+
+from sqlmodel import delete, select
+
+from app.database import get_session
+from app.models.daily_rollup import DailyRollup
+from app.models.message import Message
+from app.services.country_events_service import get_active_countries_service
+from app.services.rollup import add_to_rollup, rebuild_rollup, subtract_from_rollup
+from run_pipeline import store_messages
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+COUNTRIES = ["Ukraine", "Poland", "France", "Atlantis", None]
+
+
+def _rollup_rows():
+    with get_session() as session:
+        return sorted(
+            (row.day, row.country_norm, row.country_raw, row.source, row.label, row.event_type, row.count)
+            for row in session.exec(select(DailyRollup)).all()
+        )
+
+
+def _random_messages(rng: random.Random, count: int, start_id: int):
+    return [
+        {
+            "source": rng.choice(["src-a", "src-b"]),
+            "channel": "chan",
+            "telegram_message_id": start_id + i,
+            "text": f"post {start_id + i}",
+            "country": rng.choice(COUNTRIES),
+            "label": rng.choice(["neutral", "pro", None]),
+            "event_type": rng.choice(["shelling", "protest", None]),
+            "date": NOW - timedelta(days=rng.randint(0, 6), hours=rng.randint(0, 23)),
+        }
+        for i in range(count)
+    ]
+
+
+def test_add_to_rollup_aggregates_and_upserts(db):
+    day = datetime(2026, 3, 1, 10, 0)
+    rows = [
+        {"event_timestamp": day, "country_norm": "🇺🇦 Ukraine", "country": "Ukraine", "source": "s"},
+        {"event_timestamp": day + timedelta(hours=2), "country_norm": "🇺🇦 Ukraine", "country": "UA", "source": "s"},
+        {"event_timestamp": day, "country_norm": None, "country": " Atlantis ", "source": "s"},
+        # Never shown on the map
+        {"event_timestamp": None, "country_norm": "🇺🇦 Ukraine", "source": "s"},
+    ]
+    with get_session() as session:
+        add_to_rollup(session, rows)
+        add_to_rollup(session, [{"event_timestamp": day - timedelta(hours=1), "country_norm": "🇺🇦 Ukraine", "source": "s"}])
+        session.commit()
+        stored = {(row.country_norm, row.country_raw): row for row in session.exec(select(DailyRollup)).all()}
+
+    ukraine = stored[("🇺🇦 Ukraine", "")]
+    assert (ukraine.day, ukraine.count, ukraine.last_timestamp) == (date(2026, 3, 1), 3, day + timedelta(hours=2))
+    # Raw country only kept for rows that did not normalize
+    assert stored[("", "Atlantis")].count == 1
+    assert len(stored) == 2
+
+
+def test_subtract_from_rollup_drops_emptied_rows(db):
+    store_messages(_random_messages(random.Random(1), 40, 0))
+    with get_session() as session:
+        subtract_from_rollup(session, Message.id > 0)
+        session.commit()
+    assert _rollup_rows() == []
+
+
+def test_incremental_rollup_matches_a_rebuild(db):
+    rng = random.Random(11)
+    next_id = 0
+    for _ in range(6):
+        # Stored batches overlap earlier ones: conflicting posts must not be counted twice
+        start = max(0, next_id - 20)
+        store_messages(_random_messages(rng, 60, start))
+        next_id = start + 60
+        with get_session() as session:
+            ids = session.exec(select(Message.id).order_by(Message.id)).all()
+            low = rng.choice(ids)
+            high = low + rng.randint(0, 15)
+            in_range = (Message.id >= low) & (Message.id <= high)
+            subtract_from_rollup(session, in_range)
+            session.exec(delete(Message).where(in_range))
+            session.commit()
+
+        incremental = _rollup_rows()
+        rebuild_rollup()
+        assert _rollup_rows() == incremental
+        with get_session() as session:
+            stored = session.exec(select(Message).where(Message.event_timestamp.is_not(None))).all()
+        assert sum(row[-1] for row in incremental) == len(stored)
+
+
+def test_active_countries_from_the_rollup_match_message_counts(db):
+    store_messages(_random_messages(random.Random(5), 300, 0))
+    with get_session() as session:
+        messages = session.exec(select(Message)).all()
+
+        def expected(keep):
+            counts = Counter(m.country_norm for m in messages if m.country_norm and keep(m))
+            return dict(counts)
+
+        def served(**filters):
+            response = get_active_countries_service(session=session, **filters)
+            return {c.country: c.events_count for c in response.countries}, response.ignored_countries
+
+        counts, ignored = served()
+        assert counts == expected(lambda m: True)
+        assert ignored == ["Atlantis"]
+
+        counts, _ignored = served(labels=["pro"], sources=["src-a"])
+        assert counts == expected(lambda m: m.label == "pro" and m.source == "src-a")
+
+        counts, _ignored = served(event_types=["shelling"])
+        assert counts == expected(lambda m: m.event_type == "shelling")
+
+        day = (NOW - timedelta(days=2)).date()
+        counts, _ignored = served(date_filter=[day])
+        assert counts == expected(lambda m: m.event_timestamp.date() == day)
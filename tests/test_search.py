@@ -0,0 +1,23 @@
+# tests/test_search.py
+from app.api.search import search_events
+from app.database import get_session
+from app.models.message import Message
+
+
+def _store(**fields) -> None:
+    with get_session() as session:
+        session.add(Message(source="test", **fields))
+        session.commit()
+
+
+def test_search_matches_translated_text(db):
+    _store(raw_text="Взрыв в Одессе", translated_text="Explosion à Odessa")
+    assert [m.raw_text for m in search_events(q="explosion à odessa")] == ["Взрыв в Одессе"]
+
+
+def test_search_falls_back_to_raw_text_when_untranslated(db):
+    # Lazy translation stores messages without translated_text
+    _store(raw_text="Drone strike near Sumy overnight")
+    _store(raw_text="Other news", translated_text="Autre nouvelle")
+    assert [m.raw_text for m in search_events(q="near Sumy")] == ["Drone strike near Sumy overnight"]
+    assert search_events(q="nothing like this") == []
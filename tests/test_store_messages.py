@@ -0,0 +1,109 @@
+# tests/test_store_messages.py
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import func, select
+
+from app.database import get_session, insert_ignore_conflicts
+from app.models.daily_rollup import DailyRollup
+from app.models.message import Message
+from app.services.fetch import load_channel_watermarks, save_channel_watermarks
+from run_pipeline import filter_existing_messages, store_messages
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def _msg(channel, msg_id, text=None, **fields):
+    msg = {
+        "source": "test",
+        "channel": channel,
+        "telegram_message_id": msg_id,
+        "text": text or f"post {channel}/{msg_id}",
+        "date": NOW - timedelta(minutes=msg_id or 0),
+        "country": "Ukraine",
+    }
+    msg.update(fields)
+    return msg
+
+
+def _stored():
+    with get_session() as session:
+        return sorted(
+            (row.channel, row.telegram_message_id, row.raw_text)
+            for row in session.exec(select(Message)).all()
+        )
+
+
+def _rollup_total():
+    with get_session() as session:
+        return session.exec(select(func.coalesce(func.sum(DailyRollup.count), 0))).one()
+
+
+def test_insert_ignore_conflicts_returns_only_new_rows(db):
+    rows = [
+        {"source": "test", "channel": "a", "telegram_message_id": i, "raw_text": "x", "created_at": NOW}
+        for i in (1, 2)
+    ]
+    with get_session() as session:
+        first = insert_ignore_conflicts(
+            session, Message.__table__, rows, ["channel", "telegram_message_id"],
+            returning=("channel", "telegram_message_id"),
+        )
+        again = insert_ignore_conflicts(
+            session, Message.__table__, rows + [dict(rows[0], telegram_message_id=3)],
+            ["channel", "telegram_message_id"], returning=("channel", "telegram_message_id"),
+        )
+        session.commit()
+    assert sorted(tuple(row) for row in first) == [("a", 1), ("a", 2)]
+    assert [tuple(row) for row in again] == [("a", 3)]
+
+
+def test_store_messages_skips_posts_already_stored(db):
+    assert len(store_messages([_msg("a", 1), _msg("a", 2), _msg("b", 1)])) == 3
+
+    batch = [_msg("a", 2, "changed"), _msg("a", 3), _msg("b", 1)]
+    inserted = store_messages(batch)
+    assert inserted == [batch[1]]
+    assert [(chan, msg_id) for chan, msg_id, _text in _stored()] == [("a", 1), ("a", 2), ("a", 3), ("b", 1)]
+    # The stored row is kept as is
+    assert ("a", 2, "post a/2") in _stored()
+    # Only inserted rows are counted on the map
+    assert _rollup_total() == 4
+
+
+def test_store_messages_keeps_the_first_of_in_batch_duplicates(db):
+    batch = [_msg("a", 1, "first"), _msg("a", 1, "second"), _msg("a", 2)]
+    inserted = store_messages(batch)
+    assert inserted == [batch[0], batch[2]]
+    assert _stored() == [("a", 1, "first"), ("a", 2, "post a/2")]
+    assert _rollup_total() == 2
+
+
+def test_store_messages_always_inserts_posts_without_telegram_id(db):
+    batch = [_msg("a", None, "one"), _msg("a", None, "two")]
+    assert store_messages(batch) == batch
+    assert store_messages(batch) == batch
+    assert len(_stored()) == 4
+
+
+def test_store_messages_chunks_large_batches(db):
+    batch = [_msg("a", i) for i in range(2500)]
+    assert len(store_messages(batch)) == 2500
+    assert len(store_messages(batch[2400:] + [_msg("a", 2500)])) == 1
+    assert _rollup_total() == 2501
+
+
+def test_filter_existing_messages_looks_up_posts_up_to_the_newest_stored_id(db):
+    store_messages([_msg("a", 1), _msg("a", 5), _msg("b", 1)])
+    # Channel a's high-water mark was held back by a capped fetch: 1 and 5 come again
+    save_channel_watermarks([_msg("a", 1)])
+
+    batch = [_msg("a", 1), _msg("a", 3), _msg("a", 5), _msg("a", 6), _msg("b", 2), _msg("c", 1), _msg("c", None)]
+    assert filter_existing_messages(batch) == [batch[1], batch[3], batch[4], batch[5], batch[6]]
+
+
+def test_capped_fetch_keeps_the_high_water_mark(db):
+    save_channel_watermarks([_msg("a", 10), _msg("b", 10)])
+    save_channel_watermarks([
+        _msg("a", 80, fetch_truncated=True), _msg("a", 90, fetch_truncated=True), _msg("b", 20),
+    ])
+    assert load_channel_watermarks(["a", "b"]) == {"a": 10, "b": 20}
@@ -0,0 +1,106 @@
+# tests/test_stories.py
+from datetime import datetime, timezone
+
+from app.database import get_session
+from app.models.message import Message
+from app.services.stories import (
+    StoryIndex,
+    assign_story_ids,
+    band_keys,
+    decode_signature,
+    encode_signature,
+    minhash_signature,
+    save_story_bands,
+    similarity,
+)
+
+REPORT = (
+    "Russian forces launched a massive overnight drone attack on Kharkiv, damaging "
+    "residential buildings and a power substation; regional officials said at least "
+    "five people were injured and emergency crews are still at the scene this morning"
+)
+REWORDED = REPORT.replace("at least five", "at least six").replace("this morning", "today")
+UNRELATED = (
+    "The central bank kept its key interest rate unchanged on Thursday and signalled "
+    "that inflation should slow gradually over the coming quarters as demand cools"
+)
+
+
+def test_short_posts_are_never_clustered():
+    assert minhash_signature("Sirens in Kyiv") is None
+    assert minhash_signature("") is None
+    assert minhash_signature(None) is None
+
+
+def test_signature_is_deterministic_and_round_trips():
+    signature = minhash_signature(REPORT)
+    assert signature == minhash_signature(REPORT)
+    assert decode_signature(encode_signature(signature)) == signature
+    assert decode_signature("abc") is None
+    assert decode_signature(None) is None
+
+
+def test_similarity_separates_rewordings_from_unrelated_posts():
+    report = minhash_signature(REPORT)
+    assert similarity(report, minhash_signature(REPORT.upper())) == 1.0
+    assert similarity(report, minhash_signature(REWORDED)) >= 0.5
+    assert similarity(report, minhash_signature(UNRELATED)) < 0.1
+
+
+def test_near_duplicates_share_an_lsh_band():
+    report = set(band_keys(minhash_signature(REPORT)))
+    assert report & set(band_keys(minhash_signature(REWORDED)))
+    assert not report & set(band_keys(minhash_signature(UNRELATED)))
+
+
+def test_story_index_forgets_removed_messages():
+    index = StoryIndex()
+    signature = minhash_signature(REPORT)
+    msg = {"text": REPORT, "minhash": encode_signature(signature)}
+    index.add(signature, msg)
+    assert [found for found, _score in index.matches(signature, 0.5)] == [msg]
+    index.remove([msg])
+    assert index.matches(signature, 0.5) == []
+
+
+def test_assign_story_ids_within_a_run(db):
+    messages = [{"text": REPORT}, {"text": REWORDED}, {"text": UNRELATED}, {"text": "Sirens in Kyiv"}]
+    matches = assign_story_ids(messages)
+    assert messages[0]["story_id"] == messages[1]["story_id"]
+    assert messages[2]["story_id"] not in (None, messages[0]["story_id"])
+    assert messages[3]["story_id"] is None and messages[3]["minhash"] is None
+    assert [(msg["text"], other["text"]) for msg, other, _score in matches] == [(REWORDED, REPORT)]
+
+
+def test_similarity_threshold_is_configurable(db, settings, monkeypatch):
+    monkeypatch.setattr(settings, "story_min_similarity", 0.99)
+    messages = [{"text": REPORT}, {"text": REWORDED}]
+    assert assign_story_ids(messages) == []
+    assert messages[0]["story_id"] != messages[1]["story_id"]
+
+
+def test_posts_naming_other_places_stay_apart(db):
+    messages = [{"text": REPORT}, {"text": REPORT.replace("Kharkiv", "Kherson")}]
+    assert assign_story_ids(messages) == []
+    assert messages[0]["story_id"] != messages[1]["story_id"]
+
+
+def test_assign_story_ids_matches_stored_posts(db):
+    first = [{"text": REPORT}]
+    assign_story_ids(first)
+    with get_session() as session:
+        session.add(
+            Message(
+                source="test", channel="a", telegram_message_id=1, raw_text=REPORT,
+                story_id=first[0]["story_id"], minhash=first[0]["minhash"],
+                event_timestamp=datetime.now(timezone.utc),
+            )
+        )
+        session.commit()
+    assert save_story_bands(first) == 20
+    assert save_story_bands(first) == 0
+
+    later = [{"text": REWORDED}]
+    matches = assign_story_ids(later)
+    assert later[0]["story_id"] == first[0]["story_id"]
+    assert isinstance(matches[0][1], Message)
@@ -0,0 +1,36 @@
+# tests/test_translation_memory.py
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from sqlmodel import func, select
+
+from app.database import get_session
+from app.models.translation_memory import TranslationMemoryEntry
+from app.services.translation_memory import load_translations, source_hash, store_translations
+
+KEY = dict(source_lang="ru", target_lang="fr", model_name="test-model")
+
+
+def test_store_translations_inserts_then_overwrites(db):
+    assert store_translations({source_hash("Взрыв"): "Explosion"}, **KEY) == 1
+    store_translations({source_hash("Взрыв"): "Une explosion", source_hash("Дрон"): "Drone"}, **KEY)
+    assert load_translations([source_hash("Взрыв"), source_hash("Дрон")], **KEY) == {
+        source_hash("Взрыв"): "Une explosion",
+        source_hash("Дрон"): "Drone",
+    }
+    # Keys include the language pair and model
+    assert load_translations([source_hash("Дрон")], **dict(KEY, model_name="other")) == {}
+
+
+def test_concurrent_writers_of_the_same_keys(db):
+    translations = {source_hash(f"text {i}"): f"texte {i}" for i in range(50)}
+    start = threading.Barrier(6)
+
+    def write(_n):
+        start.wait()
+        return store_translations(translations, **KEY)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        assert list(pool.map(write, range(6))) == [50] * 6
+    with get_session() as session:
+        assert session.exec(select(func.count()).select_from(TranslationMemoryEntry)).one() == 50
@@ -0,0 +1,29 @@
+# tools/convert_sqlite_auto_vacuum.py
+
+from pathlib import Path
+import sys
+
+# Ensure the project root is available on the Python path
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.database import DATABASE_URL, engine
+from app.services.retention import convert_sqlite_auto_vacuum
+
+
+def main() -> None:
+    # One-off maintenance: rewrites the whole SQLite file (exclusive lock, ~2x its size
+    # on disk), so stop the pipeline and the API first
+    if engine.dialect.name != "sqlite":
+        print("[db] not a SQLite database, nothing to convert")
+        return
+    print(f"[db] {DATABASE_URL}: switching to auto_vacuum=INCREMENTAL if needed (full VACUUM)…")
+    if convert_sqlite_auto_vacuum():
+        print("[db] done: retention now returns freed space to the disk")
+    else:
+        print("[db] already auto_vacuum=INCREMENTAL, nothing to do")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 # tools/run_pipeline.py
 
 import asyncio
+from collections import Counter
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
 
@@ -14,16 +15,20 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from app.database import init_db, get_session
+from app.database import init_db, get_session, insert_ignore_conflicts
 from app.models.message import Message
 from app.utils.country_norm import compute_country_norm
 from app.api.filters import COUNTRY_ALIASES, normalize_country_names
-from sqlmodel import select
+from sqlmodel import func, select
 
-from app.services.fetch import fetch_raw_messages_24h
+from app.services.fetch import fetch_raw_messages_24h, save_channel_watermarks
 from app.services.translation import translate_messages
-from app.services.enrichment import enrich_messages, EnrichmentConfig
+from app.services.boilerplate import learn_boilerplate, restore_boilerplate, strip_boilerplate
+from app.services.enrichment import AI_FIELDS, enrich_messages, EnrichmentConfig
 from app.services.dedupe import dedupe_messages
+from app.services.stories import StoryIndex, assign_story_ids, same_places, save_story_bands
+from app.services.retention import message_conflict_columns, purge_old_messages
+from app.services.rollup import add_to_rollup
 from sqlalchemy.exc import OperationalError
 
 
@@ -60,10 +65,12 @@ def summarize_messages(messages: list[dict], label: str) -> None:
     with_region = sum(1 for m in messages if (m.get("region") or "").strip())
     with_location = sum(1 for m in messages if (m.get("location") or "").strip())
     with_title = sum(1 for m in messages if (m.get("title") or "").strip())
+    with_event_type = sum(1 for m in messages if (m.get("event_type") or "").strip())
     log(
         f"[{label}] total={len(messages)} | channels={len(channels)} | sources={len(sources)} | "
         f"text={with_text} | translated={with_translated} | country={with_country} | "
-        f"region={with_region} | location={with_location} | title={with_title}"
+        f"region={with_region} | location={with_location} | title={with_title} | "
+        f"event_type={with_event_type}"
     )
     if channels:
         # Summarize top channels to spot noisy sources quickly
@@ -134,9 +141,22 @@ def check_openai_connection(settings) -> None:
         raise
 
 
-def store_messages(messages: list[dict]) -> None:
+def _take_inserted(row: dict, returned_keys: Counter) -> bool:
+    # True when row is one of the inserted rows reported by RETURNING (consumes its key)
+    key = (row.get("channel"), row.get("telegram_message_id"))
+    if None in key:
+        # NULL never conflicts: always inserted
+        return True
+    if returned_keys[key] > 0:
+        returned_keys[key] -= 1
+        return True
+    return False
+
+
+def store_messages(messages: list[dict]) -> list[dict]:
     """
-    Enregistre les messages dans SQLite.
+    Enregistre les messages en base (INSERT ... ON CONFLICT DO NOTHING sur
+    channel + telegram_message_id). Returns the messages actually inserted.
     """
     # Persist messages and report unknown countries once per run
     unknown_countries: list[str] = []
@@ -160,6 +180,9 @@ def store_messages(messages: list[dict]) -> None:
                 channel=msg.get("channel"),
                 raw_text=msg.get("text", ""),
                 translated_text=msg.get("translated_text"),
+                content_hash=msg.get("content_hash"),
+                story_id=msg.get("story_id"),
+                minhash=msg.get("minhash"),
                 country=raw_country,
                 country_norm=country_norm,
                 region=msg.get("region"),
@@ -173,72 +196,334 @@ def store_messages(messages: list[dict]) -> None:
             )
         )
 
-    chunk_size = 200
-    for i in range(0, len(models), chunk_size):
-        chunk = models[i : i + chunk_size]
+    # One executemany per chunk; the database reports which rows were new
+    key_columns = message_conflict_columns()
+    rows = [model.model_dump(exclude={"id"}) for model in models]
+    inserted_keys: Counter = Counter()
+    chunk_size = 1000
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i : i + chunk_size]
         attempt = 0
         while True:
             try:
                 with get_session() as session:
-                    session.add_all(chunk)
+                    returned = insert_ignore_conflicts(
+                        session, Message.__table__, chunk, key_columns, returning=("channel", "telegram_message_id")
+                    )
+                    chunk_keys = Counter((row[0], row[1]) for row in returned)
+                    # Map counts move in the same transaction as the rows they count
+                    add_to_rollup(session, [row for row in chunk if _take_inserted(row, chunk_keys)])
                     session.commit()
+                inserted_keys.update((row[0], row[1]) for row in returned)
                 break
             except OperationalError:
                 attempt += 1
                 if attempt >= 2:
                     raise
+
+    inserted = [msg for msg in messages if _take_inserted(msg, inserted_keys)]
+    save_story_bands(inserted)
     if unknown_countries:
         unique_unknowns = sorted(set(unknown_countries))
         sample = ", ".join(unique_unknowns[:10])
         log(f"[ALERT] Unknown/non-geocoded countries: {len(unique_unknowns)} (sample: {sample})")
-    log(f"[STORE] Stored {len(messages)} messages.")
+    log(f"[STORE] Inserted {len(inserted)} | skipped {len(messages) - len(inserted)} (already stored).")
+    return inserted
 
 
 def filter_existing_messages(messages: list[dict]) -> list[dict]:
     """
     Filtre les messages déjà présents en base (par channel + telegram_message_id).
+    Storage no longer relies on it (store_messages skips conflicts); it keeps
+    already-stored posts away from the AI stages. Posts above the newest id stored
+    for their channel cannot be stored yet and are not looked up, so an incremental
+    fetch normally costs one indexed max() per channel. A channel whose high-water
+    mark was held back (capped fetch) gets its already-stored posts looked up.
     """
-    # Drop messages that already exist in the database
     if not messages:
-        return []
-    keys = [(m.get("channel"), m.get("telegram_message_id")) for m in messages]
-    channels = set(k[0] for k in keys if k[0] is not None)
-    ids = set(k[1] for k in keys if k[1] is not None)
-    if not channels or not ids:
         return messages
+    by_channel: dict[str, set[int]] = {}
+    for m in messages:
+        chan, msg_id = m.get("channel"), m.get("telegram_message_id")
+        if chan is not None and msg_id is not None:
+            by_channel.setdefault(chan, set()).add(msg_id)
+    existing: set[tuple] = set()
     with get_session() as session:
-        from sqlmodel import or_
-        pairs = [(c, i) for c, i in keys if c is not None and i is not None]
-        if not pairs:
-            return messages
-        stmt = select(Message.channel, Message.telegram_message_id).where(
-            or_(*[(Message.channel == c) & (Message.telegram_message_id == i) for c, i in pairs])
-        )
-        existing = set((row[0], row[1]) for row in session.exec(stmt).all())
+        for chan, ids in by_channel.items():
+            # Served by the (channel, telegram_message_id) unique key
+            newest = session.exec(
+                select(func.max(Message.telegram_message_id)).where(Message.channel == chan)
+            ).one()
+            if newest is None:
+                continue
+            ids_list = sorted(msg_id for msg_id in ids if msg_id <= newest)
+            # One indexed IN lookup per chunk of possibly stored posts
+            for i in range(0, len(ids_list), 500):
+                stmt = select(Message.telegram_message_id).where(
+                    Message.channel == chan,
+                    Message.telegram_message_id.in_(ids_list[i : i + 500]),
+                )
+                existing.update((chan, msg_id) for msg_id in session.exec(stmt).all())
     filtered = [m for m in messages if (m.get("channel"), m.get("telegram_message_id")) not in existing]
     log(f"[DEDUP] Existing in DB: {len(messages)-len(filtered)} skipped.")
     return filtered
 
 
+def filter_duplicate_content(messages: list[dict], seen: dict | None = None) -> list[dict]:
+    """
+    Retire avant l'IA les messages dont le content_hash existe déjà (en base dans la
+    fenêtre de rétention, plus tôt dans le lot, ou dans `seen` pour le mode streaming).
+    Returns the messages that still need enrichment. In "link" mode duplicates stay in
+    `messages` (the caller's list is updated in place) and get the original's fields:
+    from the DB row right away, from an in-run original via resolve_duplicate_links.
+    """
+    from app.config import get_settings
+    settings = get_settings()
+    mode = settings.content_dedupe_mode
+    if mode not in ("link", "drop") or not messages:
+        return messages
+    seen = seen if seen is not None else {}
+
+    hashes = {m.get("content_hash") for m in messages if m.get("content_hash")}
+    stored: dict[str, Message] = {}
+    if hashes:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=settings.auto_delete_days)
+        with get_session() as session:
+            stmt = (
+                select(Message)
+                .where(Message.content_hash.in_(list(hashes)), Message.event_timestamp >= cutoff)
+                .order_by(Message.id)
+            )
+            for row in session.exec(stmt).all():
+                stored.setdefault(row.content_hash, row)
+
+    unique: list[dict] = []
+    kept: list[dict] = []
+    from_db = 0
+    from_run = 0
+    for msg in messages:
+        key = msg.get("content_hash")
+        if not key:
+            unique.append(msg)
+            kept.append(msg)
+            continue
+        if key in stored:
+            from_db += 1
+            if mode == "link":
+                row = stored[key]
+                for field in AI_FIELDS:
+                    msg[field] = getattr(row, field)
+                msg["story_id"] = row.story_id
+                kept.append(msg)
+            continue
+        if key in seen:
+            from_run += 1
+            if mode == "link":
+                msg["_duplicate_of"] = seen[key]
+                kept.append(msg)
+            continue
+        seen[key] = msg
+        unique.append(msg)
+        kept.append(msg)
+
+    messages[:] = kept
+    log(f"[DEDUP] Content duplicates ({mode}): in DB={from_db} | in run={from_run} | to enrich={len(unique)}")
+    return unique
+
+
+def filter_story_members(messages: list[dict], index: StoryIndex | None = None) -> list[dict]:
+    """
+    Regroupe les quasi-doublons en stories (MinHash LSH, voir app/services/stories.py)
+    et retire de l'enrichissement les membres assez proches de leur story.
+    Every message gets its story_id; a member at story_reuse_min_similarity naming the same
+    places reuses the matched post's fields (stored row now, in-run post via
+    resolve_duplicate_links). Returns the messages that still need enrichment.
+    """
+    from app.config import get_settings
+    settings = get_settings()
+    if not settings.story_clustering or not messages:
+        return messages
+
+    matches = assign_story_ids(messages, index)
+    reused: set[int] = set()
+    for msg, matched, score in matches:
+        if score < settings.story_reuse_min_similarity:
+            continue
+        if isinstance(matched, Message):
+            if not same_places(msg.get("text"), matched.raw_text):
+                continue
+            for field in AI_FIELDS:
+                msg[field] = getattr(matched, field)
+        else:
+            if not same_places(msg.get("text"), matched.get("text")):
+                continue
+            msg["_duplicate_of"] = matched
+        reused.add(id(msg))
+
+    to_enrich = [m for m in messages if id(m) not in reused]
+    stories = {m.get("story_id") for m in messages if m.get("story_id")}
+    log(
+        f"[STORY] stories={len(stories)} | joined={len(matches)} | "
+        f"reused_enrichment={len(reused)} | to enrich={len(to_enrich)}"
+    )
+    return to_enrich
+
+
+def resolve_duplicate_links(messages: list[dict]) -> None:
+    """
+    Copy enrichment fields from in-run originals to their linked duplicates.
+    """
+    for msg in messages:
+        original = msg.pop("_duplicate_of", None)
+        if original is not None:
+            for field in AI_FIELDS:
+                msg[field] = original.get(field)
+            if original.get("story_id"):
+                msg["story_id"] = original["story_id"]
+
+
 def delete_old_messages() -> None:
     """
     Supprime les messages dont l'event_timestamp est plus vieux que X jours.
     """
-    # Use settings to delete old rows by event_timestamp
-    from datetime import timezone
+    # Chunked deletes (and partition drops on partitioned Postgres), see app/services/retention.py
     from app.config import get_settings
     settings = get_settings()
-    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.auto_delete_days)
-    with get_session() as session:
-        from sqlmodel import delete
+    dropped, deleted = purge_old_messages()
+    log(
+        f"[CLEAN] Deleted messages older than {settings.auto_delete_days} days "
+        f"({dropped + deleted}: partitions={dropped} | chunks={deleted})."
+    )
 
-        # On supprime directement en SQL, pas besoin de charger les objets en mémoire
-        stmt = delete(Message).where(Message.event_timestamp < cutoff)
-        result = session.exec(stmt)
-        session.commit()
 
-    deleted = getattr(result, "rowcount", None)
-    log(f"[CLEAN] Deleted messages older than {settings.auto_delete_days} days ({deleted}).")
+async def _run_stage(marker: str, inbox: asyncio.Queue, outbox: asyncio.Queue | None, func) -> None:
+    # Process batches until the end-of-stream marker (None), then propagate it downstream
+    started = False
+    while True:
+        batch = await inbox.get()
+        if batch is None:
+            break
+        if not started:
+            log(marker)
+            started = True
+        # Blocking stages (AI calls, DB writes) run in a worker thread so other stages keep going
+        result = await asyncio.to_thread(func, batch)
+        if outbox is not None and result:
+            await outbox.put(result)
+    if outbox is not None:
+        await outbox.put(None)
+
+
+async def run_streaming_stages(settings) -> None:
+    """
+    Streaming mode: fetch, enrichment, dedupe, translation and storage run as concurrent
+    stages connected by bounded queues, so the messages held follow the queue depth.
+    The in-run duplicate lookups drop messages once stored (the database serves them
+    from then on). What still grows with the run: one 16-byte dedupe digest per
+    message, and the posts dedupe_messages drops before storage.
+    """
+    queue_size = max(1, settings.pipeline_queue_size)
+    batch_size = max(1, settings.batch_size)
+    log(f"[STREAM] queue_size={queue_size} | batch_size={batch_size}")
+
+    enrich_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    dedupe_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    translate_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    store_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    buffer: list[dict] = []
+    fetched_ids: dict[str, int] = {}
+    seen: set[bytes] = set()
+    totals = {"fetched": 0, "stored": 0}
+
+    async def on_channel(msgs: list[dict]) -> None:
+        # Track high-water marks and regroup channel results into batch_size batches
+        totals["fetched"] += len(msgs)
+        for m in msgs:
+            chan, msg_id = m.get("channel"), m.get("telegram_message_id")
+            if m.get("fetch_truncated"):
+                # Capped fetch: posts below the oldest one fetched were skipped, keep the mark
+                continue
+            if chan and msg_id is not None and msg_id > fetched_ids.get(chan, 0):
+                fetched_ids[chan] = msg_id
+        buffer.extend(msgs)
+        while len(buffer) >= batch_size:
+            batch = buffer[:batch_size]
+            del buffer[:batch_size]
+            await enrich_q.put(batch)
+
+    async def fetch_stage() -> None:
+        log("[FETCH] Starting...")
+        try:
+            await fetch_raw_messages_24h(on_channel=on_channel)
+        except Exception as e:
+            log(f"[FETCH][ERROR] {e}")
+            raise
+        if buffer:
+            await enrich_q.put(list(buffer))
+            buffer.clear()
+        await enrich_q.put(None)
+
+    boilerplate: dict = {}
+    content_seen: dict = {}
+    story_index = StoryIndex()
+    # Batches handed over by the store stage, drained by the enrich stage
+    stored_batches: list[list[dict]] = []
+
+    def forget_stored() -> None:
+        # Stored messages are matched through content_hash / story_band in the database:
+        # drop them from the in-run lookups (only the enrich stage touches those)
+        while stored_batches:
+            msgs = stored_batches.pop(0)
+            for m in msgs:
+                key = m.get("content_hash")
+                if key and content_seen.get(key) is m:
+                    del content_seen[key]
+            story_index.remove(msgs)
+
+    def enrich_batch(batch: list[dict]) -> list[dict]:
+        forget_stored()
+        # IMPORTANT: enrichment runs on original text, before translation (same rule as batch mode)
+        batch = filter_existing_messages(batch)
+        if batch and settings.strip_boilerplate:
+            # Learned once per channel for the run
+            boilerplate.update(learn_boilerplate(batch, boilerplate))
+            strip_boilerplate(batch, boilerplate)
+        # Originals from earlier batches are already enriched (this stage runs in order)
+        to_enrich = filter_duplicate_content(batch, content_seen)
+        to_enrich = filter_story_members(to_enrich, story_index)
+        if to_enrich:
+            enrich_messages(to_enrich, config=None)
+        resolve_duplicate_links(batch)
+        return batch
+
+    def store_batch(batch: list[dict]) -> None:
+        restore_boilerplate(batch)
+        totals["stored"] += len(store_messages(batch))
+        stored_batches.append(batch)
+
+    tasks = [
+        asyncio.create_task(fetch_stage()),
+        asyncio.create_task(_run_stage("enrich_messages", enrich_q, dedupe_q, enrich_batch)),
+        asyncio.create_task(_run_stage("dedupe_messages", dedupe_q, translate_q, lambda b: dedupe_messages(b, seen))),
+        asyncio.create_task(_run_stage(
+            "translate_messages",
+            translate_q,
+            store_q,
+            (lambda b: b) if settings.lazy_translation else translate_messages,
+        )),
+        asyncio.create_task(_run_stage("store_messages", store_q, None, store_batch)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    # Advance high-water marks only once every batch is persisted
+    save_channel_watermarks([{"channel": c, "telegram_message_id": i} for c, i in fetched_ids.items()])
+    log(f"[STREAM] fetched={totals['fetched']} | stored={totals['stored']}")
 
 
 async def run_pipeline_once():
@@ -266,6 +551,14 @@ async def run_pipeline_once():
     log("init_db()")
     init_db()
 
+    if settings.pipeline_streaming:
+        log("fetch_raw_messages_24h")
+        await run_streaming_stages(settings)
+        log("delete_old_messages")
+        delete_old_messages()
+        log("Pipeline terminé")
+        return
+
     log("fetch_raw_messages_24h")
     log("[FETCH] Starting...")
     try:
@@ -280,21 +573,38 @@ async def run_pipeline_once():
 
     log("dedupe_messages")
     log("[DEDUP] Filtering already-stored messages...")
+    fetched_messages = raw_messages
     raw_messages = filter_existing_messages(raw_messages)
     if not raw_messages:
+        save_channel_watermarks(fetched_messages)
         log("[DEDUP] All messages already in DB. Nothing to do.")
         return
 
     # IMPORTANT:
     # Enrichment MUST run on original text BEFORE any translation.
     # Translation is a final presentation step and must never affect enrichment.
+    # With combined_ai_calls the translation comes back from the enrichment AI call,
+    # which still extracts fields from the original text; translate_messages only
+    # handles what that call did not translate.
+    if settings.strip_boilerplate:
+        # AI stages only see the post itself; headers/footers are re-attached before storing
+        patterns = learn_boilerplate(raw_messages)
+        removed = strip_boilerplate(raw_messages, patterns)
+        log(f"[BOILERPLATE] channels={sum(1 for p in patterns.values() if any(p))}/{len(patterns)} | removed_chars={removed}")
+
+    # Exact duplicates (same content hash) never reach the AI stages, close
+    # near-duplicates (same story) reuse their story's enrichment
+    to_enrich = filter_duplicate_content(raw_messages)
+    to_enrich = filter_story_members(to_enrich)
+
     log("enrich_messages")
     log("[ENRICH] Enriching messages...")
     try:
-        enrich_messages(raw_messages, config=None)
+        enrich_messages(to_enrich, config=None)
     except Exception as e:
         log(f"[ENRICH][ERROR] {e}")
         raise
+    resolve_duplicate_links(raw_messages)
     summarize_messages(raw_messages, "ENRICH")
 
     log("dedupe_messages")
@@ -303,17 +613,24 @@ async def run_pipeline_once():
     log(f"[DEDUP] After dedupe: {len(deduped)} messages.")
 
     log("translate_messages")
-    log("[TRAD] Translating messages...")
-    try:
-        translate_messages(deduped)
-    except Exception as e:
-        log(f"[TRAD][ERROR] {e}")
-        raise
-    summarize_messages(deduped, "TRAD")
+    if settings.lazy_translation:
+        # Stored untranslated; the event endpoints translate on first view
+        log("[TRAD] Skipped: lazy translation enabled.")
+    else:
+        log("[TRAD] Translating messages...")
+        try:
+            translate_messages(deduped)
+        except Exception as e:
+            log(f"[TRAD][ERROR] {e}")
+            raise
+        summarize_messages(deduped, "TRAD")
 
     log("store_messages")
     log("[STORE] Writing to DB...")
+    restore_boilerplate(deduped)
     store_messages(deduped)
+    # Advance high-water marks only once the batch is persisted
+    save_channel_watermarks(fetched_messages)
 
     log("delete_old_messages")
     delete_old_messages()